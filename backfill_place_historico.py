@@ -18,15 +18,21 @@ varios ficheros .atom encadenados (el primero es
 enlazados). Son archivos grandes: cientos de MB por año.
 
 Este script:
-  1. Descarga el ZIP de cada año pedido (streaming, con reintentos).
-  2. Extrae los .atom internos.
-  3. Reusa el mismo parser de scraper_place.py (_parsear_pagina) para
-     filtrar solo entradas cuyo "Órgano de Contratación" matchee
-     RE_AECID — exactamente el mismo criterio que usa el backfill diario.
-  4. Fusiona lo encontrado con el CSV histórico ya acumulado
-     (data/raw/place_contratos.csv), deduplicando por id_contrato.
-  5. Borra los archivos temporales (ZIP + atoms extraídos) al terminar
-     cada año, para no inflar el disco.
+  1. Descarga el ZIP de cada año pedido (streaming, con reintentos que
+     retoman el .part con HTTP Range en vez de empezar de cero, y
+     validando tamaño y directorio central antes de parsearlo).
+  2. Lee los .atom internos directamente desde el ZIP (ZipFile.open), sin
+     extraerlos a disco, y los pasa por el parser incremental de
+     scraper_place.py (_parsear_stream) para filtrar solo entradas cuyo
+     "Órgano de Contratación" matchee RE_AECID — exactamente el mismo
+     criterio que usa el backfill diario. Con --modo extraer se conserva
+     el camino anterior (extractall + _parsear_pagina sobre cada fichero).
+  3. Fusiona lo encontrado con el CSV histórico ya acumulado
+     (data/raw/place_contratos.csv), deduplicando por id_contrato, al
+     terminar CADA año, y lo anota en data/raw/place_backfill_manifest.json:
+     si el job se corta, la próxima corrida saltea los años ya procesados.
+  4. Borra los archivos temporales (ZIP + atoms extraídos, si los hubo) al
+     terminar cada año, para no inflar el disco.
 
 Uso:
     # Años por defecto (donde están los fondos AECID seed: 2021-2024)
@@ -38,6 +44,15 @@ Uso:
     # Solo simular sin escribir el CSV (para ver cuántos matches habría)
     python backfill_place_historico.py --years 2023 --dry-run
 
+    # Camino anterior: extraer los .atom a disco antes de parsearlos
+    python backfill_place_historico.py --years 2023 --modo extraer
+
+    # Repartir el parseo entre 16 procesos (runner de 16 núcleos)
+    python backfill_place_historico.py --workers 16
+
+    # Repetir años que el manifiesto ya marca como procesados
+    python backfill_place_historico.py --years 2023 --forzar
+
 Notas de rendimiento:
   - Cada ZIP anual puede rondar varios cientos de MB. En GitHub Actions
     debería bajar bastante más rápido que en una conexión casera, pero
@@ -48,13 +63,23 @@ Notas de rendimiento:
     2021-2024, no hace falta repetirlo — el backfill incremental diario
     (scraper_place.py, basado en el cursor) se encarga de mantenerse al
     día con lo nuevo desde ahí en adelante.
+  - En modo "stream" (default) no se escribe nada a disco aparte del ZIP
+    y la memoria queda acotada al tamaño de una entrada del feed; al
+    terminar cada año se loguean los bytes que se leyeron y escribieron
+    en disco (/proc/self/io; fuera de Linux, estimados por tamaño de
+    archivo) y el pico de memoria residente de ese año.
 """
 import argparse
+import json
 import logging
+import re
 import shutil
 import sys
+import threading
 import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
@@ -65,12 +90,20 @@ SRC = ROOT / "src"
 sys.path.insert(0, str(SRC))
 sys.path.insert(0, str(ROOT))
 
+from cliente_http import HTTP, segundos_retry_after  # noqa: E402
 from src.scraper_place import (  # noqa: E402
     _parsear_pagina,
+    _parsear_stream,
+    CHUNK_STREAM,
     DATA_DIR,
     PATH_HISTORICO,
 )
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 log = logging.getLogger(__name__)
 
 ZIP_URL_TMPL = (
@@ -80,35 +113,149 @@ ZIP_URL_TMPL = (
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) MonitorMonteverde/1.0"}
 
 TMP_DIR = DATA_DIR / "_tmp_backfill_historico"
+PATH_MANIFEST = DATA_DIR / "place_backfill_manifest.json"
+_LOCK_MANIFEST = threading.Lock()
+RE_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
 MAX_REINTENTOS = 4
 TIMEOUT_DESCARGA = 600  # 10 min — los ZIP anuales son grandes
 
+# "stream": cada .atom se lee desde el ZIP y se parsea a medida que se
+# descomprime (nada a disco, memoria acotada). "extraer": camino anterior,
+# extractall + read_text de cada fichero completo.
+MODO_ZIP = "stream"
+
 
-# ── Descarga con reintentos ──────────────────────────────────────────────────
+# ── Manifiesto de descargas por año ─────────────────────────────────────────
+# Estado de cada año en data/raw/place_backfill_manifest.json, para que un
+# job interrumpido retome donde quedó: los años "procesado" ya están
+# fusionados en el CSV y no se vuelven a bajar; los "descargado" con el ZIP
+# completo en disco se parsean sin volver a bajarlo, y los "descargando"
+# continúan el .part con Range.
 
-def _descargar_zip_anual(year: int, destino: Path) -> bool:
+def _cargar_manifest() -> dict:
+    if PATH_MANIFEST.exists():
+        try:
+            return json.loads(PATH_MANIFEST.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.warning(f"  No se pudo leer el manifiesto de backfill ({e}) — se reinicia")
+    return {}
+
+
+def _actualizar_manifest(manifest: dict, year: int, **campos) -> None:
+    """Actualiza la entrada del año y, si el manifiesto se persiste (no
+    dry-run, ver backfill_masivo), la escribe a disco. Lo llaman a la vez el
+    hilo de descargas y el principal, de ahí el lock."""
+    if manifest is None:
+        return
+    with _LOCK_MANIFEST:
+        entrada = manifest.setdefault(str(year), {})
+        entrada.update(campos)
+        entrada["actualizado"] = datetime.now().isoformat(timespec="seconds")
+        if manifest.get("_persistir", True):
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            datos = {k: v for k, v in manifest.items() if not k.startswith("_")}
+            PATH_MANIFEST.write_text(json.dumps(datos, ensure_ascii=False, indent=2, sort_keys=True),
+                                     encoding="utf-8")
+
+
+# ── Descarga reanudable ──────────────────────────────────────────────────────
+
+def _zip_valido(path: Path) -> bool:
+    """Abre el ZIP (lo que lee y valida el directorio central al final del
+    fichero): una descarga truncada falla acá antes de intentar parsearla."""
+    try:
+        with zipfile.ZipFile(path) as z:
+            return bool(z.infolist())
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def _total_de_respuesta(r, desde: int):
+    """Tamaño total del recurso según la respuesta: Content-Range en un 206,
+    Content-Length en un 200. None si el servidor no lo informa."""
+    if r.status_code == 206:
+        m = RE_CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+        if not m or int(m.group(1)) != desde:
+            return -1  # rango distinto del pedido — no se puede anexar
+        return int(m.group(3)) if m.group(3) != "*" else None
+    largo = r.headers.get("Content-Length")
+    return int(largo) if largo and largo.isdigit() else None
+
+
+def _descargar_zip_anual(year: int, destino: Path, manifest: dict = None) -> bool:
+    """Baja el ZIP del año a `destino` pasando por `destino`.part. Si la
+    descarga se corta (error de red, 503, cuerpo incompleto) el reintento
+    pide solo lo que falta con Range + If-Range (ETag o Last-Modified), así
+    que si el fichero cambió en el servidor se baja entero de nuevo."""
     url = ZIP_URL_TMPL.format(year=year)
+    parcial = destino.with_name(destino.name + ".part")
+    estado = (manifest or {}).get(str(year), {})
+
+    if destino.exists() and destino.stat().st_size == estado.get("bytes_total") and _zip_valido(destino):
+        log.info(f"  [{year}] ZIP ya descargado ({destino.stat().st_size / 1_048_576:.1f} MB) — se reutiliza")
+        return True
+
+    validador = estado.get("etag") or estado.get("last_modified")
     for intento in range(1, MAX_REINTENTOS + 1):
+        desde = parcial.stat().st_size if parcial.exists() else 0
+        headers = dict(HEADERS)
+        if desde and validador:
+            headers["Range"] = f"bytes={desde}-"
+            headers["If-Range"] = validador
+        elif desde:
+            desde = 0  # sin validador no se puede saber si el .part sigue siendo el mismo fichero
         try:
-            log.info(f"  [{year}] Descargando (intento {intento}/{MAX_REINTENTOS}): {url}")
-            with requests.get(url, headers=HEADERS, stream=True, timeout=TIMEOUT_DESCARGA) as r:
+            log.info(f"  [{year}] Descargando (intento {intento}/{MAX_REINTENTOS})"
+                     + (f" desde el byte {desde}" if desde else "") + f": {url}")
+            # reintentos=0: los reintentos los maneja este bucle, que retoma el
+            # .part; sin caché HTTP: el ZIP ya queda en TMP_DIR y usa Range
+            with HTTP.get(url, headers=headers, stream=True, timeout=TIMEOUT_DESCARGA,
+                          reintentos=0) as r:
                 if r.status_code == 503:
-                    espera = 10 * intento
-                    log.warning(f"  [{year}] 503 (rate limit probable) — esperando {espera}s")
+                    espera = segundos_retry_after(r, 10 * intento)
+                    log.warning(f"  [{year}] 503 (rate limit probable) — esperando {espera:.0f}s")
                     time.sleep(espera)
                     continue
-                if r.status_code != 200:
+                if r.status_code == 416:
+                    log.warning(f"  [{year}] 416 al reanudar — se descarta el .part y se empieza de cero")
+                    parcial.unlink(missing_ok=True)
+                    continue
+                if r.status_code not in (200, 206):
                     log.error(f"  [{year}] status {r.status_code} — se aborta este año")
                     return False
+                if r.status_code == 200:
+                    desde = 0  # el servidor ignoró el Range (o cambió el fichero): de cero
+                total = _total_de_respuesta(r, desde)
+                if total == -1:
+                    log.warning(f"  [{year}] Content-Range inesperado — se empieza de cero")
+                    parcial.unlink(missing_ok=True)
+                    continue
+                validador = r.headers.get("ETag") or r.headers.get("Last-Modified") or validador
+                _actualizar_manifest(manifest, year, estado="descargando", url=url,
+                                     etag=r.headers.get("ETag"),
+                                     last_modified=r.headers.get("Last-Modified"),
+                                     bytes_total=total)
                 destino.parent.mkdir(parents=True, exist_ok=True)
-                total = 0
-                with open(destino, "wb") as f:
+                with open(parcial, "ab" if desde else "wb") as f:
                     for chunk in r.iter_content(chunk_size=1024 * 1024):
                         if chunk:
                             f.write(chunk)
-                            total += len(chunk)
-                log.info(f"  [{year}] Descarga completa: {total / 1_048_576:.1f} MB")
-                return True
+            recibido = parcial.stat().st_size
+            if total is not None and recibido != total:
+                log.warning(f"  [{year}] Descarga incompleta: {recibido}/{total} bytes — se reanuda")
+                if recibido > total:
+                    parcial.unlink(missing_ok=True)
+                continue
+            if not _zip_valido(parcial):
+                log.warning(f"  [{year}] El ZIP descargado no tiene un directorio central válido — "
+                            f"se descarta y se reintenta")
+                parcial.unlink(missing_ok=True)
+                continue
+            parcial.replace(destino)
+            _actualizar_manifest(manifest, year, estado="descargado", bytes_total=recibido)
+            log.info(f"  [{year}] Descarga completa: {recibido / 1_048_576:.1f} MB"
+                     + (f" ({(recibido - desde) / 1_048_576:.1f} MB en este intento)" if desde else ""))
+            return True
         except requests.exceptions.RequestException as e:
             espera = 10 * intento
             log.warning(f"  [{year}] Error de red ({e}) — reintentando en {espera}s")
@@ -117,40 +264,223 @@ def _descargar_zip_anual(year: int, destino: Path) -> bool:
     return False
 
 
-# ── Procesamiento del ZIP ────────────────────────────────────────────────────
+# ── Medición de E/S y memoria ────────────────────────────────────────────────
 
-def _procesar_zip_anual(year: int, zip_path: Path) -> list:
-    """Extrae y parsea todos los .atom del ZIP, devuelve lista de contratos AECID."""
-    extract_dir = TMP_DIR / f"extract_{year}"
-    extract_dir.mkdir(parents=True, exist_ok=True)
+def _reiniciar_pico_rss() -> None:
+    """En Linux, escribir "5" en clear_refs reinicia VmHWM (pico de RSS),
+    así el pico que se loguea es el de cada año y no el del proceso entero.
+    En otros sistemas no hace nada y el pico es acumulado."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
 
-    contratos = []
+
+def _io_disco():
+    """(bytes leídos, bytes escritos) que el proceso llevó al disco según
+    /proc/self/io: read_bytes/write_bytes cuentan la E/S real contra el
+    almacenamiento, no lo que sirve la caché de páginas. None fuera de Linux."""
+    try:
+        campos = dict(linea.split(": ", 1) for linea in Path("/proc/self/io").read_text().splitlines())
+        return int(campos["read_bytes"]), int(campos["write_bytes"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _delta_io(antes):
+    despues = _io_disco()
+    if antes is None or despues is None:
+        return None
+    return despues[0] - antes[0], despues[1] - antes[1]
+
+
+def _pico_rss_mb():
+    try:
+        for linea in Path("/proc/self/status").read_text().splitlines():
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+# ── Procesamiento del ZIP ────────────────────────────────────────────────────
+
+def _listar_atoms(year: int, zip_path: Path):
+    """Abre el ZIP y devuelve (ZipFile, [infos .atom]), o None si está corrupto."""
     try:
-        with zipfile.ZipFile(zip_path) as z:
-            atom_files = [n for n in z.namelist() if n.endswith(".atom")]
-            log.info(f"  [{year}] {len(atom_files)} ficheros .atom dentro del ZIP")
-            z.extractall(extract_dir)
+        z = zipfile.ZipFile(zip_path)
     except zipfile.BadZipFile as e:
         log.error(f"  [{year}] ZIP corrupto o descarga incompleta ({e}) — se omite este año")
-        return []
+        return None
+    atoms = [info for info in z.infolist() if info.filename.endswith(".atom")]
+    log.info(f"  [{year}] {len(atoms)} ficheros .atom dentro del ZIP")
+    return z, atoms
+
+
+def _parsear_miembro(z: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Parsea un .atom leyéndolo desde el ZIP por bloques, sin extraerlo."""
+    with z.open(info) as fh:
+        chunks = iter(lambda: fh.read(CHUNK_STREAM), b"")
+        return _parsear_stream(chunks, errores="ignore")
 
-    for i, atom_name in enumerate(atom_files, 1):
+
+def _parsear_atom(zip_path: Path, atom_name: str, extract_dir: Path = None) -> list:
+    """Unidad de trabajo de un proceso del pool (--workers): parsea un .atom
+    (desde el ZIP, o desde extract_dir si ya se extrajo) y devuelve solo la
+    lista compacta de contratos AECID."""
+    if extract_dir is not None:
         atom_path = extract_dir / atom_name
         if not atom_path.exists():
-            continue
+            return []
+        return _parsear_pagina(atom_path.read_text(encoding="utf-8", errors="ignore"))[0]
+    with zipfile.ZipFile(zip_path) as z:
+        return _parsear_miembro(z, z.getinfo(atom_name))[0]
+
+
+def _parsear_atom_medido(zip_path: Path, atom_name: str, extract_dir: Path = None):
+    """_parsear_atom() con las métricas del proceso hijo que lo corre:
+    devuelve (contratos, (leídos, escritos) o None, pico RSS en MB)."""
+    _reiniciar_pico_rss()
+    io0 = _io_disco()
+    contratos = _parsear_atom(zip_path, atom_name, extract_dir)
+    return contratos, _delta_io(io0), _pico_rss_mb()
+
+
+def _enviar_zip_anual(year: int, zip_path: Path, modo: str, pool):
+    """Reparte los .atom del año entre los procesos de `pool` sin esperar
+    el resultado. Devuelve el trabajo pendiente para _recoger_zip_anual()."""
+    _reiniciar_pico_rss()
+    trabajo = {"year": year, "zip_path": zip_path, "modo": modo, "t0": time.perf_counter(),
+               "io0": _io_disco(), "atoms": [], "futuros": [], "escritos": 0}
+    abierto = _listar_atoms(year, zip_path)
+    if abierto is None:
+        return trabajo
+    z, atoms = abierto
+    extract_dir = None
+    with z:
+        if modo == "extraer":
+            extract_dir = TMP_DIR / f"extract_{year}"
+            extract_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                z.extractall(extract_dir)
+            except zipfile.BadZipFile as e:
+                log.error(f"  [{year}] ZIP corrupto o descarga incompleta ({e}) — se omite este año")
+                return trabajo
+            trabajo["escritos"] = sum(info.file_size for info in z.infolist())
+    trabajo["atoms"] = atoms
+    trabajo["futuros"] = [pool.submit(_parsear_atom_medido, zip_path, info.filename, extract_dir)
+                          for info in atoms]
+    return trabajo
+
+
+def _recoger_zip_anual(trabajo: dict) -> list:
+    """Espera los .atom de un año enviados al pool y junta sus contratos en
+    el mismo orden que el procesamiento secuencial."""
+    year, atoms = trabajo["year"], trabajo["atoms"]
+    contratos = []
+    io_workers, picos_workers = [], []
+    for i, (info, futuro) in enumerate(zip(atoms, trabajo["futuros"]), 1):
         try:
-            texto = atom_path.read_text(encoding="utf-8", errors="ignore")
-        except Exception as e:
-            log.warning(f"  [{year}] no se pudo leer {atom_name}: {e}")
+            datos, io, pico = futuro.result()
+        except (OSError, zipfile.BadZipFile) as e:
+            log.warning(f"  [{year}] no se pudo leer {info.filename}: {e}")
             continue
-        datos, _next, _fecha = _parsear_pagina(texto)
+        io_workers.append(io)
+        if pico is not None:
+            picos_workers.append(pico)
         if datos:
-            log.info(f"  [{year}] {atom_name}: {len(datos)} contratos AECID encontrados")
+            log.info(f"  [{year}] {info.filename}: {len(datos)} contratos AECID encontrados")
         contratos.extend(datos)
         if i % 50 == 0:
-            log.info(f"  [{year}] progreso: {i}/{len(atom_files)} ficheros procesados")
+            log.info(f"  [{year}] progreso: {i}/{len(atoms)} ficheros procesados")
+    # E/S del proceso principal (extracción en modo "extraer") más la de
+    # cada .atom en su worker; None si alguna no se pudo medir
+    io = _delta_io(trabajo["io0"])
+    if io is not None and all(w is not None for w in io_workers):
+        io = (io[0] + sum(w[0] for w in io_workers), io[1] + sum(w[1] for w in io_workers))
+    else:
+        io = None
+    leidos = trabajo["escritos"] if trabajo["modo"] == "extraer" else 0
+    _loguear_metricas(year, trabajo["modo"], trabajo["zip_path"], atoms, contratos,
+                      trabajo["t0"], io, trabajo["escritos"], leidos,
+                      pico_workers=max(picos_workers, default=None))
+    return contratos
 
+
+def _loguear_metricas(year, modo, zip_path, atoms, contratos, t0, io, escritos, leidos,
+                      pico_workers=None) -> None:
+    """Se llama al terminar el año, antes de que el siguiente reinicie el
+    pico de RSS. `io` es la E/S medida (leídos, escritos); si es None se
+    informa la estimación por tamaño de archivo (`escritos`, ZIP + `leidos`)."""
+    descomprimidos = sum(info.file_size for info in atoms)
+    pico = _pico_rss_mb()
+    pico_txt = f"{pico:.0f} MB" if pico is not None else "n/d"
+    if pico_workers is not None:
+        pico_txt = f"{pico_txt} proceso principal, {pico_workers:.0f} MB máx. por worker"
+    if io is not None:
+        leidos_mb, escritos_mb, origen = io[0] / 1_048_576, io[1] / 1_048_576, "/proc/self/io"
+    else:
+        zip_mb = zip_path.stat().st_size if zip_path.exists() else 0
+        leidos_mb, escritos_mb, origen = (zip_mb + leidos) / 1_048_576, escritos / 1_048_576, "estimado"
     log.info(f"  [{year}] TOTAL contratos AECID en {year}: {len(contratos)}")
+    log.info(f"  [{year}] modo={modo}: {descomprimidos / 1_048_576:.1f} MB de .atom en "
+             f"{time.perf_counter() - t0:.1f}s | disco ({origen}): {escritos_mb:.1f} MB escritos, "
+             f"{leidos_mb:.1f} MB leídos | pico RSS: {pico_txt}")
+
+
+def _procesar_zip_anual(year: int, zip_path: Path, modo: str = MODO_ZIP, pool=None) -> list:
+    """Parsea todos los .atom del ZIP, devuelve lista de contratos AECID.
+    Con `pool` (ProcessPoolExecutor) los .atom se reparten entre procesos."""
+    if pool is not None:
+        return _recoger_zip_anual(_enviar_zip_anual(year, zip_path, modo, pool))
+
+    _reiniciar_pico_rss()
+    t0 = time.perf_counter()
+    io0 = _io_disco()
+    abierto = _listar_atoms(year, zip_path)
+    if abierto is None:
+        return []
+    z, atoms = abierto
+
+    extract_dir = TMP_DIR / f"extract_{year}"
+    escritos = leidos = 0
+    contratos = []
+    with z:
+        if modo == "extraer":
+            extract_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                z.extractall(extract_dir)
+            except zipfile.BadZipFile as e:
+                log.error(f"  [{year}] ZIP corrupto o descarga incompleta ({e}) — se omite este año")
+                return []
+            escritos = sum(info.file_size for info in z.infolist())
+
+        for i, info in enumerate(atoms, 1):
+            atom_name = info.filename
+            try:
+                if modo == "extraer":
+                    atom_path = extract_dir / atom_name
+                    if not atom_path.exists():
+                        continue
+                    texto = atom_path.read_text(encoding="utf-8", errors="ignore")
+                    leidos += info.file_size
+                    datos, _next, _fecha = _parsear_pagina(texto)
+                    del texto
+                else:
+                    datos, _next, _fecha = _parsear_miembro(z, info)
+            except (OSError, zipfile.BadZipFile) as e:
+                log.warning(f"  [{year}] no se pudo leer {atom_name}: {e}")
+                continue
+            if datos:
+                log.info(f"  [{year}] {atom_name}: {len(datos)} contratos AECID encontrados")
+            contratos.extend(datos)
+            if i % 50 == 0:
+                log.info(f"  [{year}] progreso: {i}/{len(atoms)} ficheros procesados")
+
+    _loguear_metricas(year, modo, zip_path, atoms, contratos, t0, _delta_io(io0), escritos, leidos)
     return contratos
 
 
@@ -200,26 +530,93 @@ def _fusionar_y_guardar(nuevos: list, dry_run: bool) -> pd.DataFrame:
 
 # ── Orquestación ──────────────────────────────────────────────────────────────
 
-def backfill_masivo(years: list, dry_run: bool = False) -> pd.DataFrame:
-    log.info(f"Backfill histórico masivo — años: {years} (dry_run={dry_run})")
+def _limpiar_year(year: int, zip_path: Path) -> None:
+    # Limpieza inmediata para no acumular cientos de MB por año
+    zip_path.unlink(missing_ok=True)
+    shutil.rmtree(TMP_DIR / f"extract_{year}", ignore_errors=True)
+
+
+class _Fusion:
+    """Acumula lo encontrado año por año. Fuera de dry-run fusiona en el CSV
+    al cerrar cada año y lo marca "procesado" en el manifiesto, así un job
+    interrumpido no pierde los años ya terminados."""
+
+    def __init__(self, manifest: dict, dry_run: bool):
+        self.manifest = manifest
+        self.dry_run = dry_run
+        self.pendientes = []
+        self.resultado = None
+
+    def cerrar_year(self, year: int, zip_path: Path, contratos: list) -> None:
+        _limpiar_year(year, zip_path)
+        if self.dry_run:
+            self.pendientes.extend(contratos)
+            return
+        self.resultado = _fusionar_y_guardar(contratos, dry_run=False)
+        _actualizar_manifest(self.manifest, year, estado="procesado", contratos=len(contratos))
+
+    def terminar(self) -> pd.DataFrame:
+        if self.resultado is None or self.pendientes:
+            self.resultado = _fusionar_y_guardar(self.pendientes, self.dry_run)
+        return self.resultado
+
+
+def _backfill_paralelo(years: list, modo: str, workers: int, manifest: dict, fusion: _Fusion) -> None:
+    """Con --workers N: los .atom de cada año se reparten en un pool de N
+    procesos, y mientras se parsea el año N ya se descarga el N+1 (como
+    mucho hay 2 ZIP en disco). Cada año se recoge y se loguean sus métricas
+    antes de enviar el siguiente: si se solaparan en el pool, el pico de
+    RSS y la E/S de un año incluirían parte del otro."""
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=1) as descargas:
+        siguiente = descargas.submit(_descargar_zip_anual, years[0], TMP_DIR / f"{years[0]}.zip",
+                                     manifest=manifest)
+        for idx, year in enumerate(years):
+            zip_path = TMP_DIR / f"{year}.zip"
+            ok = siguiente.result()
+            if idx + 1 < len(years):
+                prox = years[idx + 1]
+                siguiente = descargas.submit(_descargar_zip_anual, prox, TMP_DIR / f"{prox}.zip",
+                                             manifest=manifest)
+            if ok:
+                fusion.cerrar_year(year, zip_path, _recoger_zip_anual(_enviar_zip_anual(year, zip_path, modo, pool)))
+
+
+def backfill_masivo(years: list, dry_run: bool = False, modo: str = MODO_ZIP,
+                    workers: int = 1, forzar: bool = False) -> pd.DataFrame:
+    log.info(f"Backfill histórico masivo — años: {years} (dry_run={dry_run}, modo={modo}, "
+             f"workers={workers})")
     TMP_DIR.mkdir(parents=True, exist_ok=True)
 
-    todos_nuevos = []
-    for year in years:
-        zip_path = TMP_DIR / f"{year}.zip"
-        ok = _descargar_zip_anual(year, zip_path)
-        if not ok:
-            continue
-        contratos = _procesar_zip_anual(year, zip_path)
-        todos_nuevos.extend(contratos)
-
-        # Limpieza inmediata para no acumular cientos de MB por año
-        zip_path.unlink(missing_ok=True)
-        shutil.rmtree(TMP_DIR / f"extract_{year}", ignore_errors=True)
-
-    resultado = _fusionar_y_guardar(todos_nuevos, dry_run)
-
-    shutil.rmtree(TMP_DIR, ignore_errors=True)
+    manifest = _cargar_manifest()
+    manifest["_persistir"] = not dry_run
+    if not forzar:
+        hechos = [y for y in years if manifest.get(str(y), {}).get("estado") == "procesado"]
+        if hechos:
+            log.info(f"  Años ya procesados según {PATH_MANIFEST.name}: {hechos} — se saltean "
+                     f"(--forzar para repetirlos)")
+        years = [y for y in years if y not in hechos]
+
+    fusion = _Fusion(manifest, dry_run)
+    if workers > 1 and years:
+        _backfill_paralelo(years, modo, workers, manifest, fusion)
+    else:
+        for year in years:
+            zip_path = TMP_DIR / f"{year}.zip"
+            ok = _descargar_zip_anual(year, zip_path, manifest=manifest)
+            if not ok:
+                continue
+            contratos = _procesar_zip_anual(year, zip_path, modo)
+            fusion.cerrar_year(year, zip_path, contratos)
+
+    resultado = fusion.terminar()
+    HTTP.loguear_metricas()
+
+    parciales = sorted(p.name for p in TMP_DIR.glob("*.part"))
+    if parciales:
+        log.info(f"  Se conservan descargas parciales para reanudar: {parciales}")
+    else:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
     return resultado
 
 
@@ -231,8 +628,17 @@ if __name__ == "__main__":
                          help="Años a descargar (default: 2021 2022 2023 2024, rango de los fondos AECID)")
     parser.add_argument("--dry-run", action="store_true",
                          help="No escribe el CSV, solo informa cuántos contratos se hubieran encontrado")
+    parser.add_argument("--modo", choices=["stream", "extraer"], default=MODO_ZIP,
+                         help="stream: parsea cada .atom desde el ZIP sin extraerlo (default); "
+                              "extraer: extrae a disco y parsea cada fichero completo")
+    parser.add_argument("--workers", type=int, default=1,
+                         help="Procesos para parsear los .atom en paralelo (default: 1, secuencial). "
+                              "Con N > 1 además se descarga el año siguiente mientras se parsea el actual")
+    parser.add_argument("--forzar", action="store_true",
+                         help="Reprocesa también los años que el manifiesto marca como ya procesados")
     args = parser.parse_args()
 
-    df = backfill_masivo(args.years, dry_run=args.dry_run)
+    df = backfill_masivo(args.years, dry_run=args.dry_run, modo=args.modo, workers=args.workers,
+                         forzar=args.forzar)
     if not df.empty:
         print(df[["fecha", "titulo", "organismo", "tipo_procedimiento", "importe_eur"]].tail(20))
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+benchmarks/bench_aecid_concurrencia.py
+======================================
+Tiempo de pared de _scrape_lista_intervenciones() según la concurrencia,
+contra un servidor local que imita /lista-de-intervenciones (mismo HTML
+que parsea _parsear_fila) con una latencia fija por página.
+
+Uso:
+    python benchmarks/bench_aecid_concurrencia.py
+    python benchmarks/bench_aecid_concurrencia.py --latencia 0.3 --total 830
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+import scraper_aecid  # noqa: E402
+
+
+def _fila_html(i: int) -> str:
+    return (
+        "<tr>"
+        f'<td class="titulo"><a href="/w/z11-25-01-{i:05d}">Intervención {i}</a></td>'
+        f'<td data-label="Entidad">Entidad {i % 40}</td>'
+        '<td data-label="Sectores"><span>15180 - Violencia de género</span></td>'
+        '<td data-label="País"><span>Bolivia</span><span>México</span></td>'
+        '<td data-label="Importe">800.000</td>'
+        "</tr>"
+    )
+
+
+def _servidor(total: int, latencia: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            qs = parse_qs(urlparse(self.path).query)
+            delta = int(qs.get("delta", ["60"])[0])
+            start = int(qs.get("start", ["1"])[0])
+            desde = (start - 1) * delta
+            filas = "".join(_fila_html(i) for i in range(desde, min(desde + delta, total)))
+            html = (f"<html><body><p>Mostrando de {desde + 1} a {desde + delta} de {total} resultados</p>"
+                    f'<table class="tabla-resultados"><tbody>{filas}</tbody></table></body></html>')
+            time.sleep(latencia)
+            cuerpo = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=830, help="Registros del listado simulado")
+    parser.add_argument("--latencia", type=float, default=0.25, help="Segundos de latencia por página")
+    parser.add_argument("--rps", type=float, default=20.0, help="Presupuesto de peticiones por segundo")
+    parser.add_argument("--concurrencias", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    srv = _servidor(args.total, args.latencia)
+    scraper_aecid.LISTADO_URL = f"http://127.0.0.1:{srv.server_address[1]}/lista-de-intervenciones"
+
+    print(f"Listado simulado: {args.total} registros, latencia {args.latencia}s/página, rps={args.rps}")
+    print(f"{'concurrencia':>12} | {'filas':>6} | {'tiempo (s)':>10}")
+    for c in args.concurrencias:
+        t0 = time.perf_counter()
+        df = scraper_aecid._scrape_lista_intervenciones(concurrencia=c, rps=args.rps)
+        dt = time.perf_counter() - t0
+        print(f"{c:>12} | {len(df):>6} | {dt:>10.2f}")
+
+    # Referencia: comportamiento secuencial anterior (una página cada 0.4 s)
+    t0 = time.perf_counter()
+    df = scraper_aecid._scrape_lista_intervenciones(concurrencia=1, rps=2.5)
+    print(f"{'1 @2.5rps':>12} | {len(df):>6} | {time.perf_counter() - t0:>10.2f}   (secuencial anterior)")
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
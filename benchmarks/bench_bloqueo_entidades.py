@@ -0,0 +1,117 @@
+"""
+benchmarks/bench_bloqueo_entidades.py
+=====================================
+Recall y aceleración del índice de bloqueo (cruce_entidades.IndiceBloqueo)
+frente al cruce exhaustivo, para el cruce AECID↔BDNS por entidad.
+
+Las consultas son las entidades reales de data/raw/aecid_intervenciones.csv.
+Los candidatos son los beneficiarios institucionales reales de
+data/raw/bdns_concesiones.csv, más variantes ruidosas de ellos (erratas,
+abreviaturas, palabras de más o de menos), más organizaciones ficticias con
+la estructura de las reales ("FUNDACION <nombre inventado> PARA EL
+DESARROLLO"), hasta el tamaño pedido. Así la frecuencia de los tokens
+genéricos se parece a la de una BDNS grande.
+
+De las consultas cuyo mejor match exhaustivo supera `umbral`:
+  - conservados: cuántas siguen teniendo un match >= umbral con bloqueo
+    (el filtro es exacto: debe ser 100%),
+  - idénticos: cuántas obtienen exactamente el mismo candidato y score.
+"candidatos/consulta" es el tamaño medio del conjunto que se puntúa.
+
+Uso:
+    python benchmarks/bench_bloqueo_entidades.py
+    python benchmarks/bench_bloqueo_entidades.py --tamanos 20000 100000 --umbral 80
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from cruce_entidades import IndiceBloqueo, mejor_coincidencia  # noqa: E402
+from scraper_bdns import _normalizar  # noqa: E402
+
+ABREVIATURAS = {"ASOCIACION": "ASOC", "FUNDACION": "FUND", "COOPERACION": "COOP",
+                "DESARROLLO": "DES", "INTERNACIONAL": "INTERNAC"}
+
+
+def _variante(nombre: str, rnd: random.Random) -> str:
+    tokens = nombre.split()
+    op = rnd.randrange(4)
+    if op == 0 and tokens:  # errata en un token
+        i = rnd.randrange(len(tokens))
+        t = tokens[i]
+        if len(t) > 3:
+            j = rnd.randrange(len(t))
+            tokens[i] = t[:j] + rnd.choice("AEIOURSTN") + t[j + 1:]
+    elif op == 1:  # abreviatura
+        tokens = [ABREVIATURAS.get(t, t) for t in tokens]
+    elif op == 2:  # palabra de más
+        tokens.insert(rnd.randrange(len(tokens) + 1), rnd.choice(["ESPANA", "ONGD", "DELEGACION", "MADRID"]))
+    elif tokens:  # palabra de menos
+        tokens.pop(rnd.randrange(len(tokens)))
+    return " ".join(tokens)
+
+
+def _palabra(rnd: random.Random) -> str:
+    silabas = ["BA", "CO", "DE", "LI", "MA", "NO", "RA", "SE", "TI", "VU", "XA", "ZEN", "TRO", "PLA"]
+    return "".join(rnd.choice(silabas) for _ in range(rnd.randint(2, 4)))
+
+
+def _candidatos(reales: list, n: int, semilla: int = 7) -> list:
+    """Beneficiarios reales + variantes ruidosas + organizaciones ficticias
+    con la misma estructura que las reales pero otro nombre propio (los
+    tokens distintivos de un nombre real se cambian por palabras inventadas)."""
+    rnd = random.Random(semilla)
+    frecuencia = Counter(t for nombre in reales for t in set(nombre.split()))
+    salida = list(reales)
+    salida += [_variante(rnd.choice(reales), rnd) for _ in range(min(len(reales) * 3, n // 4))]
+    while len(salida) < n:
+        tokens = [_palabra(rnd) if frecuencia[t] <= 3 else t for t in rnd.choice(reales).split()]
+        salida.append(" ".join(tokens))
+    rnd.shuffle(salida)
+    return salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--umbral", type=int, default=80)
+    args = parser.parse_args()
+
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_conc = pd.read_csv(ROOT / "data" / "raw" / "bdns_concesiones.csv")
+    consultas = [_normalizar(e) for e in df_aecid["entidad"].fillna("")]
+    reales = list(dict.fromkeys(_normalizar(b) for b in
+                                df_conc.loc[~df_conc["es_persona_fisica"], "beneficiario"]))
+
+    print(f"Consultas: {len(consultas)} ({len(set(consultas))} únicas), umbral {args.umbral}")
+    print(f"{'candidatos':>10} | {'exhaustivo (s)':>14} | {'bloqueo (s)':>11} | {'x':>5} | "
+          f"{'cand./consulta':>14} | {'matches':>7} | {'conservados':>11} | {'idénticos':>9}")
+    for n in args.tamanos:
+        candidatos = _candidatos(reales, n)
+        t0 = time.perf_counter()
+        s_exh, i_exh = mejor_coincidencia(consultas, candidatos, bloqueo=False)
+        t_exh = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        s_blq, i_blq = mejor_coincidencia(consultas, candidatos, bloqueo=True, umbral=args.umbral)
+        t_blq = time.perf_counter() - t0
+
+        indice = IndiceBloqueo(list(dict.fromkeys(candidatos)))
+        unicas = [q for q in dict.fromkeys(consultas) if q]
+        por_consulta = sum(len(indice.candidatos_de(q, args.umbral)) for q in unicas) / len(unicas)
+        matches = s_exh >= args.umbral
+        conservados = (s_blq >= args.umbral)[matches].mean()
+        identicos = ((s_blq == s_exh) & (i_blq == i_exh))[matches].mean()
+        print(f"{n:>10} | {t_exh:>14.2f} | {t_blq:>11.2f} | {t_exh / t_blq:>5.1f} | "
+              f"{por_consulta:>14.0f} | {int(matches.sum()):>7} | {conservados:>11.2%} | {identicos:>9.2%}")
+
+if __name__ == "__main__":
+    main()
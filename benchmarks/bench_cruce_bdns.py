@@ -0,0 +1,74 @@
+"""
+benchmarks/bench_cruce_bdns.py
+==============================
+Tiempo de scraper_bdns.cruzar_con_aecid() (cdist por bloques sobre nombres
+únicos) frente al doble bucle original, con los CSV reales de data/raw y
+con el lado BDNS inflado sintéticamente (variantes de los beneficiarios
+reales) para ver cómo escala a 100k+ concesiones.
+
+Uso:
+    python benchmarks/bench_cruce_bdns.py
+    python benchmarks/bench_cruce_bdns.py --tamanos 1000 20000 100000 --sin-bucle
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from rapidfuzz import fuzz
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+import scraper_bdns  # noqa: E402
+
+
+def _doble_bucle(df_concesiones, df_aecid) -> None:
+    inst = df_concesiones[~df_concesiones["es_persona_fisica"]]
+    beneficiarios = inst["beneficiario"].apply(scraper_bdns._normalizar).tolist()
+    for entidad in df_aecid["entidad"].fillna(""):
+        entidad_norm = scraper_bdns._normalizar(entidad)
+        if entidad_norm:
+            max(fuzz.token_sort_ratio(entidad_norm, b) for b in beneficiarios)
+
+
+def _inflar(df_conc: pd.DataFrame, n: int) -> pd.DataFrame:
+    """n concesiones institucionales: los beneficiarios reales con un sufijo
+    distinto (nombres únicos, como en una BDNS grande)."""
+    base = df_conc[~df_conc["es_persona_fisica"]].reset_index(drop=True)
+    filas = base.iloc[[i % len(base) for i in range(n)]].reset_index(drop=True)
+    filas["beneficiario"] = [f"{b} DELEGACION {i // len(base)}" if i >= len(base) else b
+                             for i, b in enumerate(filas["beneficiario"])]
+    filas["cod_concesion"] = [f"SB{i}" for i in range(n)]
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Concesiones institucionales sintéticas")
+    parser.add_argument("--sin-bucle", action="store_true", help="No medir el doble bucle (lento)")
+    args = parser.parse_args()
+
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_conc = pd.read_csv(ROOT / "data" / "raw" / "bdns_concesiones.csv")
+    casos = [("real", df_conc)] + [(str(n), _inflar(df_conc, n)) for n in args.tamanos]
+
+    print(f"AECID: {len(df_aecid)} intervenciones ({df_aecid['entidad'].nunique()} entidades únicas)")
+    print(f"{'BDNS':>8} | {'cdist (s)':>9} | {'doble bucle (s)':>15}")
+    for nombre, conc in casos:
+        t0 = time.perf_counter()
+        scraper_bdns.cruzar_con_aecid(conc, df_aecid)
+        t_cdist = time.perf_counter() - t0
+        t_bucle = "-"
+        if not args.sin_bucle and len(conc) <= 10_000:
+            t0 = time.perf_counter()
+            _doble_bucle(conc, df_aecid)
+            t_bucle = f"{time.perf_counter() - t0:.2f}"
+        print(f"{nombre:>8} | {t_cdist:>9.2f} | {t_bucle:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+benchmarks/bench_cruce_place.py
+===============================
+Búsqueda de países en los títulos PLACE para el cruce AECID↔PLACE:
+scraper_place.paises_por_titulo (una sola regex, una pasada) frente a la
+versión anterior (una regex \\b<país>\\b por país y por título). Usa los
+títulos reales de data/raw/place_contratos.csv, replicados hasta el
+tamaño pedido para aproximar el histórico PLACE de todos los sectores.
+
+Uso:
+    python benchmarks/bench_cruce_place.py
+    python benchmarks/bench_cruce_place.py --tamanos 10000 1000000
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+import scraper_place  # noqa: E402
+
+
+def _por_pais(titulos: list, paises) -> list:
+    patrones = {p: re.compile(r"\b" + re.escape(p) + r"\b", re.IGNORECASE) for p in paises}
+    return [{p for p, pat in patrones.items() if pat.search(t)} for t in titulos]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_place = pd.read_csv(ROOT / "data" / "raw" / "place_contratos.csv")
+    paises = scraper_place.paises_conocidos(df_aecid["pais_region"])
+    reales = df_place["titulo"].fillna("").astype(str).tolist()
+    print(f"{len(paises)} países, {len(reales)} títulos reales")
+    print(f"{'títulos':>9} | {'por país (s)':>12} | {'una pasada (s)':>14} | {'x':>5} | {'idénticos':>9}")
+    for n in [len(reales)] + args.tamanos:
+        titulos = [reales[i % len(reales)] for i in range(n)]
+        t0 = time.perf_counter()
+        antes = _por_pais(titulos, paises)
+        t_antes = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ahora = scraper_place.paises_por_titulo(titulos, paises)
+        t_ahora = time.perf_counter() - t0
+        print(f"{n:>9} | {t_antes:>12.2f} | {t_ahora:>14.2f} | {t_antes / t_ahora:>5.1f} | "
+              f"{str(antes == ahora):>9}")
+
+
+if __name__ == "__main__":
+    main()
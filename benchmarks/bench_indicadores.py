@@ -0,0 +1,80 @@
+"""
+benchmarks/bench_indicadores.py
+===============================
+indicadores_riesgo: SOG / RES / VIA vectorizados frente a la versión fila
+a fila (df.apply con calcular_fila y el lambda por eslabón), y el tiempo
+total de calcular_scores_completos, sobre fondos sintéticos armados a
+partir del último análisis real (data/processed/trazabilidad_por_fondo.csv).
+
+Uso:
+    python benchmarks/bench_indicadores.py
+    python benchmarks/bench_indicadores.py --tamanos 100000 1000000 --max-filas 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from indicadores_riesgo import (  # noqa: E402
+    CalculadorRES, CalculadorSOG, CalculadorVIA, calcular_scores_completos,
+)
+from trazabilidad_score import ESLABON_SCORE  # noqa: E402
+
+
+def _fondos(base: pd.DataFrame, n: int, semilla: int = 7) -> pd.DataFrame:
+    rnd = np.random.default_rng(semilla)
+    df = base.iloc[np.arange(n) % len(base)].reset_index(drop=True)
+    df["ruptura_r2"] = rnd.random(n) < 0.5
+    df["ruptura_r3"] = rnd.random(n) < 0.5
+    df["adjudicacion_directa"] = rnd.random(n) < 0.1
+    df["eslabon_corte"] = rnd.integers(1, 8, n)
+    return df
+
+
+def _por_filas(df: pd.DataFrame) -> None:
+    df.apply(CalculadorSOG().calcular_fila, axis=1)
+    max_score = max(ESLABON_SCORE.values())
+    df["eslabon_corte"].apply(lambda e: round((1 - ESLABON_SCORE.get(int(e), 0) / max_score) * 100, 1))
+
+
+def _vectorizado(df: pd.DataFrame) -> None:
+    CalculadorSOG().calcular(df)
+    CalculadorRES().calcular(df)
+    CalculadorVIA().calcular(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-filas", type=int, default=100_000,
+                        help="No medir la versión fila a fila por encima de este tamaño (lento)")
+    args = parser.parse_args()
+
+    base = pd.read_csv(ROOT / "data" / "processed" / "trazabilidad_por_fondo.csv")
+
+    print(f"{'fondos':>9} | {'filas SOG+RES (s)':>17} | {'SOG+RES+VIA (s)':>15} | {'scores completos (s)':>20}")
+    for n in args.tamanos:
+        df = _fondos(base, n)
+        t0 = time.perf_counter()
+        _vectorizado(df)
+        t_vec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        calcular_scores_completos(df)
+        t_total = time.perf_counter() - t0
+        t_filas = "-"
+        if n <= args.max_filas:
+            t0 = time.perf_counter()
+            _por_filas(df)
+            t_filas = f"{time.perf_counter() - t0:.2f}"
+        print(f"{n:>9} | {t_filas:>17} | {t_vec:>15.3f} | {t_total:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+benchmarks/bench_place_parser.py
+================================
+Compara los dos backends de parseo de páginas del feed PLACE
+(scraper_place._parsear_pagina vs _parsear_stream): throughput y pico
+de memoria residente (RSS). Cada backend corre en un proceso aparte para
+que el pico de uno no contamine la medición del otro.
+
+Uso:
+    # Sobre una página real capturada del feed (recomendado)
+    curl -o /tmp/feed.atom https://contrataciondelestado.es/sindicacion/sindicacion_643/licitacionesPerfilesContratanteCompleto3.atom
+    python benchmarks/bench_place_parser.py --feed /tmp/feed.atom
+
+    # Sin captura: genera una página sintética de tamaño parecido (~15 MB)
+    python benchmarks/bench_place_parser.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _feed_sintetico(destino: Path, n_entradas: int = 500, relleno: int = 28_000) -> None:
+    """Página con la forma del feed real: entradas de ~30 KB (la mayor parte
+    es el bloque ContractFolderStatus) y una de cada 50 de AECID."""
+    bloque = "<cbc:Note>" + "x" * relleno + "</cbc:Note>"
+    with open(destino, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                '<link href="https://contrataciondelestado.es/sindicacion/p2.atom" rel="next"/>')
+        for i in range(n_entradas):
+            organo = ("Dirección de la Agencia Española de Cooperación Internacional para el Desarrollo (AECID)"
+                      if i % 50 == 0 else f"Ayuntamiento número {i}")
+            f.write(
+                f"<entry><id>https://contrataciondelestado.es/sindicacion/licitacionesPerfilContratante/{i}</id>"
+                f'<link href="https://contrataciondelestado.es/wps/poc?uri=deeplink:detalle_licitacion&amp;idEvl={i}"/>'
+                f'<summary type="text">Id licitación: {i}; Órgano de Contratación: {organo}; '
+                f"Importe: 1.000,00 EUR; Estado: ADJ</summary>"
+                f"<title>Servicio {i} en Bolivia</title><updated>2026-06-01T10:00:00Z</updated>"
+                f"<cac-place-ext:ContractFolderStatus>{bloque}</cac-place-ext:ContractFolderStatus></entry>"
+            )
+        f.write("</feed>")
+
+
+def _medir(backend: str, feed: Path, repeticiones: int) -> dict:
+    """Se ejecuta en el proceso hijo."""
+    import scraper_place
+
+    tamano = feed.stat().st_size
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        if backend == "regex":
+            texto = feed.read_text(encoding="utf-8", errors="replace")
+            datos, _next, _fecha = scraper_place._parsear_pagina(texto)
+            del texto
+        else:
+            with open(feed, "rb") as fh:
+                chunks = iter(lambda: fh.read(scraper_place.CHUNK_STREAM), b"")
+                datos, _next, _fecha = scraper_place._parsear_stream(chunks)
+    dt = (time.perf_counter() - t0) / repeticiones
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    return {"backend": backend, "segundos": dt, "mb_s": tamano / 1_048_576 / dt,
+            "contratos": len(datos), "pico_rss_mb": pico_kb / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feed", type=Path, help="Página .atom capturada del feed")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--_hijo", choices=["regex", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._hijo:
+        print(json.dumps(_medir(args._hijo, args.feed, args.repeticiones)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = args.feed
+        if feed is None:
+            feed = Path(tmp) / "feed_sintetico.atom"
+            _feed_sintetico(feed)
+        print(f"Página: {feed} ({feed.stat().st_size / 1_048_576:.1f} MB)")
+        print(f"{'backend':>8} | {'s/página':>9} | {'MB/s':>7} | {'contratos':>9} | {'pico RSS (MB)':>13}")
+        for backend in ("regex", "stream"):
+            salida = subprocess.run(
+                [sys.executable, __file__, "--feed", str(feed), "--repeticiones", str(args.repeticiones),
+                 "--_hijo", backend],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            m = json.loads(salida)
+            print(f"{m['backend']:>8} | {m['segundos']:>9.3f} | {m['mb_s']:>7.1f} | "
+                  f"{m['contratos']:>9} | {m['pico_rss_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+benchmarks/bench_trazabilidad.py
+================================
+ModeloTrazabilidad.analizar_dataframe: motor por filas (df.apply, la
+referencia) frente al motor columnar, sobre fondos sintéticos armados a
+partir de las intervenciones reales (data/raw/aecid_intervenciones.csv)
+con en_place / en_bdns / id_bdns variados, contra los contratos PLACE
+reales. Comprueba además que ambos motores den exactamente lo mismo.
+
+Uso:
+    python benchmarks/bench_trazabilidad.py
+    python benchmarks/bench_trazabilidad.py --tamanos 10000 100000 1000000 --max-filas 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from trazabilidad_score import ModeloTrazabilidad  # noqa: E402
+
+
+def _fondos(base: pd.DataFrame, n: int, semilla: int = 7) -> pd.DataFrame:
+    rnd = np.random.default_rng(semilla)
+    df = base.iloc[np.arange(n) % len(base)].reset_index(drop=True)
+    df["id"] = [f"F{i}" for i in range(n)]
+    df["en_place"] = rnd.random(n) < 0.3
+    df["en_bdns"] = rnd.random(n) < 0.25
+    df["id_bdns"] = np.where(df["en_bdns"], "SB1", "")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-filas", type=int, default=100_000,
+                        help="No medir el motor por filas por encima de este tamaño (lento)")
+    args = parser.parse_args()
+
+    base = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_place = pd.read_csv(ROOT / "data" / "raw" / "place_contratos.csv")
+    modelo = ModeloTrazabilidad(df_place=df_place)
+
+    print(f"{'fondos':>9} | {'filas (s)':>9} | {'columnas (s)':>12} | {'x':>6} | {'idénticos':>9}")
+    for n in args.tamanos:
+        df = _fondos(base, n)
+        t0 = time.perf_counter()
+        columnas = modelo.analizar_dataframe(df, motor="columnas")
+        t_col = time.perf_counter() - t0
+        t_filas, x, iguales = "-", "-", "-"
+        if n <= args.max_filas:
+            t0 = time.perf_counter()
+            filas = modelo.analizar_dataframe(df, motor="filas")
+            dt = time.perf_counter() - t0
+            t_filas, x, iguales = f"{dt:.2f}", f"{dt / t_col:.1f}", str(columnas.equals(filas))
+        print(f"{n:>9} | {t_filas:>9} | {t_col:>12.2f} | {x:>6} | {iguales:>9}")
+
+
+if __name__ == "__main__":
+    main()
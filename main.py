@@ -20,6 +20,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
+from src.gazetteer import resolver_serie
+
 ROOT = Path(__file__).parent
 DATA_DIR = Path("/app/data") if Path("/app").exists() else ROOT / "data"
 DATA_PRO = DATA_DIR / "processed"
@@ -1596,12 +1598,7 @@ def mensual():
             evol.columns = ["mes", "importe"]
             mensual_region[str(region)] = evol.to_dict(orient="records")
     elif "pais_region" in df.columns:
-        df["region_inf"] = df["pais_region"].apply(lambda p: (
-            "América Latina" if any(x in str(p) for x in ["Bolivia","Colombia","Ecuador","Guatemala","Honduras","México","Nicaragua","Perú","Cuba","Haití"]) else
-            "África" if any(x in str(p) for x in ["Etiopía","Mozambique","Mali","Niger","Senegal","Chad","Kenya"]) else
-            "MENA" if any(x in str(p) for x in ["Marruecos","Túnez","Jordania","Líbano","Palestina","Siria","Yemen"]) else
-            "Multipaís/Global"
-        ))
+        df["region_inf"] = resolver_serie(df["pais_region"], "region_dashboard")
         for region, grp in df.groupby("region_inf"):
             evol = grp.groupby("mes")["importe_num"].sum().reset_index()
             evol.columns = ["mes", "importe"]
@@ -1,8 +1,11 @@
-import requests
 import pandas as pd
 import os
+import sys
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from cliente_http import HTTP  # noqa: E402
+
 def ejecutar_monitor():
     # ==========================================
     # DIRECTORIOS CON ARCHIVADO MENSUAL
@@ -31,7 +34,7 @@ def ejecutar_monitor():
     df_boe = pd.DataFrame()
 
     try:
-        r_boe = requests.get(url_boe, params=params_boe, headers=headers, timeout=30)
+        r_boe = HTTP.get(url_boe, params=params_boe, headers=headers, usar_cache=True)
         if r_boe.status_code == 200:
             items = r_boe.json().get("data", [])
             df_boe = pd.DataFrame([{
@@ -60,7 +63,7 @@ def ejecutar_monitor():
         try:
             # API de contratación del sector público español
             url_contrat = "https://contrataciondelestado.es/sindicacion/sindicacion_643/licitacionesPerfilesContratanteCompleto3.atom"
-            r_cont = requests.get(url_contrat, headers=headers, timeout=30)
+            r_cont = HTTP.get(url_contrat, headers=headers)
             if r_cont.status_code == 200:
                 import re
                 entries = re.findall(r"<entry>(.*?)</entry>", r_cont.text, re.DOTALL)
@@ -17,13 +17,25 @@ Uso:
     # Año específico
     python pipeline.py --años 2022 2023 2024
 
-    # Sin descargar datos (modo offline)
-    python pipeline.py --offline
+    # Sin tocar la red: AECID y BDNS se reproducen desde la caché HTTP
+    # (data/raw/_http_cache) de corridas anteriores; PLACE no se cachea y
+    # se queda con su CSV previo
+    python pipeline.py --forzar --offline
+
+    # Recalcular todos los pasos de análisis aunque sus entradas no hayan
+    # cambiado (ver src/cache_pasos.py)
+    python pipeline.py --solo-analisis --no-cache
+
+    # Pasos encadenados en memoria: los CSV de data/processed se escriben
+    # como salidas, en segundo plano, y ningún paso relee el del anterior
+    python pipeline.py --solo-analisis --en-memoria
 """
 
 import argparse
 import logging
+import re
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -37,32 +49,50 @@ DATA_RAW = ROOT / "data" / "raw"
 DATA_PRO = ROOT / "data" / "processed"
 REPORTS  = ROOT / "reports"
 
+# Salidas de los pasos de análisis
+CLEAN_CSV    = DATA_PRO / "intervenciones_clean.csv"
+TRAZ_CSV     = DATA_PRO / "trazabilidad_por_fondo.csv"
+ANALISIS_CSV = DATA_PRO / "analisis_completo.csv"
+SCORES_CSV   = DATA_PRO / "scores_riesgo.csv"
+INFORME_MD   = REPORTS / "informe_ejecutivo.md"
+
 for d in [DATA_RAW, DATA_PRO, REPORTS]:
     d.mkdir(parents=True, exist_ok=True)
 
 sys.path.insert(0, str(SRC))
 
+from cache_pasos        import CachePasos, EscritorSalidas
+from cliente_http       import HTTP
+from cruce_entidades    import CacheCruces
+from gazetteer          import resolver_serie
 from scraper_aecid      import run_scraper         as scrape_aecid
 from scraper_bdns       import (scrape_bdns, scrape_concesiones_aecid,
-                                 enriquecer_convocatorias_con_concesiones,
+                                 enriquecer_convocatorias_con_concesiones, guardar_watermark,
                                  cruzar_con_aecid as cruzar_bdns_con_aecid)
-from scraper_place      import scrape_place, detectar_adjudicacion_directa, cruzar_con_aecid
+from scraper_place      import scrape_place, detectar_adjudicacion_directa, cruzar_con_aecid, guardar_cursor
 from indicadores_riesgo import calcular_scores_completos, generar_resumen_global
+from paginacion         import ejecutar_fuentes
+from valores_distintos  import por_valor
 from src.trazabilidad_score import ModeloTrazabilidad
 
 # ── Logging ───────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%H:%M:%S",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(ROOT / "pipeline.log", encoding="utf-8"),
-    ],
-)
 log = logging.getLogger(__name__)
 
 
+def configurar_logging() -> None:
+    """Consola + pipeline.log. Solo al correr el script: importar pipeline
+    (p. ej. desde los tests) no toca el log."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(ROOT / "pipeline.log", encoding="utf-8"),
+        ],
+    )
+
+
 def cargar_params() -> dict:
     with open(ROOT / "config" / "params.yaml") as f:
         return yaml.safe_load(f)
@@ -72,51 +102,107 @@ def cargar_params() -> dict:
 # PASO 1: INGESTA DE DATOS
 # ══════════════════════════════════════════════════════════════════════════════
 
-def paso_ingesta(años: list[int], forzar: bool = False) -> dict[str, Path]:
+# Tiempo máximo de cada fuente en la ingesta concurrente (segundos). Una
+# fuente que lo supera se da por fallida y se sigue con su CSV anterior.
+TIMEOUT_FUENTE = {
+    "aecid":            20 * 60,
+    "bdns":             20 * 60,
+    "bdns_concesiones": 30 * 60,
+    "place":            45 * 60,   # feed PLACE + ZIPs anuales de ~15 MB
+}
+
+
+def paso_ingesta(años: list[int], forzar: bool = False,
+                 bdns_completo: bool = False) -> dict[str, Path]:
     """
     Descarga todas las fuentes. Si el archivo ya existe y forzar=False, lo omite.
+    Con forzar=True, las concesiones BDNS se actualizan de forma incremental
+    (solo lo posterior a la marca de agua) salvo que bdns_completo=True.
     Devuelve un dict {nombre: Path} con los archivos generados.
+
+    Las fuentes son independientes y se descargan a la vez (ejecutar_fuentes):
+    la ingesta tarda lo que la más lenta. Cada una tiene su TIMEOUT_FUENTE;
+    si falla o no termina a tiempo se loguea y se conserva su CSV anterior.
+    Las marcas de avance (marca de agua BDNS, cursor PLACE) se guardan solo
+    después de escribir el CSV de su fuente. Solo datos.aecid.es es
+    imprescindible: sin ella ni CSV previo, error, después de escribir lo
+    que sí se descargó.
     """
-    archivos = {}
+    archivos = {
+        "aecid":            DATA_RAW / "aecid_intervenciones.csv",
+        "bdns":             DATA_RAW / "bdns_subvenciones.csv",
+        "bdns_concesiones": DATA_RAW / "bdns_concesiones.csv",
+        "place":            DATA_RAW / "place_contratos.csv",
+    }
+    path_aecid, path_bdns = archivos["aecid"], archivos["bdns"]
+    path_concesiones, path_place = archivos["bdns_concesiones"], archivos["place"]
 
+    # Los trabajos solo descargan y devuelven DataFrames; los CSV se
+    # escriben acá, con todas las fuentes ya terminadas
+    trabajos = {}
     # 1a. Portal datos.aecid.es
-    path_aecid = DATA_RAW / "aecid_intervenciones.csv"
     if not path_aecid.exists() or forzar:
-        log.info("── Descargando datos.aecid.es...")
-        df = scrape_aecid(output_path=path_aecid)
-        log.info(f"   {len(df)} intervenciones → {path_aecid.name}")
+        trabajos["aecid"] = scrape_aecid
     else:
         log.info(f"   datos.aecid.es ya existe ({path_aecid.name}) — omitido")
-    archivos["aecid"] = path_aecid
-
     # 1b. BDNS — convocatorias + concesiones (beneficiario e importe real)
-    path_bdns = DATA_RAW / "bdns_subvenciones.csv"
-    path_concesiones = DATA_RAW / "bdns_concesiones.csv"
     if not path_bdns.exists() or forzar:
-        log.info("── Descargando BDNS (convocatorias + concesiones)...")
-        df_bdns = scrape_bdns()
-        df_concesiones = scrape_concesiones_aecid()
-        df_bdns = enriquecer_convocatorias_con_concesiones(df_bdns, df_concesiones)
-        df_bdns.to_csv(path_bdns, index=False, encoding="utf-8-sig")
-        df_concesiones.to_csv(path_concesiones, index=False, encoding="utf-8-sig")
-        log.info(f"   {len(df_bdns)} convocatorias, {len(df_concesiones)} concesiones → "
-                 f"{path_bdns.name}, {path_concesiones.name}")
+        trabajos["bdns"] = scrape_bdns
+        trabajos["bdns_concesiones"] = lambda: scrape_concesiones_aecid(
+            incremental=not bdns_completo and path_concesiones.exists(),
+            path_previo=path_concesiones,
+        )
     else:
         log.info(f"   BDNS ya existe — omitido")
-    archivos["bdns"] = path_bdns
-    archivos["bdns_concesiones"] = path_concesiones
-
     # 1c. PLACE — contratos adjudicados
-    path_place = DATA_RAW / "place_contratos.csv"
     if not path_place.exists() or forzar:
-        log.info("── Descargando PLACE / OCDS...")
-        df_place = scrape_place(years=años)
-        df_place = detectar_adjudicacion_directa(df_place)
-        df_place.to_csv(path_place, index=False, encoding="utf-8-sig")
-        log.info(f"   {len(df_place)} contratos → {path_place.name}")
+        def _place():
+            df_place, cursor = scrape_place(years=años)
+            return detectar_adjudicacion_directa(df_place), cursor
+        trabajos["place"] = _place
     else:
         log.info(f"   PLACE ya existe — omitido")
-    archivos["place"] = path_place
+
+    if trabajos:
+        log.info(f"── Descargando a la vez: {', '.join(trabajos)}...")
+    t0 = time.perf_counter()
+    res, errores, duraciones = ejecutar_fuentes(trabajos, TIMEOUT_FUENTE)
+    for nombre, error in errores.items():
+        previo = "se conserva el CSV anterior" if archivos[nombre].exists() else "sin CSV anterior"
+        log.error(f"   {nombre}: falló la descarga ({error}) — {previo}")
+
+    if "aecid" in res:
+        res["aecid"].to_csv(path_aecid, index=False, encoding="utf-8-sig")
+        log.info(f"   {len(res['aecid'])} intervenciones → {path_aecid.name}")
+
+    if "bdns_concesiones" in res:
+        df_concesiones = res["bdns_concesiones"]
+        df_concesiones.to_csv(path_concesiones, index=False, encoding="utf-8-sig")
+        guardar_watermark(df_concesiones)
+        log.info(f"   {len(df_concesiones)} concesiones → {path_concesiones.name}")
+    if "bdns" in res:
+        # Importes reales con las concesiones nuevas, o con las anteriores si
+        # su descarga falló
+        df_concesiones = res.get("bdns_concesiones")
+        if df_concesiones is None:
+            df_concesiones = pd.read_csv(path_concesiones) if path_concesiones.exists() else pd.DataFrame()
+        df_bdns = enriquecer_convocatorias_con_concesiones(res["bdns"], df_concesiones)
+        df_bdns.to_csv(path_bdns, index=False, encoding="utf-8-sig")
+        log.info(f"   {len(df_bdns)} convocatorias → {path_bdns.name}")
+
+    if "place" in res:
+        df_place, cursor = res["place"]
+        df_place.to_csv(path_place, index=False, encoding="utf-8-sig")
+        guardar_cursor(cursor)
+        log.info(f"   {len(df_place)} contratos → {path_place.name}")
+
+    if not path_aecid.exists():
+        raise RuntimeError(f"Sin datos de datos.aecid.es: {errores.get('aecid')}")
+
+    if trabajos:
+        log.info(f"   Ingesta: {time.perf_counter() - t0:.1f}s "
+                 f"(suma de fuentes {sum(duraciones.values()):.1f}s; "
+                 + ", ".join(f"{n} {d:.1f}s" for n, d in duraciones.items()) + ")")
 
     # 1d. Respuestas LTAIBG (archivo manual — si no existe, se crea vacío)
     path_ltaibg = DATA_RAW / "ltaibg_respuestas.csv"
@@ -129,6 +215,7 @@ def paso_ingesta(años: list[int], forzar: bool = False) -> dict[str, Path]:
         log.info(f"   Creado template LTAIBG → {path_ltaibg.name} (completar manualmente)")
     archivos["ltaibg"] = path_ltaibg
 
+    HTTP.loguear_metricas()
     return archivos
 
 
@@ -162,66 +249,81 @@ CRS_A_SECTOR = {
     "25": "Crecimiento Económico",
 }
 
-REGIONES = {
-    "América Latina y Caribe":    ["bolivia","colombia","ecuador","guatemala","honduras",
-                                    "méxico","mexico","nicaragua","perú","peru","cuba",
-                                    "haití","haiti","venezuela","paraguay","brasil",
-                                    "chile","argentina","costa rica","panamá","panama"],
-    "África Subsahariana":         ["etiopía","etiopia","kenya","mozambique","tanzania",
-                                    "uganda","malí","mali","níger","niger","senegal",
-                                    "ghana","nigeria","chad","ruanda","burkina","benín"],
-    "Norte de África y Oriente Medio": ["marruecos","túnez","tunez","argelia","egipto",
-                                         "jordania","líbano","libano","palestina","siria",
-                                         "irak","yemen","mauritania"],
-    "Asia":                        ["afghanistan","bangladés","filipinas","vietnam",
-                                    "myanmar","nepal","pakistan","cambodia","laos"],
-}
+# Código CRS principal: el primer número de cinco cifras de sectores_crs
+RE_CRS = re.compile(r"\d{5}")
+# Ámbito de cada prefijo de dos cifras posible, precalculado
+AMBITO_POR_PREFIJO = {f"{i:02d}": CRS_A_SECTOR.get(f"{i:02d}", f"Sector {i:02d}xx") for i in range(100)}
 
 
-def paso_limpieza(archivos: dict[str, Path]) -> Path:
-    """Carga, normaliza y enriquece el CSV de intervenciones AECID."""
-    import re
+def _normalizar_entidad(x) -> str:
+    return ENTIDADES_NORM.get(str(x).strip(), str(x).strip())
 
-    log.info("── Limpieza y normalización...")
-    df = pd.read_csv(archivos["aecid"])
-    orig = len(df)
 
-    # Normalizar entidades
-    df["entidad"] = df["entidad"].map(lambda x: ENTIDADES_NORM.get(str(x).strip(), str(x).strip()))
+def _crs_principal(sectores):
+    """Primer código CRS de cinco cifras de un valor de sectores_crs, o None."""
+    if sectores is None or (not isinstance(sectores, str) and pd.isna(sectores)):
+        return None
+    m = RE_CRS.search(str(sectores))
+    return m.group(0) if m else None
 
-    # Extraer código CRS principal
-    def primer_crs(s):
-        m = re.search(r"(\d{5})", str(s))
-        return m.group(1) if m else None
 
-    df["codigo_crs"] = df.get("sectores_crs", pd.Series(dtype=str)).apply(primer_crs)
-    df["ambito"] = df["codigo_crs"].apply(
-        lambda c: CRS_A_SECTOR.get(c[:2], f"Sector {c[:2]}xx") if c else "Sin clasificar"
-    )
+def _ambito(sectores) -> str:
+    crs = _crs_principal(sectores)
+    return AMBITO_POR_PREFIJO[crs[:2]] if crs else "Sin clasificar"
+
+
+def _normalizar_entidades(serie: pd.Series) -> pd.Series:
+    """ENTIDADES_NORM sobre str(x).strip(), una vez por valor distinto
+    (los nulos uno a uno: str(NaN) no es str(None))."""
+    valores = por_valor(serie, _normalizar_entidad, dtype=object)
+    return pd.Series(valores, index=serie.index, name=serie.name).infer_objects()
 
-    # Clasificar región
-    def region(pais):
-        if pd.isna(pais):
-            return "No Especificado"
-        pais_l = str(pais).lower()
-        for reg, paises in REGIONES.items():
-            if any(p in pais_l for p in paises):
-                return reg
-        if any(p in pais_l for p in ["no especificado", "ne -", "países en vías"]):
-            return "No Especificado"
-        return "Otras Regiones"
 
-    df["region_ocde"] = df["pais_region"].apply(region)
+def _crs_y_ambito(sectores: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """codigo_crs y ambito de cada fila, extraídos una vez por valor
+    distinto de sectores_crs."""
+    crs = por_valor(sectores, _crs_principal, dtype=object)
+    ambito = por_valor(sectores, _ambito, dtype=object)
+    return (pd.Series(crs, index=sectores.index).infer_objects(),
+            pd.Series(ambito, index=sectores.index).infer_objects())
+
+def limpiar(df: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza y enriquece las intervenciones AECID.
+
+    Cada transformación por texto (entidad, código CRS, ámbito, región) se
+    resuelve una vez por valor distinto y se reparte a las filas por código.
+    """
+    log.info("── Limpieza y normalización...")
+
+    # Normalizar entidades
+    t_norm = time.perf_counter()
+    df["entidad"] = _normalizar_entidades(df["entidad"])
+
+    # Extraer código CRS principal y su ámbito
+    sectores = df["sectores_crs"] if "sectores_crs" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    df["codigo_crs"], df["ambito"] = _crs_y_ambito(sectores)
+
+    # Clasificar región (una vez por valor distinto de pais_region, ver gazetteer.py)
+    df["region_ocde"] = resolver_serie(df["pais_region"], "region")
 
     # Limpieza de importes
     df["importe_eur"] = pd.to_numeric(df["importe_eur"], errors="coerce")
     nulos = df["importe_eur"].isna().sum()
     if nulos:
         log.warning(f"   {nulos} importes nulos")
+    t_norm = time.perf_counter() - t_norm
+    log.info(f"   {len(df)} registros limpios "
+             f"(normalización {t_norm:.2f}s, {len(df) / max(t_norm, 1e-9):,.0f} filas/s)")
+    return df
 
-    out = DATA_PRO / "intervenciones_clean.csv"
+
+def paso_limpieza(archivos: dict[str, Path]) -> Path:
+    """limpiar() sobre el CSV de intervenciones AECID → intervenciones_clean.csv"""
+    t0 = time.perf_counter()
+    df = limpiar(pd.read_csv(archivos["aecid"]))
+    out = CLEAN_CSV
     df.to_csv(out, index=False, encoding="utf-8-sig")
-    log.info(f"   {len(df)}/{orig} registros limpios → {out.name}")
+    log.info(f"   → {out.name} (paso completo con lectura/escritura {time.perf_counter() - t0:.2f}s)")
     return out
 
 
@@ -229,12 +331,10 @@ def paso_limpieza(archivos: dict[str, Path]) -> Path:
 # PASO 3: TRAZABILIDAD
 # ══════════════════════════════════════════════════════════════════════════════
 
-def paso_trazabilidad(archivos: dict[str, Path], clean_path: Path) -> Path:
-    """Aplica el modelo de 7 eslabones a cada intervención."""
+def trazar(df: pd.DataFrame, archivos: dict[str, Path]) -> pd.DataFrame:
+    """Aplica el modelo de 7 eslabones a cada intervención limpia."""
     log.info("── Análisis de trazabilidad (7 eslabones)...")
 
-    df = pd.read_csv(clean_path)
-
     # Cargar fuentes externas si existen
     df_place       = pd.read_csv(archivos["place"])            if archivos["place"].exists()            else pd.DataFrame()
     df_ltaibg      = pd.read_csv(archivos["ltaibg"])            if archivos["ltaibg"].exists()           else pd.DataFrame()
@@ -246,7 +346,8 @@ def paso_trazabilidad(archivos: dict[str, Path], clean_path: Path) -> Path:
 
     # Cruzar AECID ↔ BDNS (por entidad implementadora, ver scraper_bdns.py)
     if not df_concesiones.empty:
-        df = cruzar_bdns_con_aecid(df_concesiones, df)
+        df = cruzar_bdns_con_aecid(df_concesiones, df,
+                                   cache=CacheCruces(DATA_PRO / "cache_cruces_bdns.sqlite"))
 
     modelo = ModeloTrazabilidad(
         df_place=df_place,
@@ -261,8 +362,13 @@ def paso_trazabilidad(archivos: dict[str, Path], clean_path: Path) -> Path:
     log.info(f"   R1 ({resumen['n_ruptura_r1']} fondos): {resumen['pct_fondos_r1']}% del total")
     log.info(f"   R2 ({resumen['n_ruptura_r2']} fondos): {resumen['pct_fondos_r2']}% del total")
     log.info(f"   R3 ({resumen['n_ruptura_r3']} fondos): {resumen['pct_fondos_r3']}% del total")
+    return df_out
+
 
-    out = DATA_PRO / "trazabilidad_por_fondo.csv"
+def paso_trazabilidad(archivos: dict[str, Path], clean_path: Path) -> Path:
+    """trazar() sobre intervenciones_clean.csv → trazabilidad_por_fondo.csv"""
+    df_out = trazar(pd.read_csv(clean_path), archivos)
+    out = TRAZ_CSV
     df_out.to_csv(out, index=False, encoding="utf-8-sig")
     log.info(f"   → {out.name}")
     return out
@@ -272,11 +378,11 @@ def paso_trazabilidad(archivos: dict[str, Path], clean_path: Path) -> Path:
 # PASO 4: RIESGO CORRUPTIVO
 # ══════════════════════════════════════════════════════════════════════════════
 
-def paso_riesgo(traz_path: Path) -> Path:
-    """Calcula ICR, SOG, RES, VIA y score integrado por entidad."""
+def puntuar(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Calcula ICR, SOG, RES, VIA y score integrado por entidad. Devuelve
+    (scores por entidad, análisis completo por fondo)."""
     log.info("── Indicadores de riesgo corruptivo...")
 
-    df = pd.read_csv(traz_path)
     df_scores = calcular_scores_completos(df)
 
     # Score integrado: 60% riesgo + 40% trazabilidad invertida
@@ -292,17 +398,21 @@ def paso_riesgo(traz_path: Path) -> Path:
         labels=["VERDE", "AMARILLO", "NARANJA", "ROJO"]
     )
 
-    out_scores = DATA_PRO / "scores_riesgo.csv"
-    out_merged = DATA_PRO / "analisis_completo.csv"
-
-    df_scores.to_csv(out_scores, index=False, encoding="utf-8-sig")
-    df_merged.to_csv(out_merged, index=False, encoding="utf-8-sig")
-
     rojos = (df_merged["clasificacion"] == "ROJO").sum()
     fondos_rojos = df_merged[df_merged["clasificacion"] == "ROJO"]["importe_eur"].sum()
     log.info(f"   Clasificación ROJO: {rojos} fondos | {fondos_rojos/1e6:.1f} M€")
-    log.info(f"   → {out_scores.name} + {out_merged.name}")
+    return df_scores, df_merged
+
 
+def paso_riesgo(traz_path: Path) -> Path:
+    """puntuar() sobre trazabilidad_por_fondo.csv → scores_riesgo.csv +
+    analisis_completo.csv"""
+    df_scores, df_merged = puntuar(pd.read_csv(traz_path))
+
+    out_scores, out_merged = SCORES_CSV, ANALISIS_CSV
+    df_scores.to_csv(out_scores, index=False, encoding="utf-8-sig")
+    df_merged.to_csv(out_merged, index=False, encoding="utf-8-sig")
+    log.info(f"   → {out_scores.name} + {out_merged.name}")
     return out_merged
 
 
@@ -310,11 +420,10 @@ def paso_riesgo(traz_path: Path) -> Path:
 # PASO 5: INFORME
 # ══════════════════════════════════════════════════════════════════════════════
 
-def paso_informe(analisis_path: Path, archivos_raw: dict) -> Path:
-    """Genera el informe ejecutivo en Markdown."""
+def redactar_informe(df: pd.DataFrame, archivos_raw: dict) -> str:
+    """Informe ejecutivo en Markdown a partir del análisis completo."""
     log.info("── Generando informe ejecutivo...")
 
-    df = pd.read_csv(analisis_path)
     total = df["importe_eur"].sum()
     params = cargar_params()
 
@@ -422,13 +531,90 @@ def paso_informe(analisis_path: Path, archivos_raw: dict) -> Path:
 
 *Marco teórico: Fenómenos corruptivos — Economía Corruptiva (Dialnet, 2019)*
 """
+    return md
+
 
-    out = REPORTS / "informe_ejecutivo.md"
+def paso_informe(analisis_path: Path, archivos_raw: dict) -> Path:
+    """redactar_informe() sobre analisis_completo.csv → informe_ejecutivo.md"""
+    md = redactar_informe(pd.read_csv(analisis_path), archivos_raw)
+    out = INFORME_MD
     out.write_text(md, encoding="utf-8")
     log.info(f"   → {out.name}")
     return out
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# PASOS 2-5: ENCADENADOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _fuentes_trazabilidad(archivos: dict[str, Path]) -> list[Path]:
+    return [archivos["place"], archivos["ltaibg"], archivos["bdns_concesiones"]]
+
+
+def analisis_en_archivos(archivos: dict[str, Path], cache: CachePasos, params: dict,
+                         informe: bool = True) -> Path:
+    """Pasos 2-5 comunicados por los CSV de data/processed: cada paso
+    escribe su salida y el siguiente la relee."""
+    clean_path = cache.ejecutar(
+        "limpieza", lambda: paso_limpieza(archivos),
+        entradas=[archivos["aecid"]], salidas=[CLEAN_CSV], params=params)
+
+    traz_path = cache.ejecutar(
+        "trazabilidad", lambda: paso_trazabilidad(archivos, clean_path),
+        entradas=[clean_path, *_fuentes_trazabilidad(archivos)], salidas=[TRAZ_CSV], params=params)
+
+    analisis_path = cache.ejecutar(
+        "riesgo", lambda: paso_riesgo(traz_path),
+        entradas=[traz_path], salidas=[ANALISIS_CSV, SCORES_CSV], params=params)
+
+    if informe:
+        cache.ejecutar(
+            "informe", lambda: paso_informe(analisis_path, archivos),
+            entradas=[analisis_path, *archivos.values()], salidas=[INFORME_MD], params=params)
+    return analisis_path
+
+
+def analisis_en_memoria(archivos: dict[str, Path], cache: CachePasos, params: dict,
+                        informe: bool = True) -> Path:
+    """Pasos 2-5 pasándose los DataFrames, con sus dtypes, sin releer CSV.
+
+    Las salidas de data/processed (las que leen el dashboard y db.py) se
+    escriben en segundo plano mientras sigue el paso siguiente, y se espera
+    a todas al final. Un paso vigente en la caché se carga de su CSV.
+    """
+    salidas = EscritorSalidas()
+
+    df_clean = cache.ejecutar_en_memoria(
+        "limpieza", lambda: limpiar(pd.read_csv(archivos["aecid"])),
+        entradas=[archivos["aecid"]], salidas=[CLEAN_CSV], params=params,
+        cargar=lambda: pd.read_csv(CLEAN_CSV), escribir=lambda df: salidas.csv(df, CLEAN_CSV))
+
+    df_traz = cache.ejecutar_en_memoria(
+        "trazabilidad", lambda: trazar(df_clean, archivos),
+        entradas=_fuentes_trazabilidad(archivos), previos=["limpieza"], salidas=[TRAZ_CSV], params=params,
+        cargar=lambda: pd.read_csv(TRAZ_CSV), escribir=lambda df: salidas.csv(df, TRAZ_CSV))
+
+    def escribir_riesgo(resultado):
+        df_scores, df_merged = resultado
+        salidas.csv(df_merged, ANALISIS_CSV)
+        salidas.csv(df_scores, SCORES_CSV)
+
+    _, df_analisis = cache.ejecutar_en_memoria(
+        "riesgo", lambda: puntuar(df_traz),
+        entradas=[], previos=["trazabilidad"], salidas=[ANALISIS_CSV, SCORES_CSV], params=params,
+        cargar=lambda: (pd.read_csv(SCORES_CSV), pd.read_csv(ANALISIS_CSV)), escribir=escribir_riesgo)
+
+    if informe:
+        cache.ejecutar_en_memoria(
+            "informe", lambda: redactar_informe(df_analisis, archivos),
+            entradas=list(archivos.values()), previos=["riesgo"], salidas=[INFORME_MD], params=params,
+            cargar=lambda: INFORME_MD.read_text(encoding="utf-8"), escribir=lambda md: salidas.texto(md, INFORME_MD))
+
+    salidas.esperar()
+    cache.confirmar()
+    return ANALISIS_CSV
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # MAIN
 # ══════════════════════════════════════════════════════════════════════════════
@@ -444,26 +630,40 @@ Ejemplos:
   python pipeline.py --solo-analisis          # solo análisis (datos ya descargados)
   python pipeline.py --años 2022 2023 2024    # filtrar años
   python pipeline.py --forzar                 # re-descargar aunque exista
+  python pipeline.py --forzar --bdns-completo # idem, sin modo incremental en BDNS
+  python pipeline.py --forzar --offline       # ingesta reproducida desde la caché HTTP
+  python pipeline.py --solo-analisis --no-cache  # recalcular aunque nada haya cambiado
+  python pipeline.py --solo-analisis --en-memoria  # sin releer los CSV intermedios
         """
     )
     parser.add_argument("--solo-ingesta",   action="store_true", help="Solo descarga datos")
     parser.add_argument("--solo-analisis",  action="store_true", help="Solo análisis (sin descarga)")
     parser.add_argument("--años",           nargs="+", type=int, default=list(range(2020, 2025)))
     parser.add_argument("--forzar",         action="store_true", help="Re-descargar aunque exista")
+    parser.add_argument("--bdns-completo",  action="store_true",
+                        help="Con --forzar, re-descargar todas las concesiones BDNS (sin modo incremental)")
+    parser.add_argument("--offline",        action="store_true",
+                        help="Servir las descargas solo desde la caché HTTP, sin red")
     parser.add_argument("--sin-informe",    action="store_true", help="No generar informe Markdown")
+    parser.add_argument("--en-memoria",     action="store_true",
+                        help="Pasar DataFrames entre pasos y escribir los CSV en segundo plano")
+    parser.add_argument("--no-cache",       action="store_true",
+                        help="Recalcular los pasos de análisis aunque entradas, parámetros y código no cambien")
     parser.add_argument("--log-level",      default="INFO", choices=["DEBUG", "INFO", "WARNING"])
     args = parser.parse_args()
 
     logging.getLogger().setLevel(getattr(logging, args.log_level))
+    if args.offline:
+        HTTP.cache.offline = True
 
     log.info("═" * 60)
     log.info("PIPELINE TRAZABILIDAD FONDOS AECID")
-    log.info(f"Años: {args.años}")
+    log.info(f"Años: {args.años}" + (" (offline: solo caché HTTP)" if args.offline else ""))
     log.info("═" * 60)
 
     # ── Paso 1: ingesta ────────────────────────────────────────
     if not args.solo_analisis:
-        archivos = paso_ingesta(años=args.años, forzar=args.forzar)
+        archivos = paso_ingesta(años=args.años, forzar=args.forzar, bdns_completo=args.bdns_completo)
     else:
         archivos = {
             "aecid":            DATA_RAW / "aecid_intervenciones.csv",
@@ -477,18 +677,12 @@ Ejemplos:
         log.info("Ingesta completada. Saliendo (--solo-ingesta).")
         return
 
-    # ── Paso 2: limpieza ───────────────────────────────────────
-    clean_path = paso_limpieza(archivos)
-
-    # ── Paso 3: trazabilidad ───────────────────────────────────
-    traz_path = paso_trazabilidad(archivos, clean_path)
-
-    # ── Paso 4: riesgo ─────────────────────────────────────────
-    analisis_path = paso_riesgo(traz_path)
-
-    # ── Paso 5: informe ────────────────────────────────────────
-    if not args.sin_informe:
-        paso_informe(analisis_path, archivos)
+    # Cada paso se salta si sus entradas, params.yaml y el código no
+    # cambiaron desde la última corrida (manifiesto en data/processed)
+    cache = CachePasos(activa=not args.no_cache)
+    analizar = analisis_en_memoria if args.en_memoria else analisis_en_archivos
+    analisis_path = analizar(archivos, cache, cargar_params(), informe=not args.sin_informe)
+    cache.loguear_resumen()
 
     # ── Paso 6: persistencia en PostgreSQL (Railway) ───────────
     try:
@@ -504,9 +698,10 @@ Ejemplos:
     log.info("═" * 60)
     log.info("PIPELINE COMPLETADO")
     log.info(f"  Análisis completo: {analisis_path}")
-    log.info(f"  Informe:           {REPORTS / 'informe_ejecutivo.md'}")
+    log.info(f"  Informe:           {INFORME_MD}")
     log.info("═" * 60)
 
 
 if __name__ == "__main__":
+    configurar_logging()
     main()
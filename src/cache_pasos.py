@@ -0,0 +1,219 @@
+"""
+src/cache_pasos.py
+==================
+Manifiesto de los pasos de análisis del pipeline (limpieza, trazabilidad,
+riesgo, informe).
+
+Cada `pipeline.py --solo-analisis` (también el que lanza /api/refresh)
+recalculaba los cuatro pasos aunque ningún CSV de data/raw hubiera
+cambiado. Acá cada paso registra una huella de lo que determina su
+resultado:
+
+  - el hash del contenido de cada archivo de entrada (o su ausencia),
+  - los valores de config/params.yaml,
+  - la versión del código (hash de pipeline.py y de src/*.py).
+
+Si la huella coincide con la de la última corrida y las salidas siguen en
+disco con el mismo contenido que se registró, el paso se salta y se reusan
+sus salidas de data/processed. Como las salidas de un paso son entradas
+del siguiente, un cambio se propaga solo a los pasos que dependen de él.
+
+El manifiesto es un JSON en data/processed (se versiona junto con las
+salidas que describe). pipeline.py --no-cache recalcula todo y lo reescribe.
+
+En modo en memoria (pipeline.py --en-memoria) los pasos se pasan
+DataFrames en vez de releer el CSV del anterior. Ahí un paso no depende
+del archivo del anterior sino de su huella (`previos`): misma huella, mismo
+resultado. Las salidas las escribe EscritorSalidas en segundo plano, y la
+huella de cada paso se registra recién con confirmar(), cuando ya están en
+disco.
+
+Uso:
+    cache = CachePasos()
+    out = cache.ejecutar("riesgo", lambda: paso_riesgo(traz), entradas=[traz],
+                         salidas=[DATA_PRO / "analisis_completo.csv", ...], params=params)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+MANIFIESTO = ROOT / "data" / "processed" / "_manifiesto_pasos.json"
+# Subir si cambia el formato de la huella: invalida los manifiestos viejos
+VERSION_MANIFIESTO = 1
+BLOQUE_HASH = 1 << 20
+
+
+def hash_archivo(path: Path) -> str | None:
+    """sha256 del contenido, o None si el archivo no existe."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE_HASH), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def version_codigo(archivos=None) -> str:
+    """Hash de las fuentes del análisis: pipeline.py y src/*.py."""
+    if archivos is None:
+        archivos = [ROOT / "pipeline.py", *sorted((ROOT / "src").glob("*.py"))]
+    h = hashlib.sha256()
+    for path in archivos:
+        h.update(Path(path).name.encode())
+        h.update((hash_archivo(path) or "").encode())
+    return h.hexdigest()
+
+
+class CachePasos:
+    """Decide si un paso del pipeline se puede saltar y registra sus huellas."""
+
+    def __init__(self, path: Path = MANIFIESTO, activa: bool = True, codigo: str = None):
+        self.path = Path(path)
+        self.activa = activa
+        self.codigo = codigo if codigo is not None else version_codigo()
+        self.aciertos, self.recalculados = [], []
+        self._pendientes = []
+        self._ids = {}   # paso -> hash de su huella en esta corrida
+        self._pasos = self._leer()
+
+    def _leer(self) -> dict:
+        try:
+            datos = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if datos.get("version") != VERSION_MANIFIESTO:
+            return {}
+        return datos.get("pasos", {})
+
+    def _escribir(self) -> None:
+        # Escritura atómica: un manifiesto a medias no debe dar aciertos
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION_MANIFIESTO, "pasos": self._pasos}, f,
+                      ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def huella(self, paso: str, entradas, params: dict = None, previos=()) -> dict:
+        """Huella de `paso`: archivos de entrada, params, código y, en modo
+        en memoria, las huellas de los pasos `previos` de esta corrida."""
+        huella = {
+            "entradas": {Path(p).name: hash_archivo(p) for p in entradas},
+            "params": hashlib.sha256(json.dumps(params or {}, sort_keys=True, default=str).encode()).hexdigest(),
+            "codigo": self.codigo,
+        }
+        if previos:
+            huella["previos"] = {p: self._ids[p] for p in previos}
+        self._ids[paso] = hashlib.sha256(json.dumps(huella, sort_keys=True).encode()).hexdigest()
+        return huella
+
+    def vigente(self, paso: str, huella: dict, salidas) -> bool:
+        """¿Misma huella que la última corrida y salidas intactas?"""
+        previo = self._pasos.get(paso)
+        if not self.activa or previo is None or previo.get("huella") != huella:
+            return False
+        registradas = previo.get("salidas", {})
+        return len(registradas) == len(salidas) and all(
+            registradas.get(Path(p).name) == hash_archivo(p) for p in salidas
+        )
+
+    def registrar(self, paso: str, huella: dict, salidas) -> None:
+        self._pasos[paso] = {"huella": huella, "salidas": {Path(p).name: hash_archivo(p) for p in salidas}}
+        self._escribir()
+
+    def ejecutar(self, paso: str, funcion, entradas, salidas, params: dict = None):
+        """Ejecuta funcion() salvo que el paso esté vigente. Devuelve lo que
+        devuelve funcion(), o la primera salida si se reusa."""
+        huella = self.huella(paso, entradas, params)
+        if self.vigente(paso, huella, salidas):
+            self.aciertos.append(paso)
+            log.info(f"── {paso}: entradas, parámetros y código sin cambios → "
+                     f"se reusa {', '.join(Path(p).name for p in salidas)} (caché)")
+            return Path(salidas[0])
+        self.recalculados.append(paso)
+        resultado = funcion()
+        self.registrar(paso, huella, salidas)
+        return resultado
+
+    def ejecutar_en_memoria(self, paso: str, funcion, entradas, salidas, cargar, escribir,
+                            params: dict = None, previos=()):
+        """Como ejecutar(), pero funcion() devuelve el resultado en memoria:
+        si el paso está vigente se devuelve cargar() (sus salidas leídas del
+        disco); si no, se pasa el resultado a escribir() (que lo encola en
+        un EscritorSalidas) y la huella queda pendiente de confirmar().
+        `entradas` son solo los archivos que lee funcion(); lo que recibe de
+        pasos anteriores va en `previos`."""
+        huella = self.huella(paso, entradas, params, previos)
+        if self.vigente(paso, huella, salidas):
+            self.aciertos.append(paso)
+            log.info(f"── {paso}: entradas, parámetros y código sin cambios → "
+                     f"se carga {', '.join(Path(p).name for p in salidas)} (caché)")
+            return cargar()
+        self.recalculados.append(paso)
+        resultado = funcion()
+        escribir(resultado)
+        self._pendientes.append((paso, huella, salidas))
+        return resultado
+
+    def confirmar(self) -> None:
+        """Registra los pasos en memoria cuyas salidas ya se escribieron."""
+        for paso, huella, salidas in self._pendientes:
+            self._pasos[paso] = {"huella": huella,
+                                 "salidas": {Path(p).name: hash_archivo(p) for p in salidas}}
+        if self._pendientes:
+            self._escribir()
+        self._pendientes = []
+
+    def loguear_resumen(self) -> None:
+        estado = "desactivada (--no-cache)" if not self.activa else \
+            f"{len(self.aciertos)} aciertos {self.aciertos}, {len(self.recalculados)} recalculados {self.recalculados}"
+        log.info(f"  Caché de pasos: {estado}")
+
+
+class EscritorSalidas:
+    """Escribe los artefactos de los pasos (CSV, Markdown) en un hilo aparte
+    mientras el pipeline sigue con el paso siguiente.
+
+    Cada DataFrame se encola como copia profunda: lo que el paso siguiente
+    le haga mientras se escribe no cambia el CSV. Con copy-on-write
+    (pandas 3) bastaría una copia superficial, pero requirements.txt admite
+    pandas 2.x, donde no lo es.
+    """
+
+    def __init__(self, hilos: int = 1):
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="salidas")
+        self._pendientes = []
+
+    def csv(self, df, path: Path) -> None:
+        foto = df.copy(deep=True)
+        self._encolar(path, lambda: foto.to_csv(path, index=False, encoding="utf-8-sig"))
+
+    def texto(self, texto: str, path: Path) -> None:
+        self._encolar(path, lambda: Path(path).write_text(texto, encoding="utf-8"))
+
+    def _encolar(self, path: Path, escribir) -> None:
+        self._pendientes.append((Path(path), self._pool.submit(escribir)))
+
+    def esperar(self) -> None:
+        """Espera a que terminen todas las escrituras; relanza el primer error."""
+        errores = []
+        for path, futuro in self._pendientes:
+            try:
+                futuro.result()
+                log.info(f"   → {path.name}")
+            except Exception as e:
+                errores.append(e)
+                log.error(f"   No se pudo escribir {path.name}: {e}")
+        self._pendientes = []
+        self._pool.shutdown()
+        if errores:
+            raise errores[0]
@@ -0,0 +1,47 @@
+"""
+src/clasificador_ooii.py
+========================
+Clasificación de entidades como organismo internacional "caja negra"
+(OOII que agregan contribuciones multi-donante sin desglosar la aportación
+española: ruptura R1 del modelo de trazabilidad).
+
+Una sola regex con la alternancia de todos los nombres y un dict
+compartido entidad -> bool: cada entidad distinta se clasifica una vez
+por proceso para todo el modelo de trazabilidad.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from valores_distintos import por_valor
+
+# Organismos internacionales que agregan sin desglosar (R1)
+OOII_CAJA_NEGRA = {
+    "pnud", "undp", "unicef", "onu mujeres", "unifem", "acnur", "unhcr",
+    "pma", "wfp", "fao", "oms", "who", "ops/oms", "paho", "oim", "iom",
+    "oit", "ilo", "banco mundial", "world bank", "bid", "iadb",
+    "fondo mundial", "gef", "fondo de adaptación",
+}
+
+# Subcadena en minúsculas, como el `any(ooii in entidad.lower() ...)` original
+RE_OOII = re.compile("|".join(re.escape(o) for o in sorted(OOII_CAJA_NEGRA, key=len, reverse=True)))
+
+# Caché compartida: texto de la entidad -> es OOII
+_CLASIFICACION = {}
+
+
+def es_ooii(entidad) -> bool:
+    if entidad is None or (not isinstance(entidad, str) and pd.isna(entidad)):
+        return False
+    texto = str(entidad)
+    try:
+        return _CLASIFICACION[texto]
+    except KeyError:
+        resultado = _CLASIFICACION[texto] = RE_OOII.search(texto.lower()) is not None
+        return resultado
+
+
+def es_ooii_serie(entidades: pd.Series) -> np.ndarray:
+    """es_ooii() de cada fila, clasificando cada valor distinto una vez."""
+    return por_valor(entidades, es_ooii)
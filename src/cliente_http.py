@@ -0,0 +1,359 @@
+"""
+src/cliente_http.py
+===================
+Cliente HTTP compartido por todos los scrapers (datos.aecid.es, BDNS,
+PLACE, backfill de ZIPs anuales y monitor_completo_es).
+
+Antes cada scraper llamaba a requests.get() suelto: una conexión TCP/TLS
+nueva por página y un bucle de reintentos distinto en cada módulo. Acá se
+centraliza:
+
+  - una requests.Session por host, con pool de conexiones y keep-alive
+    (las páginas de un mismo listado reusan la misma conexión TLS),
+  - reintentos con backoff exponencial ante errores de red y status
+    transitorios (429, 5xx), respetando la cabecera Retry-After,
+  - un límite de peticiones por segundo por host (LIMITES_HOST), que vale
+    para todos los scrapers a la vez — el de descargar_paginas() sigue
+    pacing cada listado por separado,
+  - métricas por host (peticiones, reintentos, errores, tiempo, conexiones
+    abiertas) que el pipeline loguea al terminar la ingesta,
+  - una caché en disco (CacheHTTP, data/raw/_http_cache) con peticiones
+    condicionales: si el servidor responde 304 se sirve el cuerpo guardado.
+    Es opt-in por llamada (usar_cache=True): la usan los listados JSON de
+    AECID y BDNS, no las descargas grandes en stream (feed PLACE, ZIP del
+    backfill), que pasarían enteras por el disco antes de parsearse y
+    desalojarían al resto. En modo offline (pipeline.py --offline) solo se
+    sirve desde la caché, sin tocar la red, lo que hace reproducibles los
+    benchmarks del pipeline.
+
+Uso:
+    from cliente_http import HTTP
+    r = HTTP.get(url, params=..., headers=HEADERS)   # requests.Response
+    r = HTTP.get(url, params=..., usar_cache=True)   # listados chicos y repetidos
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from paginacion import LimitadorTasa
+
+log = logging.getLogger(__name__)
+
+TIMEOUT = 30
+REINTENTOS = 3
+BACKOFF_BASE = 1.0     # espera = BACKOFF_BASE * 2**intento (1s, 2s, 4s...)
+BACKOFF_MAX = 60.0     # tope de espera, también para Retry-After
+STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+# Conexiones que se mantienen abiertas por host. Alcanza con la mayor
+# concurrencia de descargar_paginas() (CONCURRENCIA_BDNS = 6).
+POOL_POR_HOST = 8
+
+# Peticiones por segundo por host, sumando todos los scrapers. Los portales
+# de Hacienda devuelven 503 cuando se les pega muy seguido (ver
+# backfill_place_historico.py); el resto queda acotado por el rps de cada
+# listado en descargar_paginas().
+LIMITES_HOST = {
+    "contrataciondelestado.es": 2.0,
+    "contrataciondelsectorpublico.gob.es": 2.0,
+}
+
+# Caché de respuestas (solo las peticiones con usar_cache=True). El tope
+# alcanza de sobra para las páginas del listado AECID y BDNS; al pasarlo se
+# desalojan las entradas usadas hace más tiempo.
+DIR_CACHE = Path(__file__).resolve().parent.parent / "data" / "raw" / "_http_cache"
+MAX_CACHE_MB = 512
+CABECERAS_CACHE = ("Content-Type", "ETag", "Last-Modified")
+
+
+def segundos_retry_after(respuesta, defecto: float) -> float:
+    """Segundos a esperar según Retry-After (en segundos o fecha HTTP), o
+    `defecto` si la respuesta no la trae. Acotado a BACKOFF_MAX."""
+    valor = (respuesta.headers.get("Retry-After") or "").strip() if respuesta is not None else ""
+    if not valor:
+        return defecto
+    if valor.isdigit():
+        return min(float(valor), BACKOFF_MAX)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return min(max((fecha - datetime.now(timezone.utc)).total_seconds(), 0.0), BACKOFF_MAX)
+
+
+class SinCopiaEnCache(requests.exceptions.ConnectionError):
+    """Modo offline y la URL no está en la caché. Hereda de ConnectionError
+    para que los scrapers la traten como cualquier fallo de red."""
+
+
+class CacheHTTP:
+    """Respuestas 200 en disco, una entrada por (URL, params): <clave>.body
+    con el cuerpo ya decodificado y <clave>.json con las cabeceras. El mtime
+    del .body marca el último uso para el desalojo LRU."""
+
+    def __init__(self, directorio: Path = DIR_CACHE, max_mb: float = MAX_CACHE_MB,
+                 offline: bool = False):
+        self.directorio = Path(directorio)
+        self.max_bytes = int(max_mb * 1_048_576)
+        self.offline = offline
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(url: str, params: dict = None) -> str:
+        if params:
+            url = f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _rutas(self, clave: str):
+        return self.directorio / f"{clave}.body", self.directorio / f"{clave}.json"
+
+    def leer(self, clave: str):
+        """Metadatos de la entrada (dict) o None si no está en la caché."""
+        body, meta = self._rutas(clave)
+        try:
+            datos = json.loads(meta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return datos if body.exists() else None
+
+    def condicionales(self, entrada: dict) -> dict:
+        cabeceras = entrada.get("headers", {})
+        condicionales = {}
+        if cabeceras.get("ETag"):
+            condicionales["If-None-Match"] = cabeceras["ETag"]
+        if cabeceras.get("Last-Modified"):
+            condicionales["If-Modified-Since"] = cabeceras["Last-Modified"]
+        return condicionales
+
+    def guardar(self, clave: str, url: str, r: requests.Response, stream: bool) -> int:
+        """Escribe el cuerpo de `r` (consumiéndolo por bloques si es stream)
+        y sus cabeceras. Devuelve los bytes guardados."""
+        body, meta = self._rutas(clave)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            if stream:
+                for chunk in r.iter_content(chunk_size=256 * 1024):
+                    f.write(chunk)
+            else:
+                f.write(r.content)
+            tamano = f.tell()
+        os.replace(tmp, body)
+        meta.write_text(json.dumps({
+            "url": url,
+            "headers": {k: r.headers[k] for k in CABECERAS_CACHE if k in r.headers},
+            "bytes": tamano,
+            "guardado": datetime.now().isoformat(timespec="seconds"),
+        }, ensure_ascii=False), encoding="utf-8")
+        self._desalojar(conservar=body)
+        return tamano
+
+    def respuesta(self, clave: str, entrada: dict, url: str, stream: bool) -> requests.Response:
+        """Reconstruye un requests.Response 200 desde el disco. Con stream=True
+        el cuerpo se lee del fichero por bloques (iter_content) sin cargarlo
+        entero en memoria."""
+        body, _meta = self._rutas(clave)
+        os.utime(body)  # último uso, para el LRU
+        r = requests.Response()
+        r.status_code = 200
+        r.url = url
+        r.reason = "OK (caché)"
+        r.headers = CaseInsensitiveDict(entrada.get("headers", {}))
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.elapsed = timedelta(0)
+        r.raw = open(body, "rb")
+        if not stream:
+            with r.raw:
+                r._content = r.raw.read()
+        return r
+
+    def _desalojar(self, conservar: Path = None) -> None:
+        with self._lock:
+            entradas = []
+            for body in self.directorio.glob("*.body"):
+                try:
+                    st = body.stat()
+                except OSError:
+                    continue
+                entradas.append((st.st_mtime, st.st_size, body))
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, body in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                if body == conservar:
+                    continue
+                body.unlink(missing_ok=True)
+                body.with_suffix(".json").unlink(missing_ok=True)
+                total -= tamano
+
+
+class ClienteHTTP:
+    """Sesiones por host con reintentos, límite de tasa y métricas. Es
+    seguro compartir una instancia entre hilos (descargar_paginas)."""
+
+    def __init__(self, timeout: float = TIMEOUT, reintentos: int = REINTENTOS,
+                 backoff: float = BACKOFF_BASE, limites_host: dict = None,
+                 pool_por_host: int = POOL_POR_HOST, cache: CacheHTTP = None):
+        self.cache = cache
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.limites_host = dict(LIMITES_HOST if limites_host is None else limites_host)
+        self.pool_por_host = pool_por_host
+        self._sesiones = {}
+        self._limitadores = {}
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    # ── Estado por host ──────────────────────────────────────────────────────
+
+    def _por_host(self, host: str):
+        with self._lock:
+            if host not in self._sesiones:
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_por_host)
+                sesion.mount("https://", adaptador)
+                sesion.mount("http://", adaptador)
+                self._sesiones[host] = sesion
+                self._limitadores[host] = LimitadorTasa(self.limites_host.get(host))
+                self._metricas[host] = {"peticiones": 0, "reintentos": 0, "errores": 0,
+                                        "segundos": 0.0, "max_segundos": 0.0,
+                                        "no_modificadas": 0, "offline": 0, "bytes_cache": 0}
+            return self._sesiones[host], self._limitadores[host], self._metricas[host]
+
+    def _anotar(self, metricas: dict, **incrementos) -> None:
+        with self._lock:
+            for clave, valor in incrementos.items():
+                metricas[clave] += valor
+            if "segundos" in incrementos:
+                metricas["max_segundos"] = max(metricas["max_segundos"], incrementos["segundos"])
+
+    # ── Peticiones ───────────────────────────────────────────────────────────
+
+    def get(self, url: str, params: dict = None, headers: dict = None, timeout: float = None,
+            stream: bool = False, reintentos: int = None, usar_cache: bool = False) -> requests.Response:
+        """GET con reintentos ante errores de red y STATUS_REINTENTABLES.
+        Devuelve la última respuesta (el llamador decide qué hacer con un
+        status de error, igual que con requests.get) o relanza la última
+        excepción de red si se agotaron los reintentos.
+
+        Con usar_cache=True (y cliente con caché) se envía
+        If-None-Match/If-Modified-Since y un 304 se sirve desde el disco; las
+        respuestas 200 se guardan. Sin usar_cache la respuesta llega tal cual
+        de la red (con stream=True, sin pasar por el disco); en modo offline
+        esas peticiones fallan como un error de red."""
+        host = urlsplit(url).hostname or ""
+        sesion, limitador, metricas = self._por_host(host)
+        if self.cache is not None and self.cache.offline and not usar_cache:
+            raise SinCopiaEnCache(f"offline: {url} no se pide con caché")
+        if self.cache is None or not usar_cache:
+            return self._get_red(sesion, limitador, metricas, host, url, params, headers,
+                                 timeout, stream, reintentos)
+
+        clave = self.cache.clave(url, params)
+        entrada = self.cache.leer(clave)
+        if self.cache.offline:
+            if entrada is None:
+                raise SinCopiaEnCache(f"offline: {url} no está en la caché HTTP")
+            self._anotar(metricas, offline=1)
+            return self.cache.respuesta(clave, entrada, url, stream)
+
+        if entrada is not None:
+            headers = {**(headers or {}), **self.cache.condicionales(entrada)}
+        r = self._get_red(sesion, limitador, metricas, host, url, params, headers,
+                          timeout, stream, reintentos)
+        if r.status_code == 304 and entrada is not None:
+            r.close()
+            self._anotar(metricas, no_modificadas=1, bytes_cache=entrada.get("bytes", 0))
+            return self.cache.respuesta(clave, entrada, url, stream)
+        if r.status_code == 200:
+            self.cache.guardar(clave, url, r, stream)
+            if stream:
+                # el cuerpo ya se consumió al guardarlo: se sirve desde el disco
+                r.close()
+                return self.cache.respuesta(clave, self.cache.leer(clave), url, stream)
+        return r
+
+    def _get_red(self, sesion, limitador, metricas, host, url, params, headers,
+                 timeout, stream, reintentos) -> requests.Response:
+        reintentos = self.reintentos if reintentos is None else reintentos
+        timeout = self.timeout if timeout is None else timeout
+
+        for intento in range(reintentos + 1):
+            limitador.esperar()
+            t0 = time.perf_counter()
+            try:
+                r = sesion.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+            except requests.exceptions.RequestException as e:
+                self._anotar(metricas, peticiones=1, errores=1, segundos=time.perf_counter() - t0)
+                if intento >= reintentos:
+                    raise
+                espera = min(self.backoff * 2 ** intento, BACKOFF_MAX)
+                log.warning(f"  {host}: {e} — reintento {intento + 1}/{reintentos} en {espera:.0f}s")
+                self._anotar(metricas, reintentos=1)
+                time.sleep(espera)
+                continue
+
+            self._anotar(metricas, peticiones=1, segundos=time.perf_counter() - t0)
+            if r.status_code not in STATUS_REINTENTABLES or intento >= reintentos:
+                return r
+            espera = segundos_retry_after(r, min(self.backoff * 2 ** intento, BACKOFF_MAX))
+            log.warning(f"  {host}: status {r.status_code} — reintento {intento + 1}/{reintentos} "
+                        f"en {espera:.0f}s")
+            r.close()
+            self._anotar(metricas, reintentos=1)
+            time.sleep(espera)
+
+    # ── Métricas ─────────────────────────────────────────────────────────────
+
+    def metricas(self) -> dict:
+        """{host: {peticiones, reintentos, errores, segundos, max_segundos,
+        conexiones}}. `conexiones` son las conexiones TCP abiertas en total;
+        sin keep-alive sería igual a `peticiones`."""
+        with self._lock:
+            salida = {host: dict(m) for host, m in self._metricas.items()}
+            sesiones = dict(self._sesiones)
+        for host, sesion in sesiones.items():
+            salida[host]["conexiones"] = _conexiones_abiertas(sesion)
+        return salida
+
+    def loguear_metricas(self) -> None:
+        for host, m in sorted(self.metricas().items()):
+            if m["offline"]:
+                log.info(f"   HTTP {host}: {m['offline']} respuestas servidas de caché (offline)")
+            if not m["peticiones"]:
+                continue
+            media = m["segundos"] / m["peticiones"]
+            log.info(f"   HTTP {host}: {m['peticiones']} peticiones en {m['conexiones']} conexiones, "
+                     f"{m['reintentos']} reintentos, {m['errores']} errores de red, "
+                     f"{media:.2f}s de media (máx {m['max_segundos']:.2f}s)"
+                     + (f", {m['no_modificadas']} sin cambios (304, "
+                        f"{m['bytes_cache'] / 1_048_576:.1f} MB servidos de caché)"
+                        if m["no_modificadas"] else ""))
+
+
+def _conexiones_abiertas(sesion: requests.Session) -> int:
+    total = 0
+    for adaptador in set(sesion.adapters.values()):
+        pools = adaptador.poolmanager.pools
+        for clave in list(pools.keys()):
+            pool = pools.get(clave)
+            total += getattr(pool, "num_connections", 0) if pool is not None else 0
+    return total
+
+
+# Instancia compartida por todos los scrapers del proceso.
+HTTP = ClienteHTTP(cache=CacheHTTP())
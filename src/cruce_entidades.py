@@ -0,0 +1,387 @@
+"""
+src/cruce_entidades.py
+======================
+Motor de cruce fuzzy de nombres de entidades entre fuentes (AECID↔BDNS).
+
+El cruce original recorría, para cada intervención AECID, todos los
+beneficiarios BDNS llamando a fuzz.token_sort_ratio uno por uno (doble
+bucle en Python, 834 × ~1.200 hoy). Acá:
+
+  1. se deduplican los nombres ya normalizados de ambos lados (muchas
+     intervenciones comparten entidad, y muchas concesiones beneficiario),
+  2. se calcula la matriz de scores con rapidfuzz.process.cdist
+     (multihilo, workers=-1), por bloques de consultas para acotar la
+     memoria cuando el lado BDNS crece a 100k+ concesiones,
+  3. se toma el argmax por fila y se reparte el resultado a las filas
+     originales.
+
+El resultado es idéntico al del doble bucle: mismo score (cdist con
+dtype float64, sin redondeo a float32) y, ante empate, gana el primer
+candidato en el orden original (np.argmax devuelve la primera aparición
+y los candidatos únicos conservan el orden de su primera aparición).
+
+Bloqueo (IndiceBloqueo): aun vectorizado, el cruce exhaustivo es
+cuadrático. Con `umbral`, cada consulta se puntúa sólo contra los
+candidatos que *pueden* alcanzarlo. Para los scorers de la familia Indel
+(fuzz.ratio, fuzz.token_sort_ratio) el score es 200·LCS / (l1 + l2), y la
+subsecuencia común más larga no puede superar Σ_c min(n1[c], n2[c]) (los
+caracteres compartidos contando repeticiones). El índice guarda el
+histograma de caracteres de cada candidato, ordenado por longitud, y
+descarta primero por longitud (un candidato de largo l2 sólo llega a u si
+200·min(l1, l2) >= u·(l1 + l2)) y después por esa cota. Es un filtro
+exacto: ningún match >= umbral se pierde y, como todos los candidatos
+empatados en el máximo sobreviven, el elegido es el mismo que en el
+cruce exhaustivo. Por debajo del umbral el score devuelto es el mejor
+entre los supervivientes (0 si no queda ninguno), no el global.
+
+Caché entre corridas (CacheCruces): los nombres de entidades y de
+beneficiarios casi no cambian de un día a otro. Un SQLite en
+data/processed guarda, por configuración (scorer + umbral) y entidad
+normalizada, el score máximo, los beneficiarios empatados en ese máximo y
+la versión del corpus contra la que se calculó. La versión es una
+generación: cada nombre de beneficiario nuevo entra al corpus con la
+generación siguiente, así una entidad ya cacheada sólo se puntúa contra
+los nombres posteriores a su generación. Si desaparece un nombre que
+estaba entre los mejores de una entidad, ésta se recalcula entera.
+"""
+import json
+import logging
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+log = logging.getLogger(__name__)
+
+# Memoria máxima de cada bloque de la matriz de scores (float64). Con 100k
+# candidatos únicos son ~80 consultas por bloque.
+BLOQUE_BYTES = 64 * 1024 * 1024
+
+# Con bloqueo="auto", a partir de cuántos candidatos únicos se usa el
+# índice de bloqueo en lugar del cruce exhaustivo. Por debajo, construir el
+# índice no compensa (hoy BDNS trae ~700 beneficiarios
+# institucionales únicos).
+UMBRAL_BLOQUEO = 5_000
+
+# Versión del formato/semántica de la caché de cruces: cambiarla invalida
+# todas las entradas (p. ej. si cambia _normalizar).
+VERSION_CACHE = 1
+
+# Cubetas del histograma de caracteres: ord(c) & 63. Los nombres
+# normalizados sólo tienen [A-Z0-9 ], que caen en cubetas distintas; otras
+# colisiones sólo aflojan la cota (sigue siendo válida).
+CUBETAS = 64
+
+
+def _forma_token_sort(s: str) -> str:
+    return " ".join(sorted(s.split()))
+
+
+# Forma del string que compara cada scorer Indel, para que el histograma
+# cuente exactamente sus caracteres. Con otros scorers no hay cota válida.
+FORMA_POR_SCORER = {
+    fuzz.ratio: lambda s: s,
+    fuzz.token_sort_ratio: _forma_token_sort,
+}
+
+
+def _unicos(valores: list):
+    """(únicos en orden de primera aparición, índice de cada valor en únicos)"""
+    posicion = {}
+    inversa = np.fromiter((posicion.setdefault(v, len(posicion)) for v in valores),
+                          dtype=np.int64, count=len(valores))
+    return list(posicion), inversa
+
+
+def _histogramas(textos: list) -> np.ndarray:
+    """Matriz (len(textos), CUBETAS) uint16 con el conteo de caracteres."""
+    largos = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    codigos = np.frombuffer("".join(textos).encode("utf-32-le"), dtype=np.uint32) & (CUBETAS - 1)
+    filas = np.repeat(np.arange(len(textos), dtype=np.int64), largos)
+    conteo = np.bincount(filas * CUBETAS + codigos, minlength=len(textos) * CUBETAS)
+    return conteo.reshape(len(textos), CUBETAS).astype(np.uint16)
+
+
+class IndiceBloqueo:
+    """
+    Índice de candidatos por longitud e histograma de caracteres (ver el
+    docstring del módulo). Los candidatos se guardan ordenados por largo,
+    así la ventana de longitudes admisibles es un slice contiguo.
+    """
+
+    def __init__(self, candidatos: list, scorer=fuzz.token_sort_ratio):
+        if scorer not in FORMA_POR_SCORER:
+            raise ValueError(f"IndiceBloqueo no tiene cota para el scorer {scorer!r}")
+        self.forma = FORMA_POR_SCORER[scorer]
+        formas = [self.forma(c) for c in candidatos]
+        largos = np.fromiter(map(len, formas), dtype=np.int64, count=len(formas))
+        self.orden = np.argsort(largos, kind="stable")
+        self.largos = largos[self.orden]
+        # Traspuesta (cubeta, candidato): cada cubeta es un vector contiguo
+        self.histogramas = np.ascontiguousarray(_histogramas(formas)[self.orden].T)
+
+    def __len__(self) -> int:
+        return len(self.orden)
+
+    def candidatos_de(self, consulta: str, umbral: float) -> np.ndarray:
+        """Índices (en el orden original, crecientes) de los candidatos que
+        pueden puntuar >= umbral contra `consulta`."""
+        forma = self.forma(consulta)
+        l1 = len(forma)
+        if umbral <= 0:
+            return np.arange(len(self), dtype=np.int64)
+        if umbral > 100 or l1 == 0:
+            return np.empty(0, dtype=np.int64)
+        # 200·min(l1, l2) >= u·(l1 + l2)  ⇔  l2 ∈ [u·l1 / (200 - u), (200 - u)·l1 / u]
+        minimo = np.ceil(umbral * l1 / (200 - umbral) - 1e-9)
+        maximo = np.floor((200 - umbral) * l1 / umbral + 1e-9)
+        ini = np.searchsorted(self.largos, minimo, side="left")
+        fin = np.searchsorted(self.largos, maximo, side="right")
+        if ini >= fin:
+            return np.empty(0, dtype=np.int64)
+
+        h_consulta = _histogramas([forma])[0]
+        comunes = np.zeros(fin - ini, dtype=np.uint16)
+        for cubeta in np.flatnonzero(h_consulta):
+            comunes += np.minimum(self.histogramas[cubeta, ini:fin], h_consulta[cubeta])
+        # Cota del score: 200·comunes / (l1 + l2) >= umbral
+        pasan = 200 * comunes.astype(np.int64) >= umbral * (l1 + self.largos[ini:fin]) - 1e-9
+        return np.sort(self.orden[ini:fin][pasan])
+
+
+_SIN_EMPATES = np.empty(0, dtype=np.int64)
+
+
+def _mejores_bloqueado(q_unicas: list, c_unicos: list, indice: IndiceBloqueo,
+                       umbral: float, scorer, workers: int):
+    """(scores, empates) de cada consulta, puntuando sólo los candidatos
+    que devuelve el índice."""
+    scores = np.zeros(len(q_unicas), dtype=np.float64)
+    empates = [_SIN_EMPATES] * len(q_unicas)
+    evaluados = 0
+    for k, q in enumerate(q_unicas):
+        cand = indice.candidatos_de(q, umbral)
+        if not len(cand):
+            continue
+        evaluados += len(cand)
+        fila = process.cdist([q], [c_unicos[j] for j in cand], scorer=scorer,
+                             dtype=np.float64, workers=workers)[0]
+        scores[k] = fila.max()
+        if scores[k] > 0:
+            empates[k] = cand[fila == scores[k]]
+    if q_unicas:
+        log.debug(f"  bloqueo: {evaluados / len(q_unicas):.0f} candidatos por consulta "
+                  f"de {len(c_unicos)} ({evaluados / (len(q_unicas) * len(c_unicos)):.2%})")
+    return scores, empates
+
+
+def puntuar_unicos(q_unicas: list, c_unicos: list, scorer=fuzz.token_sort_ratio,
+                   workers: int = -1, bloque_bytes: int = BLOQUE_BYTES,
+                   umbral: float = None, bloqueo="auto"):
+    """
+    Núcleo de mejor_coincidencia sobre consultas no vacías y candidatos ya
+    deduplicados. Devuelve (scores máximos, empates), donde empates[k] son
+    los índices crecientes en c_unicos de todos los candidatos con el score
+    máximo de la consulta k (vacío si el máximo es 0).
+    """
+    if bloqueo == "auto":
+        bloqueo = len(c_unicos) >= UMBRAL_BLOQUEO
+    if bloqueo and (umbral is None or scorer not in FORMA_POR_SCORER):
+        log.warning("  cruce: bloqueo pedido sin umbral o con un scorer sin cota; cruce exhaustivo")
+        bloqueo = False
+    if bloqueo:
+        return _mejores_bloqueado(q_unicas, c_unicos, IndiceBloqueo(c_unicos, scorer=scorer),
+                                  umbral, scorer, workers)
+
+    scores = np.zeros(len(q_unicas), dtype=np.float64)
+    empates = [_SIN_EMPATES] * len(q_unicas)
+    if not c_unicos:
+        return scores, empates
+    filas = max(1, bloque_bytes // (8 * len(c_unicos)))
+    for ini in range(0, len(q_unicas), filas):
+        matriz = process.cdist(q_unicas[ini:ini + filas], c_unicos, scorer=scorer,
+                               dtype=np.float64, workers=workers)
+        maximo = matriz.max(axis=1)
+        scores[ini:ini + len(matriz)] = maximo
+        fila, columna = np.nonzero((matriz == maximo[:, None]) & (maximo[:, None] > 0))
+        cortes = np.searchsorted(fila, np.arange(1, len(matriz)))
+        empates[ini:ini + len(matriz)] = np.split(columna, cortes)
+    return scores, empates
+
+
+def mejor_coincidencia(consultas: list, candidatos: list, scorer=fuzz.token_sort_ratio,
+                       workers: int = -1, bloque_bytes: int = BLOQUE_BYTES,
+                       umbral: float = None, bloqueo="auto"):
+    """
+    Para cada string de `consultas`, el candidato con mayor score.
+    Devuelve (scores: np.ndarray float64, indices: np.ndarray int64), con
+    el índice en `candidatos` del primer candidato con el score máximo, o
+    -1 si la consulta es vacía o ningún candidato puntúa por encima de 0
+    (mismo criterio que el `score > mejor_score` partiendo de 0).
+
+    bloqueo: True / False / "auto" (sólo con UMBRAL_BLOQUEO candidatos
+    únicos o más). Requiere `umbral` y un scorer de FORMA_POR_SCORER; si
+    no, se cruza exhaustivamente. Con bloqueo los resultados >= umbral son
+    idénticos a los exhaustivos; los de debajo, no (ver IndiceBloqueo).
+    """
+    scores = np.zeros(len(consultas), dtype=np.float64)
+    indices = np.full(len(consultas), -1, dtype=np.int64)
+    if not consultas or not candidatos:
+        return scores, indices
+
+    q_unicas, q_inversa = _unicos(consultas)
+    c_unicos, c_inversa = _unicos(candidatos)
+    # Índice original de la primera aparición de cada candidato único
+    primera = np.full(len(c_unicos), len(candidatos), dtype=np.int64)
+    np.minimum.at(primera, c_inversa, np.arange(len(candidatos), dtype=np.int64))
+
+    q_scores = np.zeros(len(q_unicas), dtype=np.float64)
+    q_indices = np.full(len(q_unicas), -1, dtype=np.int64)
+    pendientes = np.flatnonzero([bool(q) for q in q_unicas])
+    puntos, empates = puntuar_unicos([q_unicas[i] for i in pendientes], c_unicos, scorer=scorer,
+                                     workers=workers, bloque_bytes=bloque_bytes,
+                                     umbral=umbral, bloqueo=bloqueo)
+    q_scores[pendientes] = puntos
+    # Los candidatos únicos están en orden de primera aparición: el primer
+    # empatado es también el primero en `candidatos`
+    q_indices[pendientes] = [primera[e[0]] if len(e) else -1 for e in empates]
+
+    log.debug(f"  cruce: {len(consultas)} consultas ({len(q_unicas)} únicas) × "
+              f"{len(candidatos)} candidatos ({len(c_unicos)} únicos)")
+    scores[:] = q_scores[q_inversa]
+    indices[:] = q_indices[q_inversa]
+    return scores, indices
+
+
+# ── Caché persistente de cruces ─────────────────────────────────────────────
+
+def _huella_config(scorer, umbral) -> str:
+    """Clave de la configuración: cambiar scorer o umbral invalida la caché."""
+    nombre = f"{getattr(scorer, '__module__', '')}.{getattr(scorer, '__qualname__', repr(scorer))}"
+    return f"v{VERSION_CACHE}|{nombre}|{umbral}"
+
+
+class CacheCruces:
+    """
+    Caché en SQLite de mejor_coincidencia (ver el docstring del módulo).
+    El resultado es el mismo que sin caché: los empates se guardan por
+    nombre y se resuelven en cada corrida por la primera aparición en los
+    candidatos actuales.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _conectar(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path)
+        con.executescript("""
+            CREATE TABLE IF NOT EXISTS corpus (
+                nombre TEXT PRIMARY KEY, generacion INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS cruces (
+                config TEXT, entidad TEXT, generacion INTEGER NOT NULL,
+                score REAL NOT NULL, mejores TEXT NOT NULL,
+                PRIMARY KEY (config, entidad));
+        """)
+        return con
+
+    @staticmethod
+    def _sincronizar_corpus(con, c_unicos: list) -> tuple:
+        """Quita del corpus los nombres que ya no están y agrega los nuevos
+        con la generación siguiente. Devuelve ({nombre: generación}, actual)."""
+        previo = dict(con.execute("SELECT nombre, generacion FROM corpus"))
+        actuales = set(c_unicos)
+        quitados = [(n,) for n in previo if n not in actuales]
+        con.executemany("DELETE FROM corpus WHERE nombre = ?", quitados)
+        generacion = max(previo.values(), default=0)
+        nuevos = [n for n in c_unicos if n not in previo]
+        if nuevos:
+            generacion += 1
+            con.executemany("INSERT INTO corpus VALUES (?, ?)", ((n, generacion) for n in nuevos))
+        vigente = {n: g for n, g in previo.items() if n in actuales}
+        vigente.update((n, generacion) for n in nuevos)
+        return vigente, generacion
+
+    def mejor_coincidencia(self, consultas: list, candidatos: list, scorer=fuzz.token_sort_ratio,
+                           umbral: float = None, **kwargs):
+        """Misma firma y resultado que cruce_entidades.mejor_coincidencia."""
+        scores = np.zeros(len(consultas), dtype=np.float64)
+        indices = np.full(len(consultas), -1, dtype=np.int64)
+        if not consultas or not candidatos:
+            return scores, indices
+        q_unicas, q_inversa = _unicos(consultas)
+        c_unicos, c_inversa = _unicos(candidatos)
+        primera = np.full(len(c_unicos), len(candidatos), dtype=np.int64)
+        np.minimum.at(primera, c_inversa, np.arange(len(candidatos), dtype=np.int64))
+        posicion = {n: i for i, n in enumerate(c_unicos)}
+        config = _huella_config(scorer, umbral)
+
+        try:
+            con = self._conectar()
+        except sqlite3.Error as e:
+            log.warning(f"  Caché de cruces no disponible ({e}) — se calcula todo")
+            return mejor_coincidencia(consultas, candidatos, scorer=scorer, umbral=umbral, **kwargs)
+
+        with con:
+            generaciones, actual = self._sincronizar_corpus(con, c_unicos)
+            guardados = {e: (g, s, json.loads(m)) for e, g, s, m in con.execute(
+                "SELECT entidad, generacion, score, mejores FROM cruces WHERE config = ?", (config,))}
+
+            resultado = {}    # entidad -> (score, [nombres empatados])
+            completas, parciales = [], {}
+            for q in q_unicas:
+                if not q:
+                    continue
+                if q not in guardados:
+                    completas.append(q)
+                    continue
+                generacion, score, mejores = guardados[q]
+                vigentes = [n for n in mejores if n in posicion]
+                if mejores and not vigentes:
+                    completas.append(q)  # se fue el mejor: no sabemos cuál es el siguiente
+                    continue
+                resultado[q] = (score, vigentes)
+                if generacion < actual:
+                    parciales.setdefault(generacion, []).append(q)
+
+            def puntuar(qs, nombres):
+                puntos, empates = puntuar_unicos(qs, nombres, scorer=scorer, umbral=umbral, **kwargs)
+                for q, p, e in zip(qs, puntos, empates):
+                    yield q, float(p), [nombres[j] for j in e]
+
+            for q, p, mejores in puntuar(completas, c_unicos):
+                resultado[q] = (p, mejores)
+            for generacion, qs in parciales.items():
+                nuevos = [n for n in c_unicos if generaciones[n] > generacion]
+                for q, p, mejores in puntuar(qs, nuevos):
+                    previo, empatados = resultado[q]
+                    if p > previo:
+                        resultado[q] = (p, mejores)
+                    elif p == previo and p > 0:
+                        resultado[q] = (previo, empatados + mejores)
+
+            calculadas = completas + [q for qs in parciales.values() for q in qs]
+            con.executemany(
+                "INSERT OR REPLACE INTO cruces VALUES (?, ?, ?, ?, ?)",
+                ((config, q, actual, resultado[q][0], json.dumps(resultado[q][1], ensure_ascii=False))
+                 for q in calculadas))
+        con.close()
+
+        n_consultas = sum(1 for q in q_unicas if q)
+        n_parciales = len(calculadas) - len(completas)
+        log.info(f"  Caché de cruces: {n_consultas - len(calculadas)} aciertos, "
+                 f"{n_parciales} parciales (solo contra nombres nuevos), "
+                 f"{len(completas)} fallos de {n_consultas} entidades")
+
+        q_scores = np.zeros(len(q_unicas), dtype=np.float64)
+        q_indices = np.full(len(q_unicas), -1, dtype=np.int64)
+        for k, q in enumerate(q_unicas):
+            if q in resultado:
+                score, mejores = resultado[q]
+                q_scores[k] = score
+                if mejores:
+                    q_indices[k] = primera[min(posicion[n] for n in mejores)]
+        scores[:] = q_scores[q_inversa]
+        indices[:] = q_indices[q_inversa]
+        return scores, indices
@@ -0,0 +1,144 @@
+"""
+src/gazetteer.py
+================
+Nomenclátor único de países/regiones para el campo pais_region de AECID
+("Bolivia, México", "Países en Vías de Desarrollo (No Especificado)"...).
+
+Antes cada consumidor resolvía el texto por su cuenta y fila por fila:
+VIA recorría VULNERABILIDAD_PAIS con búsquedas de subcadena, la limpieza
+del pipeline recorría REGIONES, el endpoint /api/mensual tenía su propia
+lambda de regiones y el cruce con PLACE volvía a partir los strings por
+comas. Acá cada valor distinto de pais_region se resuelve una sola vez
+(resolver, memoizado) en un Destino con todo lo que esos consumidores
+necesitan, y resolver_serie() lo reparte a las filas con
+valores_distintos.por_valor, así el trabajo por fila es una búsqueda por
+código.
+
+Cada campo conserva exactamente la regla de su consumidor original
+(mayúsculas, orden de las listas, valor para nulos).
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+import pandas as pd
+
+try:
+    from valores_distintos import por_valor
+except ImportError:  # importado como src.gazetteer (main.py)
+    from src.valores_distintos import por_valor
+
+# ── Vulnerabilidad institucional por país (fuente: WGI Banco Mundial proxy) ──
+# Escala 0-100 (100 = máximo riesgo). Se toma la primera clave, en este
+# orden, contenida en el texto en minúsculas.
+VULNERABILIDAD_PAIS = {
+    "somalia": 95, "sudan": 90, "sudán del sur": 90, "república centroafricana": 88,
+    "haití": 85, "haiti": 85, "chad": 83, "yemen": 88, "siria": 90, "irak": 80,
+    "afganistán": 87, "afghanistan": 87, "libia": 82, "mali": 78, "malí": 78,
+    "niger": 75, "níger": 75, "burkina": 77, "mozambique": 68, "zimbabwe": 72,
+    "myanmar": 76, "venezuela": 80, "nicaragua": 68, "cuba": 65,
+    "honduras": 62, "guatemala": 60, "paraguay": 55, "bolivia": 52,
+    "ecuador": 48, "perú": 50, "peru": 50, "colombia": 55,
+    "marruecos": 45, "túnez": 42, "tunez": 42, "argelia": 58, "egipto": 62,
+    "jordania": 40, "líbano": 70, "libano": 70, "palestina": 72,
+    "etiopía": 65, "etiopia": 65, "kenya": 55, "tanzania": 48,
+    "uganda": 55, "ruanda": 35, "ghana": 38, "senegal": 40,
+    "no especificado": 70,
+}
+VULNERABILIDAD_DEFAULT = 55
+
+# ── Regiones OCDE (columna region_ocde de intervenciones_clean.csv) ─────────
+REGIONES = {
+    "América Latina y Caribe":    ["bolivia","colombia","ecuador","guatemala","honduras",
+                                    "méxico","mexico","nicaragua","perú","peru","cuba",
+                                    "haití","haiti","venezuela","paraguay","brasil",
+                                    "chile","argentina","costa rica","panamá","panama"],
+    "África Subsahariana":         ["etiopía","etiopia","kenya","mozambique","tanzania",
+                                    "uganda","malí","mali","níger","niger","senegal",
+                                    "ghana","nigeria","chad","ruanda","burkina","benín"],
+    "Norte de África y Oriente Medio": ["marruecos","túnez","tunez","argelia","egipto",
+                                         "jordania","líbano","libano","palestina","siria",
+                                         "irak","yemen","mauritania"],
+    "Asia":                        ["afghanistan","bangladés","filipinas","vietnam",
+                                    "myanmar","nepal","pakistan","cambodia","laos"],
+}
+MARCADORES_NO_ESPECIFICADO = ["no especificado", "ne -", "países en vías"]
+
+# ── Regiones del gráfico mensual del dashboard (/api/mensual) ───────────────
+# Comparación sensible a mayúsculas sobre el texto tal cual.
+REGIONES_DASHBOARD = {
+    "América Latina": ["Bolivia","Colombia","Ecuador","Guatemala","Honduras","México","Nicaragua",
+                       "Perú","Cuba","Haití"],
+    "África":         ["Etiopía","Mozambique","Mali","Niger","Senegal","Chad","Kenya"],
+    "MENA":           ["Marruecos","Túnez","Jordania","Líbano","Palestina","Siria","Yemen"],
+}
+REGION_DASHBOARD_DEFAULT = "Multipaís/Global"
+
+
+class Destino(NamedTuple):
+    paises: tuple          # países concretos, tal como aparecen en pais_region
+    region: str            # región OCDE
+    region_dashboard: str  # agrupación del gráfico mensual
+    vulnerabilidad: int    # VIA del país receptor
+
+
+def _paises(texto: str) -> tuple:
+    """Valores separados por coma, sin las categorías agregadas tipo
+    "Países en Vías de Desarrollo (No Especificado)"."""
+    paises = (p.strip() for p in texto.split(","))
+    return tuple(dict.fromkeys(p for p in paises if p and "No Especificado" not in p))
+
+
+def _region(texto: str) -> str:
+    texto_l = texto.lower()
+    for reg, paises in REGIONES.items():
+        if any(p in texto_l for p in paises):
+            return reg
+    if any(p in texto_l for p in MARCADORES_NO_ESPECIFICADO):
+        return "No Especificado"
+    return "Otras Regiones"
+
+
+def _region_dashboard(texto: str) -> str:
+    for reg, paises in REGIONES_DASHBOARD.items():
+        if any(p in texto for p in paises):
+            return reg
+    return REGION_DASHBOARD_DEFAULT
+
+
+def _vulnerabilidad(texto: str) -> int:
+    texto_l = texto.lower().strip()
+    for k, v in VULNERABILIDAD_PAIS.items():
+        if k in texto_l:
+            return v
+    return VULNERABILIDAD_DEFAULT
+
+
+@lru_cache(maxsize=None)
+def _resolver_texto(texto: str) -> Destino:
+    return Destino(_paises(texto), _region(texto), _region_dashboard(texto), _vulnerabilidad(texto))
+
+
+# Valor nulo (NaN/None): sin países, región "No Especificado" y VIA por defecto
+DESTINO_NULO = Destino((), "No Especificado", _region_dashboard("nan"), VULNERABILIDAD_DEFAULT)
+
+
+def resolver(pais_region) -> Destino:
+    """Destino de un valor de pais_region (memoizado por valor distinto)."""
+    if pais_region is None or (not isinstance(pais_region, str) and pd.isna(pais_region)):
+        return DESTINO_NULO
+    return _resolver_texto(str(pais_region))
+
+
+def resolver_serie(serie: pd.Series, campo: str) -> pd.Series:
+    """Un campo de Destino para cada fila de `serie`, resolviendo cada valor
+    distinto una sola vez."""
+    valores = por_valor(serie, lambda v: getattr(resolver(v), campo), dtype=object)
+    return pd.Series(valores, index=serie.index, name=serie.name).infer_objects()
+
+
+def paises_conocidos(serie: pd.Series) -> set:
+    """Vocabulario de países concretos que aparecen en una columna pais_region
+    (valores separados por coma). Las categorías agregadas tipo "Países en
+    Vías de Desarrollo (No Especificado)" no aportan ningún país: no son
+    algo que pueda mencionarse en un título de contrato."""
+    return set().union(*(resolver(v).paises for v in pd.unique(serie.dropna())))
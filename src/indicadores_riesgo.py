@@ -11,52 +11,170 @@ import logging
 import pandas as pd
 import numpy as np
 
+# La tabla de vulnerabilidad por país vive en el nomenclátor compartido
+from gazetteer import VULNERABILIDAD_DEFAULT, VULNERABILIDAD_PAIS, resolver_serie  # noqa: F401
+from valores_distintos import por_valor
+
 log = logging.getLogger(__name__)
 
-# ── Vulnerabilidad institucional por país (fuente: WGI Banco Mundial proxy) ──
-# Escala 0-100 (100 = máximo riesgo)
-VULNERABILIDAD_PAIS = {
-    "somalia": 95, "sudan": 90, "sudán del sur": 90, "república centroafricana": 88,
-    "haití": 85, "haiti": 85, "chad": 83, "yemen": 88, "siria": 90, "irak": 80,
-    "afganistán": 87, "afghanistan": 87, "libia": 82, "mali": 78, "malí": 78,
-    "niger": 75, "níger": 75, "burkina": 77, "mozambique": 68, "zimbabwe": 72,
-    "myanmar": 76, "venezuela": 80, "nicaragua": 68, "cuba": 65,
-    "honduras": 62, "guatemala": 60, "paraguay": 55, "bolivia": 52,
-    "ecuador": 48, "perú": 50, "peru": 50, "colombia": 55,
-    "marruecos": 45, "túnez": 42, "tunez": 42, "argelia": 58, "egipto": 62,
-    "jordania": 40, "líbano": 70, "libano": 70, "palestina": 72,
-    "etiopía": 65, "etiopia": 65, "kenya": 55, "tanzania": 48,
-    "uganda": 55, "ruanda": 35, "ghana": 38, "senegal": 40,
-    "no especificado": 70,
+
+# ── Evaluación por valor distinto ─────────────────────────────────────────────
+
+def _verdad(serie: pd.Series) -> np.ndarray:
+    """bool(v) de cada fila, como el `if row.get(col)` de calcular_fila
+    (NaN es verdadero)."""
+    if serie.dtype == bool:
+        return serie.to_numpy()
+    if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "iuf":
+        return serie.to_numpy() != 0
+    return por_valor(serie, bool)
+
+
+def _sin_pais(pais) -> bool:
+    pais = str(pais or "")
+    return not pais or pais.lower() in ("", "nan", "no especificado")
+
+
+# ── Concentración por mercado ─────────────────────────────────────────────────
+# Dimensiones en las que se mide la concentración de receptores: nombre ->
+# columnas candidatas, en orden de preferencia. Un mercado es un valor de la
+# dimensión (un país, un código CRS, un año, una región).
+DIMENSIONES_ICR = {
+    "pais":   ["pais_region"],
+    "sector": ["codigo_crs", "sectores_crs"],
+    "anio":   ["fecha"],
+    "region": ["region_ocde", "pais_region"],
 }
-VULNERABILIDAD_DEFAULT = 55
+
+
+def _normalizar_hhi(valor, n):
+    """(x - 1/n) / (1 - 1/n) * 100: 0 = reparto parejo, 100 = monopolio.
+    Con un solo receptor la normalización no está definida y vale 0, como
+    en el HHI global original."""
+    minimo = 1 / n
+    return np.where(n > 1, (valor - minimo) / np.where(n > 1, 1 - minimo, 1) * 100, 0.0)
 
 
 class CalculadorICR:
-    """Índice de Concentración de Receptores (HHI normalizado 0-100)."""
+    """Índice de Concentración de Receptores (HHI normalizado 0-100).
+
+    Una sola pasada: el DataFrame se pasa a formato largo (dimensión,
+    mercado, entidad, importe) con códigos enteros, se suma el importe de
+    cada entidad en cada mercado por una única clave entera y el total de
+    cada mercado se reparte a sus filas (el transform del groupby) para
+    sacar las cuotas. Lineal en filas × dimensiones.
+
+    El ICR de una entidad es su cuota normalizada en cada mercado donde
+    recibe fondos (la parte del HHI del mercado que le corresponde),
+    ponderada por su importe en ese mercado, y promediada entre
+    dimensiones. calcular_mercados() da el HHI normalizado de cada mercado.
+    """
+
+    def _dimensiones(self, df: pd.DataFrame) -> dict:
+        dims = {}
+        for nombre, columnas in DIMENSIONES_ICR.items():
+            col = next((c for c in columnas if c in df.columns), None)
+            if col is None:
+                continue
+            if nombre == "anio":
+                dims[nombre] = pd.to_datetime(df[col], errors="coerce").dt.year.astype("Int64")
+            elif nombre == "region" and col == "pais_region":
+                dims[nombre] = resolver_serie(df[col], "region")
+            else:
+                dims[nombre] = df[col]
+        # Sin ninguna dimensión: un único mercado (concentración global)
+        return dims or {"global": pd.Series(0, index=df.index)}
+
+    def _cuotas(self, df: pd.DataFrame, col_entidad: str, col_importe: str):
+        """Importe y cuota de cada (dimensión, mercado, entidad), con el
+        número de receptores del mercado, más los importes y códigos de
+        entidad por fila. None si no hay importe."""
+        importe = pd.to_numeric(df[col_importe], errors="coerce").fillna(0).to_numpy(dtype=float)
+        if importe.sum() == 0:
+            return None
+        cod_ent, entidades = pd.factorize(df[col_entidad], sort=True)
+        dims = self._dimensiones(df)
+
+        # Formato largo con un código de mercado global (desplazado por
+        # dimensión) y una única clave entera mercado × entidad
+        cod_mer, dim_mer, etiquetas = [], [], []
+        for d, serie in enumerate(dims.values()):
+            codigos, mercados = pd.factorize(serie)
+            cod_mer.append(np.where(codigos >= 0, codigos + len(dim_mer), -1))
+            dim_mer.extend([d] * len(mercados))
+            etiquetas.append(mercados)
+        mercado = np.concatenate(cod_mer)
+        entidad = np.tile(cod_ent, len(dims))
+        validos = (mercado >= 0) & (entidad >= 0)
+        clave = mercado[validos] * len(entidades) + entidad[validos]
+
+        codigos, claves = pd.factorize(clave)
+        importe_me = np.bincount(codigos, weights=np.tile(importe, len(dims))[validos])
+        mercado_me = claves // len(entidades)
+        total_mercado = np.bincount(mercado_me, weights=importe_me, minlength=len(dim_mer))
+        n_receptores = np.bincount(mercado_me, minlength=len(dim_mer))
+        dim_mer = np.array(dim_mer, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cuota = np.nan_to_num(importe_me / total_mercado[mercado_me])
+        cuotas = pd.DataFrame({
+            "dimension": dim_mer[mercado_me],
+            "mercado": mercado_me - np.searchsorted(dim_mer, dim_mer[mercado_me]),
+            "entidad": claves % len(entidades),
+            "importe": importe_me,
+            "total_mercado": total_mercado[mercado_me],
+            "n_receptores": n_receptores[mercado_me],
+            "cuota": cuota,
+        })
+        return cuotas, list(dims), etiquetas, entidades, cod_ent, importe
 
     def calcular(self, df: pd.DataFrame, col_entidad="entidad",
                  col_importe="importe_eur") -> pd.DataFrame:
         if df.empty or col_entidad not in df.columns:
             return pd.DataFrame(columns=["entidad", "icr", "n_contratos", "importe_total"])
-
-        df = df.copy()
-        df[col_importe] = pd.to_numeric(df[col_importe], errors="coerce").fillna(0)
-        total = df[col_importe].sum()
-        if total == 0:
+        resultado = self._cuotas(df, col_entidad, col_importe)
+        if resultado is None:
             return pd.DataFrame(columns=["entidad", "icr", "n_contratos", "importe_total"])
-
-        grp = df.groupby(col_entidad)[col_importe].agg(["sum", "count"]).reset_index()
-        grp.columns = ["entidad", "importe_total", "n_contratos"]
-        grp["cuota"] = grp["importe_total"] / total
-        hhi = float((grp["cuota"] ** 2).sum())
-        # Normalizar HHI (0=perfectamente distribuido, 1=monopolio) → 0-100
-        n = len(grp)
-        hhi_min = 1 / n if n > 0 else 0
-        icr_norm = (hhi - hhi_min) / (1 - hhi_min) * 100 if (1 - hhi_min) > 0 else 0
-        grp["icr"] = round(icr_norm, 1)
-        log.info(f"  ICR global: {icr_norm:.1f} (HHI={hhi:.4f}, n={n} entidades)")
-        return grp[["entidad", "icr", "n_contratos", "importe_total"]]
+        cuotas, nombres, _, entidades, cod_ent, importe = resultado
+
+        cuotas["cuota_norm"] = np.clip(_normalizar_hhi(cuotas["cuota"], cuotas["n_receptores"]), 0, None)
+        cuotas["ponderada"] = cuotas["cuota_norm"] * cuotas["importe"]
+        por_dim = cuotas.groupby(["entidad", "dimension"])[["ponderada", "importe"]].sum()
+        icr_dim = (por_dim["ponderada"] / por_dim["importe"].where(por_dim["importe"] > 0)).unstack("dimension")
+        icr_dim = icr_dim.reindex(index=range(len(entidades)), columns=range(len(nombres)))
+        icr_dim.columns = [f"icr_{n}" for n in nombres]
+
+        con_entidad = cod_ent >= 0
+        out = pd.DataFrame({
+            "entidad": entidades,
+            "icr": icr_dim.mean(axis=1).round(1).to_numpy(),
+            "n_contratos": np.bincount(cod_ent[con_entidad], minlength=len(entidades)),
+            "importe_total": np.bincount(cod_ent[con_entidad], weights=importe[con_entidad],
+                                         minlength=len(entidades)),
+        })
+        out = pd.concat([out, icr_dim.round(1).reset_index(drop=True)], axis=1)
+        log.info(f"  ICR por entidad: media {out['icr'].mean():.1f}, máx {out['icr'].max():.1f} "
+                 f"({len(out)} entidades; dimensiones: {', '.join(nombres)})")
+        return out
+
+    def calcular_mercados(self, df: pd.DataFrame, col_entidad="entidad",
+                          col_importe="importe_eur") -> pd.DataFrame:
+        """HHI normalizado (0-100) de cada mercado de cada dimensión."""
+        columnas = ["dimension", "mercado", "hhi", "icr", "n_receptores", "importe_total"]
+        if df.empty or col_entidad not in df.columns:
+            return pd.DataFrame(columns=columnas)
+        resultado = self._cuotas(df, col_entidad, col_importe)
+        if resultado is None:
+            return pd.DataFrame(columns=columnas)
+        cuotas, nombres, etiquetas = resultado[:3]
+
+        cuotas["cuota2"] = cuotas["cuota"] ** 2
+        mer = cuotas.groupby(["dimension", "mercado"]).agg(
+            hhi=("cuota2", "sum"), n_receptores=("entidad", "size"), importe_total=("importe", "sum"),
+        ).reset_index()
+        mer["icr"] = np.round(_normalizar_hhi(mer["hhi"], mer["n_receptores"]), 1)
+        mer["mercado"] = [etiquetas[d][m] for d, m in zip(mer["dimension"], mer["mercado"])]
+        mer["dimension"] = [nombres[d] for d in mer["dimension"]]
+        return mer[columnas]
 
 
 class CalculadorSOG:
@@ -71,18 +189,30 @@ class CalculadorSOG:
     }
 
     def calcular_fila(self, row: pd.Series) -> float:
+        """Referencia fila a fila de calcular()."""
         score = 0
         score += self.PESOS["es_ooii"]              if row.get("es_ooii", False)              else 0
         score += self.PESOS["ruptura_r2"]            if row.get("ruptura_r2", False)            else 0
         score += self.PESOS["ruptura_r3"]            if row.get("ruptura_r3", False)            else 0
         score += self.PESOS["adjudicacion_directa"]  if row.get("adjudicacion_directa", False)  else 0
-        pais = str(row.get("pais_region", "") or "")
-        if not pais or pais.lower() in ("", "nan", "no especificado"):
+        if _sin_pais(row.get("pais_region", "")):
             score += self.PESOS["sin_pais"]
         return min(100, score)
 
     def calcular(self, df: pd.DataFrame) -> pd.Series:
-        return df.apply(self.calcular_fila, axis=1)
+        """Suma ponderada de las columnas booleanas, acotada a 100 (mismo
+        resultado que calcular_fila sobre cada fila)."""
+        score = np.zeros(len(df), dtype=np.int64)
+        if "es_ooii" in df.columns:
+            score += self.PESOS["es_ooii"] * _verdad(df["es_ooii"])
+        for col in ("ruptura_r2", "ruptura_r3", "adjudicacion_directa"):
+            if col in df.columns:
+                score += self.PESOS[col] * _verdad(df[col])
+        if "pais_region" in df.columns:
+            score += self.PESOS["sin_pais"] * por_valor(df["pais_region"], _sin_pais)
+        else:
+            score += self.PESOS["sin_pais"]
+        return pd.Series(np.minimum(score, 100), index=df.index)
 
 
 class CalculadorRES:
@@ -93,24 +223,23 @@ class CalculadorRES:
             return pd.Series([50] * len(df))
         from src.trazabilidad_score import ESLABON_SCORE
         max_score = max(ESLABON_SCORE.values())
-        return df["eslabon_corte"].apply(
-            lambda e: round((1 - ESLABON_SCORE.get(int(e), 0) / max_score) * 100, 1)
-        )
+        # Riesgo de cada eslabón, indexado por número; fuera de la tabla el
+        # eslabón puntúa 0 (riesgo 100)
+        tabla = np.array([round((1 - ESLABON_SCORE.get(e, 0) / max_score) * 100, 1)
+                          for e in range(max(ESLABON_SCORE) + 1)])
+        eslabon = df["eslabon_corte"].astype(np.int64).to_numpy()  # int(e): NaN sigue fallando
+        dentro = (eslabon >= 0) & (eslabon < len(tabla))
+        return pd.Series(np.where(dentro, tabla[np.where(dentro, eslabon, 0)], 100.0),
+                         index=df.index, name="eslabon_corte")
 
 
 class CalculadorVIA:
     """Vulnerabilidad Institucional del país receptor (0-100)."""
 
     def calcular(self, df: pd.DataFrame, col_pais="pais_region") -> pd.Series:
-        def _score(pais):
-            if pd.isna(pais):
-                return VULNERABILIDAD_DEFAULT
-            pais_l = str(pais).lower().strip()
-            for k, v in VULNERABILIDAD_PAIS.items():
-                if k in pais_l:
-                    return v
-            return VULNERABILIDAD_DEFAULT
-        return df[col_pais].apply(_score) if col_pais in df.columns else pd.Series([VULNERABILIDAD_DEFAULT] * len(df))
+        if col_pais not in df.columns:
+            return pd.Series([VULNERABILIDAD_DEFAULT] * len(df))
+        return resolver_serie(df[col_pais], "vulnerabilidad")
 
 
 # ── API pública ───────────────────────────────────────────────────────────────
@@ -128,10 +257,15 @@ def calcular_scores_completos(df: pd.DataFrame) -> pd.DataFrame:
     calc_res = CalculadorRES()
     calc_via = CalculadorVIA()
 
-    df = df.copy()
-    df["sog"] = calc_sog.calcular(df)
-    df["res"] = calc_res.calcular(df)
-    df["via"] = calc_via.calcular(df)
+    # Los indicadores se leen del DataFrame original; para agregar solo hacen
+    # falta entidad e importe (copiarlo entero costaba más que calcularlos)
+    sog, res, via = calc_sog.calcular(df), calc_res.calcular(df), calc_via.calcular(df)
+    # ICR por entidad: usa además las dimensiones (país, sector, año, región)
+    df_icr = calc_icr.calcular(df)
+    df = df[["entidad", "importe_eur"]].copy()
+    df["sog"] = sog
+    df["res"] = res
+    df["via"] = via
 
     # Score integrado por fila: ICR se aplica a nivel entidad
     df["score_fila"] = (
@@ -150,8 +284,6 @@ def calcular_scores_completos(df: pd.DataFrame) -> pd.DataFrame:
         score_medio=("score_fila", "mean"),
     ).reset_index()
 
-    # ICR por entidad
-    df_icr = calc_icr.calcular(df)
     if not df_icr.empty:
         agg = agg.merge(df_icr[["entidad", "icr"]], on="entidad", how="left")
     else:
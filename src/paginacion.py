@@ -0,0 +1,126 @@
+"""
+src/paginacion.py
+=================
+Motor compartido de descarga concurrente de páginas numeradas.
+
+Los listados que scrapeamos (datos.aecid.es, BDNS) exponen el total de
+páginas desde la primera respuesta, así que el resto se puede pedir en
+paralelo en vez de una detrás de otra. Este módulo se encarga de:
+
+  - acotar las peticiones en vuelo (tamaño del pool de hilos),
+  - respetar un presupuesto de peticiones por segundo (LimitadorTasa),
+  - devolver los resultados EN ORDEN DE PÁGINA, aunque lleguen desordenados.
+
+Los reintentos siguen siendo responsabilidad de la función de descarga
+que se le pasa (p. ej. _get() de scraper_aecid.py), para no cambiar la
+semántica de cada scraper.
+
+ejecutar_fuentes() es el mismo patrón un nivel más arriba: corre a la vez
+descargas independientes (una por fuente en pipeline.paso_ingesta), con un
+tiempo máximo por fuente y sin que el fallo de una tumbe a las demás.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class LimitadorTasa:
+    """Reparte turnos espaciados 1/rps segundos entre todos los hilos que lo
+    comparten. rps=None o 0 desactiva el límite."""
+
+    def __init__(self, rps: float = None):
+        self.intervalo = 1.0 / rps if rps else 0.0
+        self._lock = threading.Lock()
+        self._proximo = 0.0
+
+    def esperar(self) -> None:
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def descargar_paginas(descargar, paginas, concurrencia: int = 4,
+                      rps: float = None) -> list:
+    """
+    Llama a descargar(pagina) para cada página de `paginas` con como mucho
+    `concurrencia` peticiones en vuelo y `rps` peticiones por segundo.
+    Devuelve la lista de resultados en el mismo orden que `paginas`. Si
+    descargar() lanza una excepción, esa página queda como None (igual que
+    cuando _get() agota sus reintentos).
+    """
+    paginas = list(paginas)
+    if not paginas:
+        return []
+    limitador = LimitadorTasa(rps)
+
+    def _tarea(pagina):
+        limitador.esperar()
+        try:
+            return descargar(pagina)
+        except Exception as e:
+            log.warning(f"  pagina {pagina}: error inesperado ({e})")
+            return None
+
+    if concurrencia <= 1:
+        return [_tarea(p) for p in paginas]
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        return list(pool.map(_tarea, paginas))
+
+
+def ejecutar_fuentes(trabajos: dict, timeouts: dict = None, timeout_defecto: float = None):
+    """
+    Corre cada trabajos[nombre]() en su propio hilo, todos a la vez, y
+    espera a cada uno como mucho timeouts[nombre] segundos desde el
+    arranque (timeout_defecto si no figura; None = sin límite).
+
+    Devuelve (resultados, errores, duraciones): resultados[nombre] con lo
+    que devolvió cada trabajo terminado, errores[nombre] con la excepción
+    de los que fallaron o TimeoutError de los que no terminaron a tiempo, y
+    los segundos de cada uno.
+
+    Los hilos son daemon: una fuente colgada no se puede interrumpir, pero
+    tampoco retiene la salida del proceso, y lo que devuelva tarde se
+    descarta. Por eso los trabajos no deberían escribir archivos compartidos
+    por su cuenta: quien llama escribe con los resultados.
+    """
+    timeouts = timeouts or {}
+    resultados, errores, duraciones = {}, {}, {}
+    terminados = {}
+
+    def _correr(nombre, trabajo):
+        t0 = time.monotonic()
+        try:
+            resultado, error = trabajo(), None
+        except Exception as e:
+            resultado, error = None, e
+        terminados[nombre] = (resultado, error, time.monotonic() - t0)
+
+    hilos = {}
+    inicio = time.monotonic()
+    for nombre, trabajo in trabajos.items():
+        hilo = threading.Thread(target=_correr, args=(nombre, trabajo), name=f"fuente-{nombre}", daemon=True)
+        hilo.start()
+        hilos[nombre] = hilo
+
+    for nombre, hilo in hilos.items():
+        limite = timeouts.get(nombre, timeout_defecto)
+        hilo.join(None if limite is None else max(0.0, inicio + limite - time.monotonic()))
+        if nombre not in terminados:
+            errores[nombre] = TimeoutError(f"{nombre}: sin terminar tras {limite:g}s")
+            duraciones[nombre] = time.monotonic() - inicio
+            continue
+        resultado, error, duraciones[nombre] = terminados[nombre]
+        if error is not None:
+            errores[nombre] = error
+        else:
+            resultados[nombre] = resultado
+    return resultados, errores, duraciones
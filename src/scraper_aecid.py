@@ -11,13 +11,14 @@ como fallback secundario por si en algún momento se restaura. La fuente
 primaria ahora es _scrape_lista_intervenciones(), que pagina esa tabla.
 """
 import re
-import time
 import logging
-import requests
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+from cliente_http import HTTP
+from paginacion import descargar_paginas
+
 log = logging.getLogger(__name__)
 
 HEADERS = {
@@ -27,17 +28,23 @@ HEADERS = {
 BASE = "https://datos.aecid.es"
 LISTADO_URL = f"{BASE}/lista-de-intervenciones"
 
+# Descarga del listado: peticiones en vuelo y presupuesto de peticiones por
+# segundo. Con CONCURRENCIA_LISTADO=1 y RPS_LISTADO=2.5 se reproduce el
+# comportamiento secuencial anterior (una página cada 0.4 s).
+CONCURRENCIA_LISTADO = 4
+RPS_LISTADO = 5.0
+
 
 def _get(url, params=None, retries=3):
-    for i in range(retries):
-        try:
-            r = requests.get(url, params=params, headers=HEADERS, timeout=30)
-            r.raise_for_status()
-            return r
-        except Exception as e:
-            log.warning(f"  intento {i+1}/{retries} fallido: {e}")
-            time.sleep(2 ** i)
-    return None
+    """GET por el cliente compartido (reintenta errores de red, 429 y 5xx
+    con backoff). Devuelve None si la respuesta final no es 2xx."""
+    try:
+        r = HTTP.get(url, params=params, headers=HEADERS, reintentos=retries - 1, usar_cache=True)
+        r.raise_for_status()
+        return r
+    except Exception as e:
+        log.warning(f"  GET {url} fallido: {e}")
+        return None
 
 
 def _parsear_importe(texto: str):
@@ -92,17 +99,31 @@ def _parsear_fila(tr) -> dict:
     }
 
 
-def _scrape_lista_intervenciones(delta: int = 60, max_paginas: int = 30) -> pd.DataFrame:
-    """Fuente primaria: pagina la tabla HTML real del portal (~830 registros)."""
+def _filas_de_pagina(html: str):
+    """Filas de la tabla de resultados de una página, o None si no hay tabla."""
     from bs4 import BeautifulSoup
 
+    soup = BeautifulSoup(html, "lxml")
+    tabla = soup.find("table", class_="tabla-resultados")
+    if tabla is None:
+        return None
+    return [_parsear_fila(tr) for tr in tabla.find("tbody").find_all("tr")]
+
+
+def _scrape_lista_intervenciones(delta: int = 60, max_paginas: int = 30,
+                                 concurrencia: int = CONCURRENCIA_LISTADO,
+                                 rps: float = RPS_LISTADO) -> pd.DataFrame:
+    """Fuente primaria: pagina la tabla HTML real del portal (~830 registros).
+
+    La primera página se pide sola porque de ella sale el total de
+    resultados; el resto se descarga en paralelo (ver src/paginacion.py)
+    y se concatena en orden de página."""
     r = _get(LISTADO_URL, params={"delta": delta, "start": 1})
     if r is None:
         return pd.DataFrame()
 
-    soup = BeautifulSoup(r.text, "lxml")
-    tabla = soup.find("table", class_="tabla-resultados")
-    if tabla is None:
+    filas = _filas_de_pagina(r.text)
+    if filas is None:
         log.warning("  Lista de intervenciones: tabla no encontrada en la página")
         return pd.DataFrame()
 
@@ -110,19 +131,17 @@ def _scrape_lista_intervenciones(delta: int = 60, max_paginas: int = 30) -> pd.D
     total = int(m.group(1)) if m else delta
     n_paginas = min(max_paginas, -(-total // delta))  # ceil division
 
-    filas = [_parsear_fila(tr) for tr in tabla.find("tbody").find_all("tr")]
-
-    for pagina in range(2, n_paginas + 1):
-        time.sleep(0.4)  # cortesia con el servidor
+    def _descargar(pagina):
         r = _get(LISTADO_URL, params={"delta": delta, "start": pagina})
         if r is None:
             log.warning(f"  pagina {pagina} fallo tras reintentos -- se continua con lo obtenido")
-            continue
-        soup = BeautifulSoup(r.text, "lxml")
-        tabla = soup.find("table", class_="tabla-resultados")
-        if tabla is None:
-            continue
-        filas.extend(_parsear_fila(tr) for tr in tabla.find("tbody").find_all("tr"))
+            return None
+        return _filas_de_pagina(r.text)
+
+    paginas = range(2, n_paginas + 1)
+    for filas_pagina in descargar_paginas(_descargar, paginas, concurrencia=concurrencia, rps=rps):
+        if filas_pagina:
+            filas.extend(filas_pagina)
 
     log.info(f"  Lista de intervenciones: {len(filas)}/{total} registros ({n_paginas} paginas)")
     return pd.DataFrame(filas)
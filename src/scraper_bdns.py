@@ -40,12 +40,20 @@ correspondiente (ej. "FUNDACION OXFAM INTERMON FUNDACION PRIVADA" <->
 "Fundación Oxfam Intermón").
 """
 import re
+import json
+import time
 import logging
 import unicodedata
-import requests
+import numpy as np
 import pandas as pd
+from pathlib import Path
+from datetime import datetime
 from rapidfuzz import fuzz
 
+from cliente_http import HTTP
+from cruce_entidades import CacheCruces, mejor_coincidencia
+from paginacion import descargar_paginas
+
 log = logging.getLogger(__name__)
 HEADERS = {"Accept": "application/json", "User-Agent": "Mozilla/5.0 (compatible; MonitorMonteverde/2.0)"}
 BASE = "https://www.infosubvenciones.es/bdnstrans/api"
@@ -62,8 +70,33 @@ FILTRO_ORGANISMO = ("COOPERACI", "INTERNACIONAL")
 # antes si el API marca last=True.
 MAX_PAGINAS_CONCESIONES = 130
 
+# Paginación paralela (ver _paginar): tras la primera página, que trae
+# totalPages, el resto se pide con como mucho CONCURRENCIA_BDNS peticiones
+# en vuelo y RPS_BDNS peticiones por segundo. Cada página fallida se
+# reintenta por separado hasta REINTENTOS_PAGINA veces (los errores de red
+# y los 429/5xx ya los reintenta antes el cliente HTTP, respetando
+# Retry-After; estos cubren además respuestas sin JSON válido).
+CONCURRENCIA_BDNS = 6
+RPS_BDNS = 10.0
+REINTENTOS_PAGINA = 3
+
+# Modo incremental de /concesiones: se piden las concesiones de la más
+# reciente a la más antigua (ORDEN_CONCESIONES), así que basta con guardar
+# la marca de agua (fechaConcesion más alta ya descargada) junto al CSV y
+# dejar de paginar en cuanto aparece una página con concesiones anteriores
+# a ella. Las del mismo día que la marca se vuelven a pedir y las deduplica
+# la fusión con el CSV previo (por id_concesion).
+ORDEN_CONCESIONES = {"order": "fechaConcesion", "direccion": "desc"}
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "raw"
+PATH_CONCESIONES = DATA_DIR / "bdns_concesiones.csv"
+PATH_WATERMARK = DATA_DIR / "bdns_concesiones_watermark.json"
+
+
+def _path_watermark(path_csv: Path) -> Path:
+    return Path(path_csv).with_name(Path(path_csv).stem + "_watermark.json")
+
 RE_PERSONA_FISICA = re.compile(r"^\*{3}\d")           # beneficiario enmascarado: "***1234** NOMBRE"
-RE_CIF_PREFIJO    = re.compile(r"^[A-Z]\d{7,8}[A-Z]?\s+")  # "G82257064 FUNDACIÓN..." -> "FUNDACIÓN..."
+RE_CIF_PREFIJO    = re.compile(r"^([A-Z]\d{7,8}[A-Z]?)\s+")  # "G82257064 FUNDACIÓN..." -> "FUNDACIÓN..."
 
 
 def _normalizar(s: str) -> str:
@@ -76,6 +109,12 @@ def _normalizar(s: str) -> str:
     return re.sub(r"\s+", " ", s).strip()
 
 
+def _normalizar_unicos(valores: pd.Series) -> list:
+    """_normalizar() aplicado una vez por valor distinto (muchos se repiten)."""
+    unicos = pd.unique(valores.astype(str))
+    return valores.astype(str).map(dict(zip(unicos, map(_normalizar, unicos)))).tolist()
+
+
 def _es_persona_fisica(beneficiario: str) -> bool:
     return bool(RE_PERSONA_FISICA.match(str(beneficiario or "")))
 
@@ -85,13 +124,109 @@ def _limpiar_beneficiario(beneficiario: str) -> str:
     return RE_CIF_PREFIJO.sub("", str(beneficiario or "")).strip()
 
 
+def _extraer_cif(beneficiario: str) -> str:
+    """'G82257064 FUNDACIÓN AYUDA EN ACCIÓN' -> 'G82257064' ("" si no trae).
+    Las personas físicas vienen enmascaradas ("***1234**") y no matchean."""
+    m = RE_CIF_PREFIJO.match(str(beneficiario or ""))
+    return m.group(1) if m else ""
+
+
+# ── Paginación compartida por /convocatorias y /concesiones ──────────────────
+
+def _buscar_con_reintentos(buscar, texto, pagina, tam, reintentos=REINTENTOS_PAGINA):
+    """Los _buscar_* devuelven {} si la petición falla (agotados ya los
+    reintentos del cliente HTTP) o si la respuesta no es JSON válido; acá se
+    reintenta solo esa página, con backoff exponencial, antes de darla por
+    perdida."""
+    for i in range(reintentos):
+        data = buscar(texto=texto, pagina=pagina, tam=tam)
+        if data:
+            return data
+        if i < reintentos - 1:
+            time.sleep(2 ** i)
+    log.warning(f"  BDNS: página {pagina} sin respuesta tras {reintentos} intentos — se omite")
+    return None
+
+
+def _paginar(buscar, texto="AECID", max_paginas=10, tam=50,
+             concurrencia=CONCURRENCIA_BDNS, rps=RPS_BDNS, parar=None,
+             estado: dict = None) -> list:
+    """
+    Devuelve la lista de 'content' de cada página, en orden de página.
+
+    La primera página se pide sola: de ella se lee totalPages y el resto se
+    descarga en paralelo (src/paginacion.py). Si el API no informa
+    totalPages se recorre secuencialmente hasta last=True, como antes.
+
+    parar(content) -> bool permite cortar antes (modo incremental): las
+    páginas se piden en tandas de `concurrencia` y se deja de pedir en
+    cuanto una página cumple la condición (esa página sí se incluye).
+
+    Si se pasa `estado`, en él quedan los huecos de la descarga:
+    estado["fallidas"] (páginas sin respuesta tras los reintentos, que no
+    aparecen en la lista) y estado["truncado"] (se paró en max_paginas
+    antes de la última página o del corte).
+    """
+    estado = {} if estado is None else estado
+    estado.update(fallidas=[], truncado=False)
+
+    primera = _buscar_con_reintentos(buscar, texto, 0, tam)
+    if primera is None:
+        estado["fallidas"].append(0)
+        return []
+    if not primera.get("content"):
+        return []
+    paginas = [primera["content"]]
+    if primera.get("last", True) or (parar and parar(primera["content"])):
+        return paginas
+
+    total = primera.get("totalPages")
+    if total is None:
+        for p in range(1, max_paginas):
+            data = _buscar_con_reintentos(buscar, texto, p, tam)
+            if data is None:
+                estado["fallidas"].append(p)
+                return paginas
+            if not data.get("content"):
+                return paginas
+            paginas.append(data["content"])
+            if data.get("last", True) or (parar and parar(data["content"])):
+                return paginas
+        estado["truncado"] = True
+        return paginas
+
+    n_paginas = min(max_paginas, int(total))
+
+    def _descargar(p):
+        data = _buscar_con_reintentos(buscar, texto, p, tam)
+        return None if data is None else data.get("content", [])
+
+    tanda = n_paginas if parar is None else max(1, concurrencia)
+    for inicio in range(1, n_paginas, tanda):
+        numeros = range(inicio, min(inicio + tanda, n_paginas))
+        contenidos = descargar_paginas(_descargar, numeros,
+                                       concurrencia=concurrencia, rps=rps)
+        for p, content in zip(numeros, contenidos):
+            if content is None:
+                estado["fallidas"].append(p)
+                continue
+            paginas.append(content)
+            if parar and parar(content):
+                log.info(f"  BDNS: corte incremental en la página {p}/{total}")
+                return paginas
+    estado["truncado"] = n_paginas < int(total)
+    log.info(f"  BDNS: {n_paginas}/{total} páginas descargadas "
+             f"(concurrencia={concurrencia})")
+    return paginas
+
+
 # ── Convocatorias ─────────────────────────────────────────────────────────────
 
 def _buscar_convocatorias(texto="AECID", pagina=0, tam=50) -> dict:
     url = f"{BASE}/convocatorias/busqueda"
     params = {"descripcion": texto, "pageSize": tam, "page": pagina}
     try:
-        r = requests.get(url, params=params, headers=HEADERS, timeout=30)
+        r = HTTP.get(url, params=params, headers=HEADERS, usar_cache=True)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -99,16 +234,13 @@ def _buscar_convocatorias(texto="AECID", pagina=0, tam=50) -> dict:
         return {}
 
 
-def scrape_bdns(texto_busqueda="AECID", max_paginas=10) -> pd.DataFrame:
+def scrape_bdns(texto_busqueda="AECID", max_paginas=10,
+                concurrencia=CONCURRENCIA_BDNS) -> pd.DataFrame:
     log.info("Scraper BDNS (convocatorias) iniciando...")
     rows = []
 
-    for p in range(max_paginas):
-        data = _buscar_convocatorias(texto=texto_busqueda, pagina=p)
-        content = data.get("content", [])
-        if not content:
-            break
-
+    for content in _paginar(_buscar_convocatorias, texto=texto_busqueda,
+                            max_paginas=max_paginas, concurrencia=concurrencia):
         for c in content:
             nivel3 = (c.get("nivel3") or "").upper()
             if not all(palabra in nivel3 for palabra in FILTRO_ORGANISMO):
@@ -128,9 +260,6 @@ def scrape_bdns(texto_busqueda="AECID", max_paginas=10) -> pd.DataFrame:
                 "fuente":            "BDNS",
             })
 
-        if data.get("last", True):
-            break
-
     if not rows:
         log.warning("  BDNS convocatorias sin datos — usando seed")
         rows = _seed_bdns()
@@ -145,9 +274,9 @@ def scrape_bdns(texto_busqueda="AECID", max_paginas=10) -> pd.DataFrame:
 
 def _buscar_concesiones(texto="AECID", pagina=0, tam=50) -> dict:
     url = f"{BASE}/concesiones/busqueda"
-    params = {"descripcion": texto, "pageSize": tam, "page": pagina}
+    params = {"descripcion": texto, "pageSize": tam, "page": pagina, **ORDEN_CONCESIONES}
     try:
-        r = requests.get(url, params=params, headers=HEADERS, timeout=30)
+        r = HTTP.get(url, params=params, headers=HEADERS, usar_cache=True)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -155,23 +284,111 @@ def _buscar_concesiones(texto="AECID", pagina=0, tam=50) -> dict:
         return {}
 
 
+def _cargar_concesiones_previas(path: Path) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(path, dtype={"numero_convocatoria": str})
+    except Exception as e:
+        log.warning(f"  No se pudo leer {path.name} ({e}) — se descarga todo")
+        return pd.DataFrame()
+
+
+def _calcular_watermark(df: pd.DataFrame) -> dict:
+    fechas = df["fecha_concesion"].dropna().astype(str).str[:10]
+    fechas = fechas[fechas != ""]
+    if fechas.empty:
+        return {}
+    return {"fecha_concesion": fechas.max()}
+
+
+def _corte_incremental(corte: str):
+    """
+    parar(content) para _paginar: True en la primera página con alguna
+    concesión anterior a `corte`. Solo vale si las páginas llegan de la más
+    reciente a la más antigua; si alguna fecha sube respecto de la anterior
+    (el API ignoró ORDEN_CONCESIONES) ya no se corta y se sigue hasta el
+    final, como en la descarga completa.
+    """
+    estado = {"ultima": None, "ordenado": True}
+
+    def parar(content):
+        if not estado["ordenado"]:
+            return False
+        fechas = [f for f in (str(c.get("fechaConcesion") or "")[:10] for c in content) if f]
+        if estado["ultima"] is not None:
+            fechas = [estado["ultima"]] + fechas
+        if any(a < b for a, b in zip(fechas, fechas[1:])):
+            estado["ordenado"] = False
+            log.warning("  BDNS concesiones: el API no devolvió las concesiones ordenadas "
+                        "por fecha descendente — se descarga todo sin corte incremental")
+            return False
+        if fechas:
+            estado["ultima"] = fechas[-1]
+        return any(f < corte for f in fechas)
+
+    return parar
+
+
+def cargar_watermark(previas: pd.DataFrame = None, path: Path = PATH_WATERMARK) -> dict:
+    """Marca de agua guardada; si falta el JSON pero hay CSV previo, se
+    reconstruye a partir de él."""
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.warning(f"  No se pudo leer la marca de agua BDNS ({e}) — se recalcula")
+    if previas is not None and not previas.empty and "fecha_concesion" in previas.columns:
+        return _calcular_watermark(previas)
+    return {}
+
+
+def guardar_watermark(df_concesiones: pd.DataFrame, path: Path = PATH_WATERMARK) -> None:
+    """Se llama DESPUÉS de escribir el CSV, para que la marca nunca adelante
+    a los datos en disco. Si la descarga dejó huecos, scrape_concesiones_aecid
+    deja en df.attrs["marca_de_agua"] la marca que hay que conservar."""
+    if df_concesiones.empty or "fecha_concesion" not in df_concesiones.columns:
+        return
+    marca = dict(df_concesiones.attrs.get("marca_de_agua") or _calcular_watermark(df_concesiones))
+    if not marca:
+        return
+    marca["actualizado"] = datetime.now().isoformat(timespec="seconds")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(marca, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
 def scrape_concesiones_aecid(texto_busqueda="AECID", max_paginas=MAX_PAGINAS_CONCESIONES,
-                              tam=50) -> pd.DataFrame:
+                              tam=50, concurrencia=CONCURRENCIA_BDNS,
+                              incremental=False, path_previo: Path = PATH_CONCESIONES) -> pd.DataFrame:
     """
     Descarga las concesiones (beneficiario + importe real) de convocatorias
     de AECID. Es la pieza que faltaba para calcular importes reales por
     convocatoria [pendiente #3] y para el cruce AECID↔BDNS por entidad
     implementadora [pendiente #2].
+
+    Con incremental=True solo se piden las páginas posteriores a la marca
+    de agua (ver cargar_watermark) y se fusionan con el CSV previo en
+    path_previo, deduplicando por id_concesion. Si no hay CSV o marca
+    previa, se hace la descarga completa.
     """
     log.info("Scraper BDNS (concesiones) iniciando...")
     rows = []
 
-    for p in range(max_paginas):
-        data = _buscar_concesiones(texto=texto_busqueda, pagina=p, tam=tam)
-        content = data.get("content", [])
-        if not content:
-            break
-
+    previas, parar, marca = pd.DataFrame(), None, {}
+    if incremental:
+        previas = _cargar_concesiones_previas(Path(path_previo))
+        marca = cargar_watermark(previas, _path_watermark(path_previo))
+        if previas.empty or not marca.get("fecha_concesion"):
+            log.info("  BDNS concesiones: sin marca de agua previa — descarga completa")
+        else:
+            corte = marca["fecha_concesion"]
+            log.info(f"  BDNS concesiones: modo incremental desde {corte} "
+                     f"({len(previas)} concesiones previas)")
+            parar = _corte_incremental(corte)
+
+    estado = {}
+    for content in _paginar(_buscar_concesiones, texto=texto_busqueda, max_paginas=max_paginas,
+                            tam=tam, concurrencia=concurrencia, parar=parar, estado=estado):
         for c in content:
             nivel3 = (c.get("nivel3") or "").upper()
             if not all(palabra in nivel3 for palabra in FILTRO_ORGANISMO):
@@ -182,6 +399,7 @@ def scrape_concesiones_aecid(texto_busqueda="AECID", max_paginas=MAX_PAGINAS_CON
                 "id_concesion":        c.get("id", ""),
                 "cod_concesion":       c.get("codConcesion", ""),
                 "beneficiario":        _limpiar_beneficiario(beneficiario_raw),
+                "cif_beneficiario":    _extraer_cif(beneficiario_raw),
                 "es_persona_fisica":   _es_persona_fisica(beneficiario_raw),
                 "importe_eur":         c.get("importe", 0) or 0,
                 "fecha_concesion":     c.get("fechaConcesion", ""),
@@ -192,19 +410,39 @@ def scrape_concesiones_aecid(texto_busqueda="AECID", max_paginas=MAX_PAGINAS_CON
                 "fuente":              "BDNS/concesiones",
             })
 
-        if data.get("last", True):
-            break
-
-    if not rows:
+    if not rows and previas.empty:
         log.warning("  BDNS concesiones sin datos")
         return pd.DataFrame()
 
     df = pd.DataFrame(rows)
+    if not previas.empty:
+        n_previas = len(previas)
+        # Las nuevas van primero (mismo orden que devuelve el API) y ganan
+        # sobre la versión previa de la misma concesión.
+        df = pd.concat([df, previas], ignore_index=True)
+        df = df.drop_duplicates(subset=["id_concesion"], keep="first").reset_index(drop=True)
+        log.info(f"  BDNS concesiones: {len(df) - n_previas} nuevas sobre {n_previas} previas")
     df["importe_eur"] = pd.to_numeric(df["importe_eur"], errors="coerce").fillna(0)
+    # Los CSV previos a esta columna no la traen: quedan sin CIF hasta que
+    # la concesión se vuelva a descargar
+    df["cif_beneficiario"] = df.get("cif_beneficiario", pd.Series("", index=df.index)).fillna("")
     n_institucionales = int((~df["es_persona_fisica"]).sum())
     n_personas = int(df["es_persona_fisica"].sum())
     log.info(f"  BDNS concesiones: {len(df)} "
              f"({n_institucionales} institucionales / {n_personas} personas físicas)")
+
+    # En la descarga completa max_paginas es el tope pedido; en la
+    # incremental, parar en él deja sin pedir las páginas hasta el corte.
+    if estado["fallidas"] or (estado["truncado"] and parar is not None):
+        # Con huecos la marca no avanza: si pasara por encima de una página
+        # perdida, la siguiente ejecución cortaría antes de volver a pedirla.
+        # Sin marca previa se guarda vacía y la próxima descarga es completa.
+        motivo = (f"páginas sin respuesta {estado['fallidas']}" if estado["fallidas"]
+                  else f"parada en max_paginas={max_paginas} antes del final")
+        conservada = marca if parar is not None else {}
+        log.warning(f"  BDNS concesiones: descarga incompleta ({motivo}) — la marca de agua "
+                    f"se queda en {conservada.get('fecha_concesion') or '(ninguna)'}")
+        df.attrs["marca_de_agua"] = {"fecha_concesion": conservada.get("fecha_concesion")}
     return df
 
 
@@ -238,8 +476,63 @@ def enriquecer_convocatorias_con_concesiones(df_convocatorias: pd.DataFrame,
 
 # ── Cruce AECID ↔ BDNS (por entidad implementadora, NO por título) ──────────
 
+def _cifs(df_concesiones: pd.DataFrame) -> pd.Series:
+    if "cif_beneficiario" not in df_concesiones:
+        return pd.Series("", index=df_concesiones.index)
+    return df_concesiones["cif_beneficiario"].fillna("").astype(str)
+
+
+def registro_cif(df_concesiones: pd.DataFrame) -> pd.DataFrame:
+    """
+    Registro CIF → entidad de los beneficiarios institucionales: una fila
+    por CIF con el nombre normalizado más frecuente, los alias (todas las
+    grafías con que aparece en BDNS), la primera concesión (su código y su
+    posición `fila` en df_concesiones) y el total. Es la tabla con la que
+    cruzar_con_aecid resuelve los alias antes del cruce fuzzy.
+    """
+    columnas = ["cif", "entidad", "alias", "cod_concesion", "fila", "n_concesiones"]
+    if df_concesiones.empty:
+        return pd.DataFrame(columns=columnas)
+    es_inst = ~df_concesiones["es_persona_fisica"].to_numpy(dtype=bool)
+    inst = df_concesiones[es_inst]
+    con_cif = pd.DataFrame({
+        "cif": _cifs(inst).to_numpy(),
+        "nombre": _normalizar_unicos(inst["beneficiario"]),
+        "cod_concesion": inst["cod_concesion"].fillna("").astype(str).to_numpy(),
+        "fila": np.flatnonzero(es_inst),
+    })
+    con_cif = con_cif[con_cif["cif"] != ""]
+    if con_cif.empty:
+        return pd.DataFrame(columns=columnas)
+    grupos = con_cif.groupby("cif", sort=False)
+    return pd.DataFrame({
+        "entidad": grupos["nombre"].agg(lambda n: n.value_counts().index[0]),
+        "alias": grupos["nombre"].agg(lambda n: list(dict.fromkeys(n))),
+        "cod_concesion": grupos["cod_concesion"].first(),
+        "fila": grupos["fila"].first(),
+        "n_concesiones": grupos.size(),
+    }).rename_axis("cif").reset_index()[columnas]
+
+
+def _claves_exactas(registro: pd.DataFrame, beneficiarios: list, cifs: list) -> dict:
+    """
+    Tabla hash nombre normalizado → posición de la concesión que lo
+    resuelve. Si el beneficiario trae CIF, todos sus alias apuntan a la
+    primera concesión de ese CIF según `registro` (registro_cif de las
+    mismas concesiones); si no, el nombre apunta a la primera concesión con
+    ese nombre. Ante un nombre compartido por varios CIF gana el primero en
+    aparecer (mismo desempate que el cruce fuzzy).
+    """
+    primera_de_cif = dict(zip(registro["cif"], registro["fila"].astype(int)))
+    claves = {}
+    for pos, (nombre, cif) in enumerate(zip(beneficiarios, cifs)):
+        if nombre:
+            claves.setdefault(nombre, primera_de_cif[cif] if cif else pos)
+    return claves
+
+
 def cruzar_con_aecid(df_concesiones: pd.DataFrame, df_aecid: pd.DataFrame,
-                      umbral: int = 80) -> pd.DataFrame:
+                      umbral: int = 80, cache: CacheCruces = None) -> pd.DataFrame:
     """
     Cruce fuzzy entre concesiones BDNS de AECID y proyectos AECID de
     datos.aecid.es, por nombre de ENTIDAD implementadora -- NO por título
@@ -247,13 +540,20 @@ def cruzar_con_aecid(df_concesiones: pd.DataFrame, df_aecid: pd.DataFrame,
     sirve en este caso). Solo se cruzan concesiones a personas jurídicas
     (ONGD, fundaciones, etc.); las becas a personas físicas se excluyen
     porque no tienen contraparte en datos.aecid.es.
-    Agrega 'en_bdns', 'score_cruce_bdns' e 'id_bdns' a df_aecid.
+
+    Primero se resuelven por hash join las entidades cuyo nombre
+    normalizado coincide exactamente con un beneficiario o con un alias de
+    su CIF (ver registro_cif); solo el resto pasa al cruce fuzzy, que con
+    `cache` solo puntúa entidades o beneficiarios nuevos desde la última
+    corrida (ver cruce_entidades.CacheCruces).
+    Agrega 'en_bdns', 'score_cruce_bdns', 'id_bdns' y 'cif_bdns' a df_aecid.
     """
     if df_concesiones.empty or df_aecid.empty:
         df_aecid = df_aecid.copy()
         df_aecid["en_bdns"] = False
         df_aecid["score_cruce_bdns"] = 0
         df_aecid["id_bdns"] = ""
+        df_aecid["cif_bdns"] = ""
         return df_aecid
 
     institucionales = df_concesiones[~df_concesiones["es_persona_fisica"]].copy()
@@ -262,33 +562,43 @@ def cruzar_con_aecid(df_concesiones: pd.DataFrame, df_aecid: pd.DataFrame,
         df_aecid["en_bdns"] = False
         df_aecid["score_cruce_bdns"] = 0
         df_aecid["id_bdns"] = ""
+        df_aecid["cif_bdns"] = ""
         return df_aecid
 
-    institucionales["beneficiario_norm"] = institucionales["beneficiario"].apply(_normalizar)
-    beneficiarios = institucionales["beneficiario_norm"].tolist()
-    cod_concesion = institucionales["cod_concesion"].fillna("").astype(str).tolist()
-
-    def _mejor_match(entidad):
-        entidad_norm = _normalizar(entidad)
-        if not entidad_norm:
-            return 0, ""
-        mejor_score, mejor_id = 0, ""
-        for i, b in enumerate(beneficiarios):
-            score = fuzz.token_sort_ratio(entidad_norm, b)
-            if score > mejor_score:
-                mejor_score, mejor_id = score, cod_concesion[i]
-        return mejor_score, mejor_id
-
-    resultados = df_aecid["entidad"].fillna("").apply(_mejor_match)
+    # Normalizar cada nombre distinto una sola vez; el cruce fuzzy (cdist por
+    # bloques sobre nombres únicos, con índice de bloqueo cuando BDNS es
+    # grande) está en cruce_entidades.mejor_coincidencia.
+    beneficiarios = _normalizar_unicos(institucionales["beneficiario"])
+    cifs = _cifs(institucionales).tolist()
+    # El "" agregado al final es el destino de indices == -1 (sin match)
+    cod_concesion = np.array(institucionales["cod_concesion"].fillna("").astype(str).tolist() + [""],
+                             dtype=object)
+    cif_concesion = np.array(cifs + [""], dtype=object)
+    entidades = _normalizar_unicos(df_aecid["entidad"].fillna(""))
+
+    # 1. Hash join por clave exacta
+    claves = _claves_exactas(registro_cif(institucionales), beneficiarios, cifs)
+    indices = np.fromiter((claves.get(e, -1) for e in entidades), dtype=np.int64, count=len(entidades))
+    scores = np.where(indices >= 0, 100.0, 0.0)
+    exactas = indices >= 0
+
+    # 2. Cruce fuzzy solo para las no resueltas
+    pendientes = np.flatnonzero(~exactas)
+    if len(pendientes):
+        cruzar = cache.mejor_coincidencia if cache is not None else mejor_coincidencia
+        scores[pendientes], indices[pendientes] = cruzar(
+            [entidades[i] for i in pendientes], beneficiarios,
+            scorer=fuzz.token_sort_ratio, umbral=umbral)
+
     df_aecid = df_aecid.copy()
-    df_aecid["score_cruce_bdns"] = resultados.apply(lambda x: x[0])
+    df_aecid["score_cruce_bdns"] = scores
     df_aecid["en_bdns"] = df_aecid["score_cruce_bdns"] >= umbral
-    df_aecid["id_bdns"] = [
-        rid if ok else "" for (_, rid), ok in zip(resultados, df_aecid["en_bdns"])
-    ]
+    df_aecid["id_bdns"] = np.where(df_aecid["en_bdns"], cod_concesion[indices], "")
+    df_aecid["cif_bdns"] = np.where(df_aecid["en_bdns"], cif_concesion[indices], "")
     n = int(df_aecid["en_bdns"].sum())
     log.info(f"  Cruce AECID↔BDNS: {n}/{len(df_aecid)} intervenciones con entidad "
-             f"identificada como beneficiaria en BDNS")
+             f"identificada como beneficiaria en BDNS ({int(exactas.sum())} por clave exacta, "
+             f"{len(pendientes)} al cruce fuzzy)")
     return df_aecid
 
 
@@ -22,10 +22,12 @@ Estrategia adoptada:
      contratos AECID publicados desde la última vez que corrió el pipeline.
   2. Además, se sigue un "backfill" histórico: se pagina hacia atrás
      (enlace rel="next") un número acotado de páginas por corrida
-     (MAX_PAGINAS_BACKFILL), guardando en disco un cursor
+     (MAX_PAGINAS_BACKFILL), con un cursor en disco
      (data/raw/place_cursor.json) para continuar exactamente donde se
      quedó en la corrida siguiente, hasta agotar el feed o llegar a
-     FECHA_LIMITE_BACKFILL.
+     FECHA_LIMITE_BACKFILL. scrape_place() devuelve el cursor nuevo y
+     quien escribe el CSV lo guarda después (guardar_cursor), para que
+     nunca adelante a los datos en disco.
   3. Todos los contratos AECID encontrados se acumulan (nunca se
      sobrescriben) en el CSV de salida, deduplicados por id_contrato.
 
@@ -36,11 +38,13 @@ casi con certeza no va a contener ningún contrato de AECID.
 import re
 import json
 import logging
-import requests
 import pandas as pd
 from pathlib import Path
 from rapidfuzz import fuzz
 
+from cliente_http import HTTP
+from gazetteer import paises_conocidos
+
 log = logging.getLogger(__name__)
 HEADERS = {"Accept": "application/atom+xml", "User-Agent": "MonitorMonteverde/1.0"}
 
@@ -81,7 +85,10 @@ def _cargar_cursor() -> dict:
     return {"next_url": None, "agotado": False}
 
 
-def _guardar_cursor(cursor: dict) -> None:
+def guardar_cursor(cursor: dict) -> None:
+    """Se llama DESPUÉS de escribir el CSV: si el cursor avanzara sin que
+    el CSV se escriba (fallo, timeout), la corrida siguiente saltaría esas
+    páginas y sus contratos se perderían."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     CURSOR_PATH.write_text(json.dumps(cursor, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -122,77 +129,243 @@ def _detectar_tipo(titulo: str) -> str:
     return "No especificado"
 
 
-def _parsear_pagina(texto: str):
-    """Devuelve (contratos_aecid: list[dict], next_url: str|None, fecha_min: str|None)."""
-    entries = re.findall(r"<entry>(.*?)</entry>", texto, re.DOTALL)
+# Expresiones del parseo de entradas, compiladas una sola vez (antes se
+# construían dentro de _tag() para cada etiqueta de cada entrada).
+RE_ENTRY = re.compile(r"<entry>(.*?)</entry>", re.DOTALL)
+_RE_TAGS = {
+    tag: re.compile(rf"<{tag}[^>]*>(.*?)</{tag}>", re.DOTALL)
+    for tag in ("id", "title", "summary", "updated")
+}
+RE_SIN_TAGS = re.compile(r"<[^>]+>")
+RE_ORGANO = re.compile(r"Órgano de Contratación:\s*([^;]+);")
+RE_ID_LICITACION = re.compile(r"Id licitación:\s*([^;]+);")
+RE_IMPORTE = re.compile(r"Importe:\s*([\d\.,]+)\s*EUR")
+RE_LINK = re.compile(r"<link[^>]*href=['\"]([^'\"]+)['\"]")
+RE_NEXT = re.compile(r'<link href="([^"]+)" rel="next"/>')
+RE_UPDATED_BYTES = re.compile(rb"<updated[^>]*>(.*?)</updated>", re.DOTALL)
+
+# Prefiltro barato antes de parsear cada entrada: casi todas son de otros
+# órganos. El órgano sale solo del <summary>, así que basta ubicarlo con
+# find() (sin regex) y buscar ahí, en minúsculas, los marcadores que todo
+# match de RE_AECID contiene sí o sí. Para que el resultado sea idéntico al
+# del filtro completo, la entrada se parsea igual si el summary contiene
+# algún carácter que re.IGNORECASE equipara a una letra ASCII del patrón
+# (İ, ı, ſ) o alguna etiqueta (al quitarla podría unir un marcador partido).
+MARCADORES_AECID = ("aecid", "cooperaci")
+CARACTERES_PLEGABLES = ("\u0130", "\u0131", "\u017f")
+_PREFILTRO = {
+    str:   (MARCADORES_AECID, CARACTERES_PLEGABLES + ("<",),
+            ("<summary", ">", "</summary>")),
+    bytes: (tuple(m.encode("utf-8") for m in MARCADORES_AECID),
+            tuple(c.encode("utf-8") for c in CARACTERES_PLEGABLES) + (b"<",),
+            (b"<summary", b">", b"</summary>")),
+}
+
+# Backend de parseo por defecto de scrape_place(): "stream" parsea las
+# entradas a medida que llegan los bytes de la respuesta (memoria acotada
+# al tamaño de una entrada); "regex" es el parser original sobre la página
+# completa como str. Ambos devuelven exactamente lo mismo.
+PARSER_PLACE = "stream"
+CHUNK_STREAM = 256 * 1024
+
+
+def _tag(entry: str, tag: str) -> str:
+    m = _RE_TAGS[tag].search(entry)
+    return RE_SIN_TAGS.sub("", m.group(1) if m else "").strip()
+
+
+def _puede_ser_aecid(entry) -> bool:
+    """False solo si es seguro que el órgano de la entrada (str o bytes
+    crudos) no matchea RE_AECID, sin extraer ninguna etiqueta."""
+    marcadores, dudosos, (abre, cierre_abre, cierra) = _PREFILTRO[type(entry)]
+    ini = entry.find(abre)
+    if ini < 0:
+        return False
+    ini = entry.find(cierre_abre, ini)
+    if ini < 0:
+        return False
+    fin = entry.find(cierra, ini)
+    if fin < 0:
+        return False
+    summary = entry[ini + 1:fin]
+    if any(c in summary for c in dudosos):
+        return True
+    summary = summary.lower()
+    return any(m in summary for m in marcadores)
+
+
+def _contar(contadores: dict, escaneadas: int, parseadas: int) -> None:
+    if contadores is not None:
+        contadores["entradas_escaneadas"] = contadores.get("entradas_escaneadas", 0) + escaneadas
+        contadores["entradas_parseadas"] = contadores.get("entradas_parseadas", 0) + parseadas
+
+
+def _parsear_entry(entry: str):
+    """Devuelve (contrato_aecid: dict|None, updated: str) para el contenido
+    de un <entry>. El dict es None si el órgano no es AECID."""
+    summary = _tag(entry, "summary")
+    updated = _tag(entry, "updated")
+
+    organo_m = RE_ORGANO.search(summary)
+    organo = organo_m.group(1).strip() if organo_m else ""
+    if not organo or not RE_AECID.search(organo):
+        return None, updated  # no es un contrato de AECID — se descarta
+
+    titulo = _tag(entry, "title")
+    if not titulo:
+        return None, updated
+
+    link_m = RE_LINK.search(entry)
+    idlic_m = RE_ID_LICITACION.search(summary)
+    importe_m = RE_IMPORTE.search(summary)
+
+    return {
+        "id_contrato":         _tag(entry, "id"),
+        "id_expediente":       idlic_m.group(1).strip() if idlic_m else "",
+        "titulo":              titulo,
+        "organismo":           organo,
+        "fecha":               updated[:10] if updated else "",
+        "link":                link_m.group(1) if link_m else "",
+        "tipo_procedimiento":  _detectar_tipo(titulo),
+        "importe_eur":         float(importe_m.group(1).replace(".", "").replace(",", "."))
+                                if importe_m else 0.0,
+        "adjudicacion_directa": False,
+        "fuente":              "PLACE/Atom",
+    }, updated
+
+
+def _parsear_pagina(texto: str, contadores: dict = None):
+    """Devuelve (contratos_aecid: list[dict], next_url: str|None, fecha_min: str|None).
+    Si se pasa `contadores`, acumula ahí entradas escaneadas vs parseadas."""
     datos = []
     fechas = []
-    for entry in entries:
-        def _tag(tag):
-            m = re.search(rf"<{tag}[^>]*>(.*?)</{tag}>", entry, re.DOTALL)
-            return re.sub(r"<[^>]+>", "", m.group(1) if m else "").strip()
-
-        summary = _tag("summary")
-        updated = _tag("updated")
+    escaneadas = parseadas = 0
+    for entry in RE_ENTRY.findall(texto):
+        escaneadas += 1
+        if _puede_ser_aecid(entry):
+            parseadas += 1
+            contrato, updated = _parsear_entry(entry)
+        else:
+            contrato, updated = None, _tag(entry, "updated")
         if updated:
             fechas.append(updated[:10])
+        if contrato:
+            datos.append(contrato)
+    _contar(contadores, escaneadas, parseadas)
 
-        organo_m = re.search(r"Órgano de Contratación:\s*([^;]+);", summary)
-        organo = organo_m.group(1).strip() if organo_m else ""
-        if not organo or not RE_AECID.search(organo):
-            continue  # no es un contrato de AECID — se descarta
-
-        titulo = _tag("title")
-        if not titulo:
-            continue
-
-        link_m = re.search(r"<link[^>]*href=['\"]([^'\"]+)['\"]", entry)
-        idlic_m = re.search(r"Id licitación:\s*([^;]+);", summary)
-        importe_m = re.search(r"Importe:\s*([\d\.,]+)\s*EUR", summary)
-
-        datos.append({
-            "id_contrato":         _tag("id"),
-            "id_expediente":       idlic_m.group(1).strip() if idlic_m else "",
-            "titulo":              titulo,
-            "organismo":           organo,
-            "fecha":               updated[:10] if updated else "",
-            "link":                link_m.group(1) if link_m else "",
-            "tipo_procedimiento":  _detectar_tipo(titulo),
-            "importe_eur":         float(importe_m.group(1).replace(".", "").replace(",", "."))
-                                    if importe_m else 0.0,
-            "adjudicacion_directa": False,
-            "fuente":              "PLACE/Atom",
-        })
-
-    next_m = re.search(r'<link href="([^"]+)" rel="next"/>', texto)
+    next_m = RE_NEXT.search(texto)
     next_url = next_m.group(1) if next_m else None
     fecha_min = min(fechas) if fechas else None
     return datos, next_url, fecha_min
 
 
+def _iterar_segmentos(chunks):
+    """
+    Corta un flujo de bytes del feed en segmentos, sin cargarlo entero:
+    produce ("entry", bytes) con el contenido de cada <entry>...</entry>
+    y ("fuera", bytes) con el texto entre entradas (cabecera del feed,
+    donde está el enlace rel="next", y cierre). Mismo criterio que
+    RE_ENTRY: cada <entry> se cierra en el primer </entry> que le sigue.
+    """
+    abre, cierra = b"<entry>", b"</entry>"
+    buf, pos = b"", 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            ini = buf.find(abre, pos)
+            if ini < 0:
+                break
+            fin = buf.find(cierra, ini + len(abre))
+            if fin < 0:
+                break
+            if ini > pos:
+                yield "fuera", buf[pos:ini]
+            yield "entry", buf[ini + len(abre):fin]
+            pos = fin + len(cierra)
+    if pos < len(buf):
+        yield "fuera", buf[pos:]
+
+
+def _parsear_stream(chunks, errores: str = "replace", contadores: dict = None):
+    """Como _parsear_pagina(), pero consumiendo un iterable de bytes (p. ej.
+    Response.iter_content o un miembro de un ZIP) entrada por entrada, con
+    memoria acotada al tamaño de una entrada. Las entradas que el prefiltro
+    descarta no llegan a decodificarse: solo se les extrae <updated>."""
+    datos = []
+    fecha_min = None
+    next_url = None
+    escaneadas = parseadas = 0
+    for tipo, segmento in _iterar_segmentos(chunks):
+        if tipo != "entry":
+            if next_url is None and b'rel="next"' in segmento:
+                next_m = RE_NEXT.search(segmento.decode("utf-8", errors=errores))
+                next_url = next_m.group(1) if next_m else None
+            continue
+        escaneadas += 1
+        if _puede_ser_aecid(segmento):
+            parseadas += 1
+            texto = segmento.decode("utf-8", errors=errores)
+            if next_url is None and b'rel="next"' in segmento:
+                next_m = RE_NEXT.search(texto)
+                next_url = next_m.group(1) if next_m else None
+            contrato, updated = _parsear_entry(texto)
+        else:
+            contrato = None
+            m = RE_UPDATED_BYTES.search(segmento)
+            updated = RE_SIN_TAGS.sub("", m.group(1).decode("utf-8", errors=errores)).strip() if m else ""
+        if updated and (fecha_min is None or updated[:10] < fecha_min):
+            fecha_min = updated[:10]
+        if contrato:
+            datos.append(contrato)
+    _contar(contadores, escaneadas, parseadas)
+    return datos, next_url, fecha_min
+
+
+def _descargar_pagina(url: str, parser: str = PARSER_PLACE, contadores: dict = None):
+    """GET de una página del feed + parseo con el backend pedido. Devuelve
+    (status_code, resultado de _parsear_*) — resultado None si status != 200."""
+    if parser == "regex":
+        r = HTTP.get(url, headers=HEADERS)
+        if r.status_code != 200:
+            return r.status_code, None
+        return r.status_code, _parsear_pagina(r.text, contadores=contadores)
+    with HTTP.get(url, headers=HEADERS, stream=True) as r:
+        if r.status_code != 200:
+            return r.status_code, None
+        return r.status_code, _parsear_stream(r.iter_content(chunk_size=CHUNK_STREAM),
+                                              contadores=contadores)
+
+
 # ── Orquestación ──────────────────────────────────────────────────────────────
 
-def scrape_place(years: list = None) -> pd.DataFrame:
+def scrape_place(years: list = None, parser: str = PARSER_PLACE) -> tuple[pd.DataFrame, dict]:
     """
     Descarga de forma ACUMULATIVA los contratos de AECID publicados en
     PLACE. Combina lo ya encontrado en corridas anteriores con la página
     más reciente del feed y un tramo acotado de backfill histórico.
+
+    Devuelve (contratos, cursor). No escribe nada: el cursor se guarda con
+    guardar_cursor() una vez escrito el CSV de contratos.
     """
     log.info("Scraper PLACE/AECID iniciando...")
     previos = _cargar_historico()
     log.info(f"  Histórico previo cargado: {len(previos)} contratos AECID")
 
     nuevos = []
+    contadores = {}
 
     # (a) Página más reciente del feed — siempre, para no perderse contratos nuevos
     try:
-        r = requests.get(PLACE_ATOM_ROOT, headers=HEADERS, timeout=30)
-        if r.status_code == 200:
-            datos, _next, _fecha = _parsear_pagina(r.text)
+        status, resultado = _descargar_pagina(PLACE_ATOM_ROOT, parser, contadores)
+        if resultado is not None:
+            datos, _next, _fecha = resultado
             nuevos.extend(datos)
             log.info(f"  Página actual del feed: {len(datos)} contratos AECID nuevos")
         else:
-            log.warning(f"  PLACE feed devolvió status {r.status_code}")
+            log.warning(f"  PLACE feed devolvió status {status}")
     except Exception as e:
         log.error(f"  PLACE feed (página actual) error: {e}")
 
@@ -203,11 +376,11 @@ def scrape_place(years: list = None) -> pd.DataFrame:
         paginas_recorridas = 0
         while url and paginas_recorridas < MAX_PAGINAS_BACKFILL:
             try:
-                r = requests.get(url, headers=HEADERS, timeout=30)
-                if r.status_code != 200:
-                    log.warning(f"  Backfill: status {r.status_code} en {url} — se corta la corrida")
+                status, resultado = _descargar_pagina(url, parser, contadores)
+                if resultado is None:
+                    log.warning(f"  Backfill: status {status} en {url} — se corta la corrida")
                     break
-                datos, next_url, fecha_min = _parsear_pagina(r.text)
+                datos, next_url, fecha_min = resultado
                 nuevos.extend(datos)
                 paginas_recorridas += 1
 
@@ -225,12 +398,16 @@ def scrape_place(years: list = None) -> pd.DataFrame:
             except Exception as e:
                 log.error(f"  PLACE backfill error: {e}")
                 break
-        _guardar_cursor(cursor)
         log.info(f"  Backfill: {paginas_recorridas} páginas recorridas en esta corrida "
                  f"(agotado={cursor.get('agotado')})")
     else:
         log.info("  Backfill histórico ya completo — solo se revisa la página actual del feed")
 
+    escaneadas = contadores.get("entradas_escaneadas", 0)
+    parseadas = contadores.get("entradas_parseadas", 0)
+    log.info(f"  Prefiltro AECID: {parseadas}/{escaneadas} entradas parseadas "
+             f"({escaneadas - parseadas} descartadas sin extraer etiquetas)")
+
     df_nuevos = pd.DataFrame(nuevos)
     if not df_nuevos.empty:
         df = pd.concat([previos, df_nuevos], ignore_index=True)
@@ -245,7 +422,7 @@ def scrape_place(years: list = None) -> pd.DataFrame:
         df = pd.DataFrame(_seed_place())
 
     log.info(f"  PLACE/AECID acumulado total: {len(df)} contratos")
-    return df
+    return df, cursor
 
 
 def detectar_adjudicacion_directa(df: pd.DataFrame) -> pd.DataFrame:
@@ -267,18 +444,85 @@ def detectar_adjudicacion_directa(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _extraer_paises_conocidos(pais_region_series: pd.Series) -> set:
-    """Vocabulario de países/regiones tal como aparece en pais_region de AECID
-    (valores separados por coma). Descarta las categorías agregadas tipo
-    "Países en Vías de Desarrollo (No Especificado)" porque no son un país
-    concreto que pueda mencionarse en un título de contrato."""
-    paises = set()
-    for valor in pais_region_series.dropna():
-        for p in str(valor).split(","):
-            p = p.strip()
-            if p and "No Especificado" not in p:
-                paises.add(p)
-    return paises
+def _regex_trie(palabras) -> str:
+    """Alternancia de `palabras` factorizada por prefijos comunes, cada una
+    seguida de \\b: r"Guinea(?:\\ Ecuatorial\\b|\\-Bissau\\b|\\b)". En cada
+    nodo se prueban antes las continuaciones que el fin de palabra (la más
+    larga primero), y la regex despacha por carácter en lugar de probar
+    cada palabra entera."""
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for c in palabra:
+            nodo = nodo.setdefault(c, {})
+        nodo[""] = {}
+
+    def _render(nodo) -> str:
+        ramas = [re.escape(c) + _render(hijo) for c, hijo in sorted(nodo.items()) if c]
+        if "" in nodo:
+            ramas.append(r"\b")
+        return ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+
+    return _render(trie)
+
+
+def _buscador_paises(paises):
+    """
+    Una sola regex para todos los países: en cada frontera de palabra, una
+    lookahead con el trie de todos los nombres (ver _regex_trie). Al ser de
+    ancho cero, finditer prueba todas las posiciones y encuentra también
+    menciones solapadas. Lo único que no reporta es un país más corto que
+    empieza en la misma posición que el encontrado ("Guinea" dentro de
+    "Guinea Ecuatorial"): por eso se devuelven, para cada país, los que son
+    prefijo suyo, para verificarlos con su propio patrón.
+    """
+    paises = sorted(paises, key=len, reverse=True)
+    patrones = [re.compile(r"\b" + re.escape(p) + r"\b", re.IGNORECASE) for p in paises]
+    buscador = re.compile(r"\b(?=(" + _regex_trie(paises) + "))", re.IGNORECASE)
+    por_texto = {}
+    for i, p in enumerate(paises):
+        por_texto.setdefault(p.lower(), i)
+    prefijos = [
+        [j for j, q in enumerate(paises)
+         if j != i and len(q) <= len(p) and re.match(re.escape(q), p, re.IGNORECASE)]
+        for i, p in enumerate(paises)
+    ]
+    return buscador, paises, patrones, por_texto, prefijos
+
+
+def paises_por_titulo(titulos: list, paises) -> list:
+    """
+    Para cada título, el conjunto de países de `paises` mencionados como
+    palabra completa (sin distinguir mayúsculas). Mismo resultado que
+    buscar r"\\b<país>\\b" por separado en cada título, pero en una sola
+    pasada sobre todos los títulos concatenados.
+    """
+    resultado = [set() for _ in titulos]
+    if not titulos or not paises:
+        return resultado
+    buscador, paises, patrones, por_texto, prefijos = _buscador_paises(paises)
+    # "\n" no es carácter de palabra: \b se comporta igual que en los
+    # extremos de cada título, y ningún país contiene "\n"
+    corpus = "\n".join(titulos)
+    inicios, pos = [], 0
+    for t in titulos:
+        inicios.append(pos)
+        pos += len(t) + 1
+
+    fila = 0
+    for m in buscador.finditer(corpus):
+        inicio, texto = m.start(), m.group(1)
+        while fila + 1 < len(inicios) and inicios[fila + 1] <= inicio:
+            fila += 1
+        i = por_texto.get(texto.lower())
+        if i is None:  # plegado de mayúsculas raro (İ, ſ...): buscar a mano
+            i = next(k for k, p in enumerate(paises) if len(p) == len(texto)
+                     and patrones[k].match(corpus, inicio))
+        resultado[fila].add(paises[i])
+        for j in prefijos[i]:
+            if patrones[j].match(corpus, inicio):
+                resultado[fila].add(paises[j])
+    return resultado
 
 
 def cruzar_con_aecid(df_place: pd.DataFrame, df_aecid: pd.DataFrame,
@@ -319,19 +563,12 @@ def cruzar_con_aecid(df_place: pd.DataFrame, df_aecid: pd.DataFrame,
         df_aecid["score_cruce"] = 0
         return df_aecid
 
-    paises_conocidos = _extraer_paises_conocidos(df_aecid["pais_region"])
-    # Los más largos primero, para que "Costa Rica" no quede eclipsado por
-    # una coincidencia parcial de un país más corto contenido en el nombre.
-    paises_conocidos = sorted(paises_conocidos, key=len, reverse=True)
-    patrones = {p: re.compile(r"\b" + re.escape(p) + r"\b", re.IGNORECASE)
-                for p in paises_conocidos}
+    conocidos = paises_conocidos(df_aecid["pais_region"])
 
     # Qué países aparecen mencionados en AL MENOS un título de contrato PLACE
-    paises_con_contrato = set()
-    for titulo in df_place["titulo"].fillna(""):
-        for p, pat in patrones.items():
-            if pat.search(titulo):
-                paises_con_contrato.add(p)
+    # (una sola pasada sobre todos los títulos, ver paises_por_titulo)
+    titulos = df_place["titulo"].fillna("").astype(str).tolist()
+    paises_con_contrato = set().union(*paises_por_titulo(titulos, conocidos))
 
     def _evaluar(pais_region_fondo):
         if not pais_region_fondo:
@@ -366,6 +603,6 @@ def _seed_place() -> list:
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    df = scrape_place()
+    df, _cursor = scrape_place()  # sin escribir el CSV, el cursor no se guarda
     df = detectar_adjudicacion_directa(df)
     print(df[["titulo", "organismo", "tipo_procedimiento", "adjudicacion_directa"]].head(20))
\ No newline at end of file
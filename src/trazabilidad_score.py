@@ -3,10 +3,22 @@ src/trazabilidad_score.py
 =========================
 Modelo de 7 eslabones para evaluar la trazabilidad de fondos AECID.
 Detecta las tres rupturas principales (R1, R2, R3).
+
+Dos motores con el mismo resultado:
+  - "filas": analizar_fondo() fila a fila (df.apply). Es la
+    implementación de referencia, la que documenta cada regla.
+  - "columnas": las mismas reglas sobre columnas enteras, con máscaras
+    booleanas y np.select. Los predicados sobre texto se evalúan una vez
+    por valor distinto. Es el que usa analizar_dataframe por defecto.
 """
 import logging
+import re
+import numpy as np
 import pandas as pd
 
+from clasificador_ooii import OOII_CAJA_NEGRA, es_ooii  # noqa: F401 (re-export)
+from valores_distintos import por_valor
+
 log = logging.getLogger(__name__)
 
 # ── Definición de eslabones ───────────────────────────────────────────────────
@@ -31,13 +43,12 @@ ESLABON_SCORE = {
     7: 100,
 }
 
-# Organismos internacionales que agregan sin desglosar (R1)
-OOII_CAJA_NEGRA = {
-    "pnud", "undp", "unicef", "onu mujeres", "unifem", "acnur", "unhcr",
-    "pma", "wfp", "fao", "oms", "who", "ops/oms", "paho", "oim", "iom",
-    "oit", "ilo", "banco mundial", "world bank", "bid", "iadb",
-    "fondo mundial", "gef", "fondo de adaptación",
-}
+# Caracteres con significado en una regex: un prefijo de título sin
+# ninguno se puede buscar como subcadena literal (ver _prefijo_con_adj_directa)
+METACARACTERES_REGEX = set(".^$*+?{}[]\\|()")
+
+# Motor de analizar_dataframe: "columnas" (vectorizado) o "filas" (referencia)
+MOTOR_DEFAULT = "columnas"
 
 
 class ModeloTrazabilidad:
@@ -59,32 +70,56 @@ class ModeloTrazabilidad:
             mask = self.df_ltaibg.get("tiene_justificante", pd.Series()).astype(str).str.upper() == "SI"
             self._ids_ltaibg_ok = set(self.df_ltaibg[mask]["proyecto"].astype(str))
 
+        # R2: títulos PLACE en minúsculas, calculados una sola vez. Solo
+        # importan los contratos con adjudicación directa (R2 mira si alguno
+        # de los que matchean la tiene), y el resultado se memoiza por
+        # prefijo de título (muchos fondos comparten los primeros 20
+        # caracteres: "Convenio con la ...", "Proyecto de ...").
+        self._titulos_adj_directa = []
+        if (not self.df_place.empty and "adjudicacion_directa" in self.df_place.columns
+                and "titulo" in self.df_place.columns):
+            self._titulos_adj_directa = [
+                t.lower() for t, adj in zip(self.df_place["titulo"], self.df_place["adjudicacion_directa"])
+                if isinstance(t, str) and not pd.isna(adj) and bool(adj)
+            ]
+        self._adj_directa_por_prefijo = {}
+
     # ── Detección de rupturas ─────────────────────────────────────────────────
 
     def _es_ooii(self, entidad: str) -> bool:
-        if pd.isna(entidad):
-            return False
-        return any(ooii in str(entidad).lower() for ooii in OOII_CAJA_NEGRA)
+        # Clasificación compartida y memoizada por entidad distinta
+        return es_ooii(entidad)
 
     def _ruptura_r1(self, row: pd.Series) -> bool:
         """R1: fondo cargado a OOII sin desglose posterior"""
         return self._es_ooii(row.get("entidad", ""))
 
+    def _prefijo_con_adj_directa(self, prefijo: str) -> bool:
+        """¿Algún contrato PLACE con adjudicación directa contiene `prefijo`
+        en el título? Mismo criterio que el str.contains original (regex),
+        pero sobre los títulos ya en minúsculas y memoizado por prefijo."""
+        if prefijo not in self._adj_directa_por_prefijo:
+            titulos = self._titulos_adj_directa
+            if not METACARACTERES_REGEX.intersection(prefijo):
+                hay = any(prefijo in t for t in titulos)
+            else:
+                try:
+                    patron = re.compile(prefijo)
+                    hay = any(patron.search(t) for t in titulos)
+                except re.error:
+                    # str.contains fallaba con prefijos que no son regex
+                    # válidas ("(agua potable y sa"); se buscan literales
+                    hay = any(prefijo in t for t in titulos)
+            self._adj_directa_por_prefijo[prefijo] = hay
+        return self._adj_directa_por_prefijo[prefijo]
+
     def _ruptura_r2(self, row: pd.Series) -> bool:
         """R2: sub-contratación sin publicación en PLACE/OCDS"""
         if self.df_place.empty:
             return False
-        en_place = row.get("en_place", False)
-        adj_directa = False
-        if not self.df_place.empty and "adjudicacion_directa" in self.df_place.columns:
-            matches = self.df_place[
-                self.df_place["titulo"].str.lower().str.contains(
-                    str(row.get("titulo", ""))[:20].lower(), na=False
-                )
-            ]
-            if not matches.empty:
-                adj_directa = matches["adjudicacion_directa"].any()
-        return (not en_place) or adj_directa
+        if not row.get("en_place", False):
+            return True  # sin contrato publicado no hace falta mirar la adjudicación
+        return self._prefijo_con_adj_directa(str(row.get("titulo", ""))[:20].lower())
 
     def _ruptura_r3(self, row: pd.Series) -> bool:
         """R3: sin justificante auditable para importes > umbral"""
@@ -96,8 +131,17 @@ class ModeloTrazabilidad:
 
     # ── Cálculo del eslabón de corte ──────────────────────────────────────────
 
-    def calcular_eslabon(self, row: pd.Series) -> int:
-        """Devuelve el último eslabón alcanzado (1-7)."""
+    def _rupturas(self, row: pd.Series) -> dict:
+        return {"ruptura_r1": self._ruptura_r1(row),
+                "ruptura_r2": self._ruptura_r2(row),
+                "ruptura_r3": self._ruptura_r3(row)}
+
+    def calcular_eslabon(self, row: pd.Series, rupturas: dict = None) -> int:
+        """Devuelve el último eslabón alcanzado (1-7). `rupturas` (de
+        _rupturas) evita recalcularlas si el llamador ya las tiene."""
+        if rupturas is None:
+            rupturas = self._rupturas(row)
+
         # Eslabón 1: siempre alcanzado si hay registro
         eslabon = 1
 
@@ -123,18 +167,17 @@ class ModeloTrazabilidad:
             eslabon = 4
 
         # Ruptura R1: OOII caja negra — no pasa de eslabón 3
-        if self._ruptura_r1(row):
+        if rupturas["ruptura_r1"]:
             return min(eslabon, 3)
 
         # Eslabón 5: publicado en PLACE/OCDS
         if row.get("en_place", False):
             eslabon = 5
-        elif self._ruptura_r2(row):
+        elif rupturas["ruptura_r2"]:
             return min(eslabon, 4)
 
         # Eslabón 6: tiene justificante o es monto bajo
-        importe = float(row.get("importe_eur", 0) or 0)
-        if not self._ruptura_r3(row):
+        if not rupturas["ruptura_r3"]:
             eslabon = 6
 
         # Eslabón 7: beneficiario final identificado (proxy: tiene CUIT/NIF o sub-beneficiario)
@@ -149,23 +192,91 @@ class ModeloTrazabilidad:
     # ── API pública ───────────────────────────────────────────────────────────
 
     def analizar_fondo(self, row: pd.Series) -> dict:
-        eslabon = self.calcular_eslabon(row)
+        # Cada ruptura se evalúa una sola vez y se reutiliza para el eslabón
+        rupturas = self._rupturas(row)
+        eslabon = self.calcular_eslabon(row, rupturas)
         score   = self.score_trazabilidad(eslabon)
         return {
             "eslabon_corte":         eslabon,
             "nombre_eslabon":        ESLABONES.get(eslabon, ""),
             "score_trazabilidad":    score,
-            "ruptura_r1":            self._ruptura_r1(row),
-            "ruptura_r2":            self._ruptura_r2(row),
-            "ruptura_r3":            self._ruptura_r3(row),
-            "es_ooii":               self._es_ooii(row.get("entidad", "")),
+            **rupturas,
+            "es_ooii":               rupturas["ruptura_r1"],
         }
 
-    def analizar_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    def analizar_dataframe(self, df: pd.DataFrame, motor: str = None) -> pd.DataFrame:
         if df.empty:
             return df
-        resultados = df.apply(self.analizar_fondo, axis=1, result_type="expand")
-        return pd.concat([df.reset_index(drop=True), resultados], axis=1)
+        motor = motor or MOTOR_DEFAULT
+        if motor == "columnas":
+            resultados = self.analizar_columnas(df)
+        elif motor == "filas":
+            resultados = df.apply(self.analizar_fondo, axis=1, result_type="expand")
+        else:
+            raise ValueError(f"motor desconocido: {motor!r} (columnas | filas)")
+        return pd.concat([df.reset_index(drop=True), resultados.reset_index(drop=True)], axis=1)
+
+    # ── Motor columnar ────────────────────────────────────────────────────────
+
+    def analizar_columnas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Las columnas de analizar_fondo para todo `df` a la vez. Replica las
+        reglas de calcular_eslabon y _ruptura_r1/2/3 tal cual, incluida la
+        semántica de row.get (columna ausente -> valor por defecto) y de
+        verdad de Python (NaN es verdadero, "" es falso).
+        """
+        n = len(df)
+
+        def col(nombre, defecto):
+            return df[nombre] if nombre in df.columns else (defecto, n)
+
+        # R1 / es_ooii
+        r1 = por_valor(col("entidad", ""), self._es_ooii)
+
+        # R2: sin contrato en PLACE, o con uno cuyo título matchea un
+        # contrato de adjudicación directa (memoizado por prefijo)
+        en_place = por_valor(col("en_place", False), bool)
+        if self.df_place.empty:
+            r2 = np.zeros(n, dtype=bool)
+        else:
+            con_adj = por_valor(col("titulo", ""),
+                                 lambda t: self._prefijo_con_adj_directa(str(t)[:20].lower()))
+            r2 = ~en_place | con_adj
+
+        # R3: importe >= umbral y proyecto sin justificante LTAIBG
+        importe = por_valor(col("importe_eur", 0), lambda v: float(v or 0), dtype=np.float64)
+        proyectos = col("id", None) if "id" in df.columns else col("titulo", "")
+        sin_justificante = por_valor(proyectos, lambda p: str(p) not in self._ids_ltaibg_ok)
+        r3 = ~(importe < self.umbral_r3) & sin_justificante
+
+        # Eslabones 2-4 y 7 (condiciones acumulativas de calcular_eslabon)
+        con_entidad = por_valor(col("entidad", None), lambda e: bool(e and str(e).strip()))
+        en_bdns = (por_valor(col("en_bdns", False), bool) | por_valor(col("id_bdns", ""), bool)
+                   | por_valor(col("fuente", ""), lambda f: f == "seed"))
+        con_pais = por_valor(col("pais_region", ""), lambda p: str(p or "") not in
+                              ("", "nan", "No Especificado", "no especificado"))
+        con_beneficiario = (por_valor(col("beneficiario_final", None), bool)
+                            | por_valor(col("nif_beneficiario", None), bool))
+
+        base = np.select([con_pais, en_bdns, con_entidad], [4, 3, 2], default=1)
+        hasta_6 = np.where(~r3, 6, np.where(en_place, 5, base))
+        eslabon = np.select(
+            [r1, ~en_place & r2, con_beneficiario],
+            [np.minimum(base, 3), np.minimum(base, 4), 7],
+            default=hasta_6,
+        ).astype(np.int64)
+
+        scores = np.array([self.score_trazabilidad(e) for e in range(8)], dtype=np.int64)
+        nombres = np.array([ESLABONES.get(e, "") for e in range(8)], dtype=object)
+        return pd.DataFrame({
+            "eslabon_corte":      eslabon,
+            "nombre_eslabon":     nombres[eslabon],
+            "score_trazabilidad": scores[eslabon],
+            "ruptura_r1":         r1,
+            "ruptura_r2":         r2,
+            "ruptura_r3":         r3,
+            "es_ooii":            r1.copy(),
+        })
 
     def resumen_global(self, df: pd.DataFrame) -> dict:
         if df.empty:
@@ -0,0 +1,56 @@
+"""
+src/valores_distintos.py
+========================
+Evaluación de una función una vez por valor distinto de una columna.
+
+Las columnas de texto del análisis (entidad, pais_region, sectores_crs,
+titulo...) repiten muchísimo cada valor, así que en vez de llamar a la
+función fila por fila se factoriza la columna, se evalúa cada valor
+distinto una vez y el resultado se reparte a las filas por código. Lo
+usan el modelo de trazabilidad, los indicadores de riesgo, el nomenclátor
+de países, el clasificador de OOII y la limpieza del pipeline.
+"""
+import numpy as np
+import pandas as pd
+
+
+def por_valor(valores, funcion, dtype=bool) -> np.ndarray:
+    """
+    funcion(v) para cada elemento de `valores` (Series, o una tupla
+    (valor, n) para una columna ausente), evaluada una vez por valor
+    distinto. Columnas de un solo tipo (bool, numéricas, texto) se
+    factorizan; las mixtas usan un memo con el tipo en la clave, porque
+    1, 1.0 y True son la misma clave de dict pero str() los distingue.
+    Los nulos se evalúan uno a uno con su valor original (bool(NaN) es
+    True, bool(None) es False).
+    """
+    if isinstance(valores, tuple):
+        valor, n = valores
+        return np.full(n, funcion(valor), dtype=dtype)
+
+    tipo = pd.api.types.infer_dtype(valores, skipna=True)
+    if valores.dtype != object or tipo in ("string", "empty"):
+        codigos, unicos = pd.factorize(valores)
+        clases = np.fromiter((funcion(u) for u in unicos), dtype=dtype, count=len(unicos))
+        resultado = np.empty(len(codigos), dtype=dtype)
+        validos = codigos >= 0
+        resultado[validos] = clases[codigos[validos]]
+        nulos = np.flatnonzero(~validos)
+        if len(nulos):
+            originales = valores.to_numpy(dtype=object)[nulos]
+            resultado[nulos] = np.fromiter(map(funcion, originales), dtype=dtype, count=len(nulos))
+        return resultado
+
+    memo = {}
+
+    def _evaluar(v):
+        clave = (type(v), v)
+        try:
+            return memo[clave]
+        except KeyError:
+            memo[clave] = resultado = funcion(v)
+            return resultado
+        except TypeError:
+            return funcion(v)
+
+    return np.fromiter(map(_evaluar, valores.tolist()), dtype=dtype, count=len(valores))
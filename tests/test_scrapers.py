@@ -0,0 +1,847 @@
+"""
+tests/test_scrapers.py
+"""
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import requests
+from rapidfuzz import fuzz
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+import cruce_entidades
+import scraper_aecid
+import scraper_bdns
+import scraper_place
+from paginacion import descargar_paginas
+
+
+class _Respuesta:
+    def __init__(self, text):
+        self.text = text
+
+
+def _pagina_aecid(start, delta, total):
+    desde = (start - 1) * delta
+    filas = "".join(
+        f'<tr><td class="titulo"><a href="/w/z11-25-01-{i:05d}">T{i}</a></td>'
+        f'<td data-label="Importe">1.000</td></tr>'
+        for i in range(desde, min(desde + delta, total))
+    )
+    return (f"<p>de {total} resultados</p>"
+            f'<table class="tabla-resultados"><tbody>{filas}</tbody></table>')
+
+
+def test_descargar_paginas_respeta_orden():
+    # Las primeras páginas tardan más: llegan las últimas, pero salen primero
+    def _lenta(p):
+        time.sleep(0.05 / p)
+        return p
+    assert descargar_paginas(_lenta, range(1, 9), concurrencia=4) == list(range(1, 9))
+
+
+def test_descargar_paginas_error_queda_none():
+    def _falla(p):
+        if p == 2:
+            raise RuntimeError("boom")
+        return p
+    assert descargar_paginas(_falla, [1, 2, 3], concurrencia=2) == [1, None, 3]
+
+
+@pytest.mark.parametrize("concurrencia", [1, 4])
+def test_lista_intervenciones_orden_de_pagina(monkeypatch, concurrencia):
+    def _get(url, params=None, retries=3):
+        return _Respuesta(_pagina_aecid(params["start"], params["delta"], 25))
+    monkeypatch.setattr(scraper_aecid, "_get", _get)
+
+    df = scraper_aecid._scrape_lista_intervenciones(delta=10, concurrencia=concurrencia, rps=None)
+    assert df["id"].tolist() == [f"z11-25-01-{i:05d}" for i in range(25)]
+
+
+def _api_bdns(n_items, tam, fallos=(), pedidas=None, ids_por_pagina=None, caidas=()):
+    """Simula /concesiones/busqueda: n_items concesiones AECID, paginadas de
+    la más reciente (id 0) a la más antigua. Las páginas en `fallos`
+    devuelven {} la primera vez que se piden y las de `caidas`, siempre.
+    ids_por_pagina reordena los ids (un API que no respeta el orden pedido)."""
+    pendientes = set(fallos)
+    orden = list(ids_por_pagina) if ids_por_pagina is not None else list(range(n_items))
+
+    def _buscar(texto="AECID", pagina=0, tam=tam):
+        if pedidas is not None:
+            pedidas.append(pagina)
+        if pagina in caidas or pagina in pendientes:
+            pendientes.discard(pagina)
+            return {}
+        total_paginas = -(-n_items // tam)
+        ids = orden[pagina * tam:(pagina + 1) * tam]
+        return {
+            "content": [{"id": i, "codConcesion": f"SB{i}", "beneficiario": f"B{i:08d} FUNDACION {i}",
+                         "importe": 100, "fechaConcesion": _fecha_bdns(i),
+                         "nivel3": "AGENCIA ESPAÑOLA DE COOPERACIÓN INTERNACIONAL PARA EL DESARROLLO"}
+                        for i in ids],
+            "totalPages": total_paginas,
+            "last": pagina >= total_paginas - 1,
+        }
+    return _buscar
+
+
+def _fecha_bdns(i):
+    return (pd.Timestamp("2026-07-01") - pd.Timedelta(days=i // 10)).strftime("%Y-%m-%d")
+
+
+def test_concesiones_paralelo_en_orden_y_reintenta(monkeypatch):
+    monkeypatch.setattr(scraper_bdns.time, "sleep", lambda s: None)
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(230, 50, fallos={2, 4}))
+    df = scraper_bdns.scrape_concesiones_aecid(concurrencia=4)
+    assert df["id_concesion"].tolist() == list(range(230))
+    assert df["cif_beneficiario"].tolist() == [f"B{i:08d}" for i in range(230)]
+    assert df["beneficiario"].tolist() == [f"FUNDACION {i}" for i in range(230)]
+
+
+def test_concesiones_respeta_max_paginas(monkeypatch):
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(230, 50))
+    df = scraper_bdns.scrape_concesiones_aecid(max_paginas=2, concurrencia=4)
+    assert len(df) == 100
+
+
+def test_concesiones_incremental_corta_en_marca_de_agua(monkeypatch, tmp_path):
+    # Corrida previa: el API tenía 150 concesiones (hoy son las ids 80..229)
+    path_csv = tmp_path / "bdns_concesiones.csv"
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(150, 50))
+    previas = scraper_bdns.scrape_concesiones_aecid(concurrencia=1)
+    previas["id_concesion"] += 80
+    previas["fecha_concesion"] = [_fecha_bdns(i) for i in previas["id_concesion"]]
+    previas.to_csv(path_csv, index=False)
+
+    pedidas = []
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(230, 50, pedidas=pedidas))
+    df = scraper_bdns.scrape_concesiones_aecid(concurrencia=1, incremental=True, path_previo=path_csv)
+
+    assert sorted(pedidas) == [0, 1]  # la página 1 ya trae fechas anteriores a la marca
+    assert df["id_concesion"].tolist() == list(range(230))
+    assert df["id_concesion"].is_unique
+
+    # API que ignora el orden pedido (de la más antigua a la más reciente):
+    # sin corte, se descarga todo y no se pierde ninguna concesión nueva
+    pedidas.clear()
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones",
+                        _api_bdns(230, 50, pedidas=pedidas, ids_por_pagina=range(229, -1, -1)))
+    df = scraper_bdns.scrape_concesiones_aecid(concurrencia=1, incremental=True, path_previo=path_csv)
+    assert sorted(pedidas) == [0, 1, 2, 3, 4]
+    assert sorted(df["id_concesion"]) == list(range(230)) and df["id_concesion"].is_unique
+
+
+@pytest.mark.parametrize("primera_corrida", [
+    {"api": {"caidas": {1}}},          # la página 1 no responde en ningún reintento
+    {"max_paginas": 2},                # se para antes de llegar al corte
+], ids=["pagina_caida", "max_paginas"])
+def test_concesiones_incremental_con_huecos_no_avanza_la_marca(monkeypatch, tmp_path, primera_corrida):
+    monkeypatch.setattr(scraper_bdns.time, "sleep", lambda s: None)
+    path_csv = tmp_path / "bdns_concesiones.csv"
+    path_marca = scraper_bdns._path_watermark(path_csv)
+
+    def _corrida(api, **kw):
+        monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", api)
+        df = scraper_bdns.scrape_concesiones_aecid(concurrencia=2, path_previo=path_csv, **kw)
+        df.to_csv(path_csv, index=False)
+        scraper_bdns.guardar_watermark(df, path=path_marca)
+        return df
+
+    # Corrida previa: 150 concesiones, hoy las ids 150..299 de un API con 300
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(150, 50))
+    previas = scraper_bdns.scrape_concesiones_aecid(concurrencia=1)
+    previas["id_concesion"] += 150
+    previas["fecha_concesion"] = [_fecha_bdns(i) for i in previas["id_concesion"]]
+    previas.to_csv(path_csv, index=False)
+    scraper_bdns.guardar_watermark(previas, path=path_marca)
+    marca_previa = scraper_bdns.cargar_watermark(path=path_marca)["fecha_concesion"]
+
+    df = _corrida(_api_bdns(300, 50, **primera_corrida.get("api", {})), incremental=True,
+                  **{k: v for k, v in primera_corrida.items() if k != "api"})
+    assert len(df) == 250
+    assert scraper_bdns.cargar_watermark(path=path_marca)["fecha_concesion"] == marca_previa
+
+    # Una segunda corrida sana recupera lo que quedó en el hueco
+    df = _corrida(_api_bdns(300, 50), incremental=True)
+    assert sorted(df["id_concesion"]) == list(range(300)) and df["id_concesion"].is_unique
+    assert scraper_bdns.cargar_watermark(path=path_marca)["fecha_concesion"] == _fecha_bdns(0)
+
+
+def test_concesiones_completa_con_pagina_caida_fuerza_descarga_completa(monkeypatch, tmp_path):
+    monkeypatch.setattr(scraper_bdns.time, "sleep", lambda s: None)
+    monkeypatch.setattr(scraper_bdns, "_buscar_concesiones", _api_bdns(300, 50, caidas={2}))
+    df = scraper_bdns.scrape_concesiones_aecid(concurrencia=2)
+    path_marca = tmp_path / "bdns_watermark.json"
+    scraper_bdns.guardar_watermark(df, path=path_marca)
+    assert len(df) == 250
+    assert scraper_bdns.cargar_watermark(path=path_marca)["fecha_concesion"] is None
+
+
+def test_concesiones_piden_orden_por_fecha_descendente(monkeypatch):
+    enviados = []
+
+    class _R:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {}
+
+    monkeypatch.setattr(scraper_bdns.HTTP, "get", lambda url, params=None, **kw: enviados.append(params) or _R())
+    scraper_bdns._buscar_concesiones(pagina=3)
+    assert enviados[0]["page"] == 3
+    assert {k: enviados[0][k] for k in scraper_bdns.ORDEN_CONCESIONES} == scraper_bdns.ORDEN_CONCESIONES
+
+
+def _entry_place(i, organo, titulo=None):
+    titulo = f"Servicio de mantenimiento {i} en Bolivia &amp; Perú" if titulo is None else titulo
+    return (
+        "<entry>"
+        f"<id>https://contrataciondelestado.es/sindicacion/licitacionesPerfilContratante/{i}</id>"
+        f"<link href=\"https://contrataciondelestado.es/wps/poc?uri=deeplink:detalle_licitacion&amp;idEvl={i}\"/>"
+        f"<summary type=\"text\">Id licitación: 2023/CTR/{i:07d}; Órgano de Contratación: {organo}; "
+        f"Importe: {i}.500,25 EUR; Estado: ADJ</summary>"
+        f"<title>{titulo}</title>"
+        f"<updated>2023-01-{1 + i % 28:02d}T10:00:00.000+01:00</updated>"
+        "<cac-place-ext:ContractFolderStatus><cbc:ContractFolderID>X</cbc:ContractFolderID>"
+        "</cac-place-ext:ContractFolderStatus>"
+        "</entry>"
+    )
+
+
+def _feed_place(n=60):
+    organos = ["Ayuntamiento de Écija",
+               "Dirección de la Agencia Española de Cooperación Internacional para el Desarrollo (AECID)",
+               "Consejería de Sanidad", "aecid - Oficina Técnica de Cooperación en Etiopía"]
+    entries = "".join(_entry_place(i, organos[i % 4], titulo="" if i == 5 else None) for i in range(n))
+    return ('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            '<title>Licitaciones</title>'
+            '<link href="https://contrataciondelestado.es/sindicacion/pagina_2.atom" rel="next"/>'
+            f"<updated>2023-02-01T00:00:00Z</updated>{entries}</feed>")
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 4096, 10**7])
+def test_parser_stream_igual_a_regex(chunk):
+    texto = _feed_place()
+    crudo = texto.encode("utf-8")
+    esperado = scraper_place._parsear_pagina(texto)
+    obtenido = scraper_place._parsear_stream(crudo[i:i + chunk] for i in range(0, len(crudo), chunk))
+    assert obtenido == esperado
+    datos, next_url, fecha_min = obtenido
+    assert len(datos) == 29  # 30 entradas AECID, una sin título
+    assert next_url.endswith("pagina_2.atom")
+    assert fecha_min == "2023-01-01"
+
+
+def _sin_prefiltro(monkeypatch):
+    monkeypatch.setattr(scraper_place, "_puede_ser_aecid", lambda entry: True)
+
+
+@pytest.mark.parametrize("organo,es_aecid", [
+    ("AGENCIA ESPAÑOLA DE COOPERACION INTERNACIONAL PARA EL DESARROLLO", True),
+    ("Agencia  Espanola de Cooperación Internacional para el Desarrollo", True),
+    ("AE<b>CID</b> Madrid", True),   # la etiqueta se quita antes de filtrar
+    ("AECİD", True),                 # İ matchea 'I' con re.IGNORECASE
+    ("Fundación Española para la Cooperación", False),
+    ("Ayuntamiento de Écija", False),
+])
+def test_prefiltro_aecid_mismo_resultado(monkeypatch, organo, es_aecid):
+    texto = ('<feed><link href="https://x/p2.atom" rel="next"/>'
+             + _entry_place(1, organo) + _entry_place(2, "Consejería de Sanidad") + "</feed>")
+    con_filtro = scraper_place._parsear_pagina(texto)
+    con_filtro_stream = scraper_place._parsear_stream([texto.encode("utf-8")])
+    _sin_prefiltro(monkeypatch)
+    completo = scraper_place._parsear_pagina(texto)
+    assert con_filtro == con_filtro_stream == completo
+    assert len(completo[0]) == int(es_aecid)
+    assert completo[2] == "2023-01-02"  # fecha_min incluye las entradas descartadas
+
+
+def test_prefiltro_cuenta_entradas():
+    texto = _feed_place()
+    crudo = texto.encode("utf-8")
+    contadores_regex, contadores_stream = {}, {}
+    scraper_place._parsear_pagina(texto, contadores=contadores_regex)
+    scraper_place._parsear_stream([crudo], contadores=contadores_stream)
+    assert contadores_regex == contadores_stream == {"entradas_escaneadas": 60, "entradas_parseadas": 30}
+
+
+def test_backfill_zip_stream_igual_a_extraer(monkeypatch, tmp_path):
+    import zipfile
+    import backfill_place_historico as backfill
+    monkeypatch.setattr(backfill, "TMP_DIR", tmp_path / "tmp")
+    zip_path = tmp_path / "2023.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("licitacionesPerfilesContratanteCompleto3.atom", _feed_place(40))
+        z.writestr("licitacionesPerfilesContratanteCompleto3_20230102.atom", _feed_place(20))
+        z.writestr("LEEME.txt", "no es un atom")
+
+    streaming = backfill._procesar_zip_anual(2023, zip_path, modo="stream")
+    assert not (tmp_path / "tmp").exists()  # nada extraído a disco
+    extraido = backfill._procesar_zip_anual(2023, zip_path, modo="extraer")
+    assert streaming == extraido
+    assert len(streaming) == 19 + 9  # sin título la entrada 5 de cada feed
+
+
+@pytest.mark.parametrize("modo", ["stream", "extraer"])
+def test_backfill_workers_igual_a_secuencial(monkeypatch, tmp_path, modo):
+    import zipfile
+    import backfill_place_historico as backfill
+    monkeypatch.setattr(backfill, "TMP_DIR", tmp_path / "tmp")
+    monkeypatch.setattr(backfill, "PATH_HISTORICO", tmp_path / "place_contratos.csv")
+    monkeypatch.setattr(backfill, "PATH_MANIFEST", tmp_path / "manifest.json")
+
+    def _descargar(year, destino, manifest=None):
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(destino, "w") as z:
+            for parte in range(3):
+                feed = _feed_place(12).replace("/licitacionesPerfilContratante/",
+                                                f"/licitacionesPerfilContratante/{year}-{parte}-")
+                z.writestr(f"{year}_{parte}.atom", feed)
+        return year != 2022  # 2022 falla la descarga y se omite
+    monkeypatch.setattr(backfill, "_descargar_zip_anual", _descargar)
+
+    years = [2021, 2022, 2023, 2024]
+    secuencial = backfill.backfill_masivo(years, dry_run=True, modo=modo, workers=1)
+
+    # Las métricas de cada año se loguean antes de que el siguiente reinicie el pico de RSS
+    eventos = []
+    reiniciar, loguear = backfill._reiniciar_pico_rss, backfill._loguear_metricas
+    monkeypatch.setattr(backfill, "_reiniciar_pico_rss", lambda: eventos.append("reinicio") or reiniciar())
+    monkeypatch.setattr(backfill, "_loguear_metricas",
+                        lambda year, *a, **kw: eventos.append((year, a[5] is not None)) or loguear(year, *a, **kw))
+    paralelo = backfill.backfill_masivo(years, dry_run=True, modo=modo, workers=3)
+    pd.testing.assert_frame_equal(paralelo, secuencial)
+    assert len(paralelo) == 3 * 3 * 5  # 3 años × 3 ficheros × 5 contratos
+    assert not (tmp_path / "tmp").exists()
+    medida = Path("/proc/self/io").exists()
+    assert eventos == ["reinicio", (2021, medida), "reinicio", (2023, medida), "reinicio", (2024, medida)]
+
+
+class _RespuestaZip:
+    """Respuesta de requests.get(stream=True) que sirve un ZIP, respetando
+    Range/If-Range y cortando la conexión tras `corte` bytes."""
+
+    def __init__(self, cuerpo, headers, corte=None):
+        desde = 0
+        rango = headers.get("Range")
+        if rango and headers.get("If-Range") == '"v1"':
+            desde = int(rango.split("=")[1].rstrip("-"))
+        self.status_code = 206 if desde else 200
+        self.headers = {"ETag": '"v1"', "Content-Length": str(len(cuerpo) - desde)}
+        if desde:
+            self.headers["Content-Range"] = f"bytes {desde}-{len(cuerpo) - 1}/{len(cuerpo)}"
+        self._cuerpo, self._desde, self._corte = cuerpo, desde, corte
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        import requests
+        fin = len(self._cuerpo) if self._corte is None else self._desde + self._corte
+        for i in range(self._desde, min(fin, len(self._cuerpo)), 1000):
+            yield self._cuerpo[i:min(i + 1000, fin)]
+        if fin < len(self._cuerpo):
+            raise requests.exceptions.ConnectionError("conexión cortada")
+
+
+def test_backfill_descarga_reanuda_con_range(monkeypatch, tmp_path):
+    import io
+    import zipfile
+    import backfill_place_historico as backfill
+    monkeypatch.setattr(backfill.time, "sleep", lambda s: None)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("a.atom", _feed_place(200))
+    cuerpo = buf.getvalue()
+
+    pedidos = []
+
+    def _get(url, headers=None, stream=False, timeout=None, reintentos=None, usar_cache=True):
+        pedidos.append(headers.get("Range"))
+        return _RespuestaZip(cuerpo, headers, corte=len(cuerpo) // 3 if len(pedidos) < 3 else None)
+    monkeypatch.setattr(backfill.HTTP, "get", _get)
+
+    manifest = {"_persistir": False}
+    destino = tmp_path / "2023.zip"
+    assert backfill._descargar_zip_anual(2023, destino, manifest=manifest)
+    assert destino.read_bytes() == cuerpo
+    tercio = len(cuerpo) // 3
+    assert pedidos == [None, f"bytes={tercio}-", f"bytes={2 * tercio}-"]
+    assert manifest["2023"]["estado"] == "descargado"
+    assert manifest["2023"]["bytes_total"] == len(cuerpo)
+
+    # Con el ZIP completo ya en disco no se vuelve a pedir
+    assert backfill._descargar_zip_anual(2023, destino, manifest=manifest)
+    assert len(pedidos) == 3
+
+
+def test_backfill_saltea_years_procesados(monkeypatch, tmp_path):
+    import json
+    import backfill_place_historico as backfill
+    monkeypatch.setattr(backfill, "TMP_DIR", tmp_path / "tmp")
+    monkeypatch.setattr(backfill, "PATH_HISTORICO", tmp_path / "place_contratos.csv")
+    monkeypatch.setattr(backfill, "PATH_MANIFEST", tmp_path / "manifest.json")
+    bajados = []
+
+    def _descargar(year, destino, manifest=None):
+        bajados.append(year)
+        return year != 2022
+    monkeypatch.setattr(backfill, "_descargar_zip_anual", _descargar)
+    monkeypatch.setattr(backfill, "_procesar_zip_anual", lambda year, zip_path, modo: [])
+
+    backfill.backfill_masivo([2021, 2022, 2023])
+    estados = {y: e["estado"] for y, e in json.loads((tmp_path / "manifest.json").read_text()).items()}
+    assert estados == {"2021": "procesado", "2023": "procesado"}
+
+    bajados.clear()
+    backfill.backfill_masivo([2021, 2022, 2023])
+    assert bajados == [2022]
+
+
+@pytest.fixture
+def servidor_http():
+    """Servidor local HTTP/1.1 (keep-alive). /flaky/<n> devuelve 503 con
+    Retry-After: 2 las primeras n veces y luego 200."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    intentos = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            n = int(self.path.rsplit("/", 1)[1]) if self.path.startswith("/flaky/") else 0
+            intentos[self.path] = intentos.get(self.path, 0) + 1
+            status = 503 if intentos[self.path] <= n else 200
+            cuerpo = b'{"ok": true}'
+            etag = f'"{self.path}-v1"'
+            if self.path.startswith("/etag/") and self.headers.get("If-None-Match") == etag:
+                status, cuerpo = 304, b""
+            self.send_response(status)
+            if self.path.startswith("/etag/"):
+                self.send_header("ETag", etag)
+            if status == 503:
+                self.send_header("Retry-After", "2")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+def test_cliente_http_reusa_conexiones(servidor_http):
+    from cliente_http import ClienteHTTP
+    cliente = ClienteHTTP()
+    for i in range(20):
+        assert cliente.get(f"{servidor_http}/pagina/{i}").status_code == 200
+    m = cliente.metricas()["127.0.0.1"]
+    assert m["peticiones"] == 20
+    assert m["conexiones"] == 1
+
+
+def test_cliente_http_reintenta_respetando_retry_after(monkeypatch, servidor_http):
+    import cliente_http
+    esperas = []
+    monkeypatch.setattr(cliente_http.time, "sleep", esperas.append)
+    cliente = cliente_http.ClienteHTTP(reintentos=3)
+
+    assert cliente.get(f"{servidor_http}/flaky/2").status_code == 200
+    assert esperas == [2.0, 2.0]
+    assert cliente.get(f"{servidor_http}/flaky/9", reintentos=1).status_code == 503
+    m = cliente.metricas()["127.0.0.1"]
+    assert (m["peticiones"], m["reintentos"]) == (5, 3)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cliente_http_cache_condicional(tmp_path, servidor_http, stream):
+    from cliente_http import CacheHTTP, ClienteHTTP
+    cliente = ClienteHTTP(cache=CacheHTTP(tmp_path))
+    url = f"{servidor_http}/etag/a"
+
+    # Sin usar_cache (el default, p. ej. el feed PLACE en stream) no se escribe nada
+    with cliente.get(url, params={"page": 0}, stream=stream) as r:
+        assert r.status_code == 200
+    assert not list(tmp_path.iterdir())
+
+    for _ in range(3):
+        with cliente.get(url, params={"page": 1}, stream=stream, usar_cache=True) as r:
+            cuerpo = b"".join(r.iter_content(4)) if stream else r.content
+        assert r.status_code == 200
+        assert cuerpo == b'{"ok": true}'
+    m = cliente.metricas()["127.0.0.1"]
+    assert (m["peticiones"], m["no_modificadas"]) == (4, 2)
+
+    # Offline: la misma URL se sirve del disco; una nueva, o una sin caché,
+    # falla como error de red
+    cliente.cache.offline = True
+    assert cliente.get(url, params={"page": 1}, usar_cache=True).json() == {"ok": True}
+    for kwargs in ({"params": {"page": 2}, "usar_cache": True}, {"params": {"page": 1}}):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            cliente.get(url, **kwargs)
+    assert cliente.metricas()["127.0.0.1"]["peticiones"] == 4
+
+
+def test_cache_http_desaloja_lo_menos_usado(tmp_path, servidor_http):
+    import os
+    from cliente_http import CacheHTTP, ClienteHTTP
+    cache = CacheHTTP(tmp_path, max_mb=30 / 1_048_576)  # entra en dos cuerpos de 12 bytes
+    cliente = ClienteHTTP(cache=cache)
+    for i, pagina in enumerate(["a", "b", "a", "c"]):
+        cliente.get(f"{servidor_http}/etag/{pagina}", usar_cache=True)
+        for body in tmp_path.glob("*.body"):  # mtime con resolución suficiente
+            os.utime(body, (body.stat().st_atime, body.stat().st_mtime - 10))
+    en_cache = {json.loads(p.read_text())["url"].rsplit("/", 1)[1] for p in tmp_path.glob("*.json")}
+    assert en_cache == {"a", "c"}
+
+
+def _cruce_bdns_doble_bucle(df_concesiones, df_aecid, umbral=80):
+    """Implementación original (doble bucle) como referencia de paridad."""
+    from rapidfuzz import fuzz
+    inst = df_concesiones[~df_concesiones["es_persona_fisica"]]
+    beneficiarios = inst["beneficiario"].apply(scraper_bdns._normalizar).tolist()
+    cods = inst["cod_concesion"].fillna("").astype(str).tolist()
+    scores, ids = [], []
+    for entidad in df_aecid["entidad"].fillna(""):
+        entidad_norm = scraper_bdns._normalizar(entidad)
+        mejor, mejor_id = 0, ""
+        if entidad_norm:
+            for b, cod in zip(beneficiarios, cods):
+                score = fuzz.token_sort_ratio(entidad_norm, b)
+                if score > mejor:
+                    mejor, mejor_id = score, cod
+        scores.append(mejor)
+        ids.append(mejor_id if mejor >= umbral else "")
+    return scores, ids
+
+
+def test_cruce_bdns_vectorizado_igual_a_doble_bucle():
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_conc = pd.read_csv(ROOT / "data" / "raw" / "bdns_concesiones.csv")
+    # Casos borde: entidad vacía, empates exactos (beneficiario repetido con
+    # otro código: gana el primero) y entidad sin ningún token en común
+    df_aecid = pd.concat([df_aecid, pd.DataFrame({"entidad": [None, "", "ZZZ", "Fundación Ayuda en Acción"]})],
+                         ignore_index=True)
+    extra = pd.DataFrame({"cod_concesion": ["SB-A", "SB-B"], "es_persona_fisica": [False, False],
+                          "beneficiario": ["FUNDACION AYUDA EN ACCION", "Fundación Ayuda en Acción"]})
+    df_conc = pd.concat([df_conc, extra], ignore_index=True)
+
+    scores, ids = _cruce_bdns_doble_bucle(df_conc, df_aecid)
+    df = scraper_bdns.cruzar_con_aecid(df_conc, df_aecid)
+    assert df["score_cruce_bdns"].tolist() == scores
+    assert df["id_bdns"].tolist() == ids
+    assert df["en_bdns"].sum() > 0
+
+
+def test_cruce_bdns_resuelve_por_cif_antes_del_fuzzy(monkeypatch):
+    # La persona física va primero: `fila` es la posición entre las institucionales
+    df_conc = pd.DataFrame({
+        "cod_concesion": ["SB0", "SB1", "SB2", "SB3", "SB4"],
+        "beneficiario": ["***1234** PEREZ", "FUNDACION OXFAM INTERMON FUNDACION PRIVADA",
+                         "Fundación Oxfam Intermón", "Médicos del Mundo", "CRUZ ROJA ESPAÑOLA"],
+        "cif_beneficiario": ["", "G59033530", "G59033530", "", "Q2866001G"],
+        "es_persona_fisica": [True, False, False, False, False],
+    })
+    df_aecid = pd.DataFrame({"entidad": ["Fundación Oxfam Intermón", "MEDICOS DEL MUNDO",
+                                         "Cruz Roja Española Bolivia", "Entidad desconocida", ""]})
+
+    al_fuzzy, registros = [], []
+    original, registro_cif = scraper_bdns.mejor_coincidencia, scraper_bdns.registro_cif
+
+    def espia(consultas, candidatos, **kw):
+        al_fuzzy.extend(consultas)
+        return original(consultas, candidatos, **kw)
+
+    def espia_registro(df):
+        registros.append(registro_cif(df))
+        return registros[-1]
+
+    monkeypatch.setattr(scraper_bdns, "mejor_coincidencia", espia)
+    monkeypatch.setattr(scraper_bdns, "registro_cif", espia_registro)
+    df = scraper_bdns.cruzar_con_aecid(df_conc, df_aecid)
+
+    # El cruce resuelve los alias con el mismo registro CIF → entidad
+    registro, = registros
+    assert registro["cif"].tolist() == ["G59033530", "Q2866001G"]
+    assert registro.loc[0, "alias"] == ["FUNDACION OXFAM INTERMON FUNDACION PRIVADA", "FUNDACION OXFAM INTERMON"]
+    assert registro["cod_concesion"].tolist() == ["SB1", "SB4"]
+    assert registro["fila"].tolist() == [0, 3]
+    assert registro["n_concesiones"].tolist() == [2, 1]
+    # El alias del CIF resuelve a la primera concesión de ese CIF, sin fuzzy
+    assert df["id_bdns"].tolist() == ["SB1", "SB3", "SB4", "", ""]
+    assert df["cif_bdns"].tolist() == ["G59033530", "", "Q2866001G", "", ""]
+    assert df["score_cruce_bdns"].tolist()[:2] == [100.0, 100.0]
+    assert al_fuzzy == ["CRUZ ROJA ESPANOLA BOLIVIA", "ENTIDAD DESCONOCIDA", ""]
+
+
+@pytest.mark.parametrize("scorer", [fuzz.token_sort_ratio, fuzz.ratio])
+def test_bloqueo_no_pierde_matches_sobre_umbral(scorer):
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_conc = pd.read_csv(ROOT / "data" / "raw" / "bdns_concesiones.csv")
+    consultas = [scraper_bdns._normalizar(e) for e in df_aecid["entidad"].fillna("")] + ["", "ZZZ"]
+    reales = [scraper_bdns._normalizar(b) for b in df_conc.loc[~df_conc["es_persona_fisica"], "beneficiario"]]
+    # Variantes cercanas (sufijos, palabras reordenadas, repetidos) para que
+    # haya muchos candidatos rondando el umbral y empates
+    candidatos = reales + [f"{b} ONGD" for b in reales] + [" ".join(reversed(b.split())) for b in reales] + reales
+
+    s_exh, i_exh = cruce_entidades.mejor_coincidencia(consultas, candidatos, scorer=scorer, bloqueo=False)
+    for umbral in (60, 80, 95):
+        s_blq, i_blq = cruce_entidades.mejor_coincidencia(consultas, candidatos, scorer=scorer,
+                                                          bloqueo=True, umbral=umbral)
+        matches = s_exh >= umbral
+        assert matches.any()
+        assert (s_blq[matches] == s_exh[matches]).all()
+        assert (i_blq[matches] == i_exh[matches]).all()
+        assert (s_blq[~matches] < umbral).all()
+
+    indice = cruce_entidades.IndiceBloqueo(list(dict.fromkeys(candidatos)), scorer=scorer)
+    assert len(indice.candidatos_de(consultas[0], 80)) < len(indice) / 10
+
+
+def test_cache_cruces_incremental_igual_a_sin_cache(tmp_path, caplog):
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_conc = pd.read_csv(ROOT / "data" / "raw" / "bdns_concesiones.csv")
+    consultas = [scraper_bdns._normalizar(e) for e in df_aecid["entidad"].fillna("")] + [""]
+    reales = [scraper_bdns._normalizar(b) for b in df_conc.loc[~df_conc["es_persona_fisica"], "beneficiario"]]
+    cache = cruce_entidades.CacheCruces(tmp_path / "cruces.sqlite")
+
+    def comparar(candidatos, umbral=80):
+        caplog.clear()
+        with caplog.at_level("INFO", logger="cruce_entidades"):
+            s_cache, i_cache = cache.mejor_coincidencia(consultas, candidatos, umbral=umbral)
+        s, i = cruce_entidades.mejor_coincidencia(consultas, candidatos, umbral=umbral)
+        assert s_cache.tolist() == s.tolist()
+        assert i_cache.tolist() == i.tolist()
+        return caplog.messages[-1]
+
+    n = len(set(consultas) - {""})
+    assert comparar(reales[200:]).startswith(f"  Caché de cruces: 0 aciertos, 0 parciales (solo contra nombres nuevos), {n} fallos")
+    assert comparar(reales[200:]).startswith(f"  Caché de cruces: {n} aciertos")
+    # Concesiones nuevas al principio (como el modo incremental): solo se
+    # puntúa contra los nombres nuevos, y los empates se resuelven por orden
+    assert f", {n} parciales" in comparar(reales[:200] + reales[200:] + [f"{b} ONGD" for b in reales[:50]])
+    # Desaparece un beneficiario: las entidades que lo tenían de mejor se recalculan
+    mensaje = comparar(reales[300:])
+    assert " 0 fallos" not in mensaje
+    # Otro umbral (u otro scorer) es otra configuración: todo falla
+    assert comparar(reales[300:], umbral=90).endswith(f"{n} fallos de {n} entidades")
+
+
+def test_bloqueo_auto_solo_con_muchos_candidatos(monkeypatch):
+    consultas = ["FUNDACION AYUDA EN ACCION", "CRUZ ROJA ESPANOLA"]
+    candidatos = ["AYUDA EN ACCION FUNDACION", "CRUZ ROJA", "MEDICOS DEL MUNDO"]
+    s_exh, i_exh = cruce_entidades.mejor_coincidencia(consultas, candidatos, bloqueo=False)
+    # Por debajo de UMBRAL_BLOQUEO "auto" es exhaustivo: también los scores < umbral
+    s, i = cruce_entidades.mejor_coincidencia(consultas, candidatos, umbral=100)
+    assert s.tolist() == s_exh.tolist() and i.tolist() == i_exh.tolist()
+
+    monkeypatch.setattr(cruce_entidades, "UMBRAL_BLOQUEO", 1)
+    s, i = cruce_entidades.mejor_coincidencia(consultas, candidatos, umbral=100)
+    assert s.tolist() == [100.0, 0.0] and i.tolist() == [0, -1]
+    with pytest.raises(ValueError):
+        cruce_entidades.IndiceBloqueo(candidatos, scorer=fuzz.partial_ratio)
+
+
+def test_paises_por_titulo_igual_a_una_regex_por_pais():
+    df_aecid = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df_place = pd.read_csv(ROOT / "data" / "raw" / "place_contratos.csv")
+    paises = scraper_place.paises_conocidos(df_aecid["pais_region"]) | {"Bissau", "Rica"}
+    titulos = df_place["titulo"].fillna("").astype(str).tolist() + [
+        "", "Obras en GUINEA ECUATORIAL y guinea-bissau", "Guinea\nEcuatorial",
+        "Oficina en Rep. Dem. del Congo", "Rep.Dem", "Sede en Costa Rica.", "Nicaragüense", "perú;Chile",
+    ]
+    patrones = {p: re.compile(r"\b" + re.escape(p) + r"\b", re.IGNORECASE) for p in paises}
+    esperado = [{p for p, pat in patrones.items() if pat.search(t)} for t in titulos]
+    assert scraper_place.paises_por_titulo(titulos, paises) == esperado
+    assert esperado[-7] == {"Guinea", "Guinea Ecuatorial", "Guinea-Bissau", "Bissau"}
+
+
+def test_cache_pasos_salta_solo_lo_que_no_cambio(tmp_path):
+    from cache_pasos import CachePasos
+    raw, limpio, final = tmp_path / "raw.csv", tmp_path / "limpio.csv", tmp_path / "final.csv"
+    raw.write_text("a\n1\n")
+    llamadas = []
+
+    def correr(params=None, codigo="v1", activa=True):
+        cache = CachePasos(tmp_path / "manifiesto.json", activa=activa, codigo=codigo)
+
+        def limpieza():
+            llamadas.append("limpieza")
+            limpio.write_text(raw.read_text().upper())
+            return limpio
+
+        def final_():
+            llamadas.append("final")
+            final.write_text(limpio.read_text() * 2)
+            return final
+
+        out = cache.ejecutar("limpieza", limpieza, entradas=[raw], salidas=[limpio], params=params)
+        assert cache.ejecutar("final", final_, entradas=[out], salidas=[final], params=params) == final
+        return cache
+
+    correr()
+    assert llamadas == ["limpieza", "final"]
+    assert correr().aciertos == ["limpieza", "final"] and llamadas == ["limpieza", "final"]
+
+    raw.write_text("a\n1\n")  # mismo contenido, otro mtime: sigue siendo acierto
+    assert correr().recalculados == []
+    raw.write_text("a\n2\n")
+    assert correr().recalculados == ["limpieza", "final"]
+    assert correr(params={"umbral": 2}).recalculados == ["limpieza", "final"]
+    assert correr(params={"umbral": 2}, codigo="v2").recalculados == ["limpieza", "final"]
+
+    # Salida tocada a mano: se recalcula ese paso; como limpieza reescribe el
+    # mismo contenido, el siguiente sigue vigente
+    limpio.write_text("otra cosa")
+    cache = correr(params={"umbral": 2}, codigo="v2")
+    assert cache.recalculados == ["limpieza"] and cache.aciertos == ["final"]
+
+    del llamadas[:]
+    assert correr(params={"umbral": 2}, codigo="v2", activa=False).aciertos == []
+    assert llamadas == ["limpieza", "final"]
+
+
+def test_ejecutar_fuentes_en_paralelo_con_timeout_y_fallos_aislados():
+    from paginacion import ejecutar_fuentes
+
+    def lenta(segundos, valor):
+        def trabajo():
+            time.sleep(segundos)
+            return valor
+        return trabajo
+
+    def rota():
+        raise ValueError("portal caído")
+
+    t0 = time.monotonic()
+    res, errores, duraciones = ejecutar_fuentes(
+        {"a": lenta(0.3, 1), "b": lenta(0.3, 2), "c": rota, "colgada": lenta(5, 3)},
+        timeouts={"colgada": 0.5}, timeout_defecto=2,
+    )
+    assert time.monotonic() - t0 < 1.0  # lo de la más lenta a tiempo, no la suma ni la colgada
+    assert res == {"a": 1, "b": 2}
+    assert isinstance(errores["c"], ValueError) and isinstance(errores["colgada"], TimeoutError)
+    assert set(duraciones) == {"a", "b", "c", "colgada"} and duraciones["a"] >= 0.3
+
+
+def test_cache_pasos_en_memoria_encadena_por_huella(tmp_path):
+    from cache_pasos import CachePasos, EscritorSalidas
+    raw, limpio, final = tmp_path / "raw.csv", tmp_path / "limpio.csv", tmp_path / "final.csv"
+    pd.DataFrame({"a": [1, 2]}).to_csv(raw, index=False)
+    llamadas = []
+
+    def correr(params=None):
+        cache = CachePasos(tmp_path / "manifiesto.json", codigo="v1")
+        salidas = EscritorSalidas()
+
+        def limpieza():
+            llamadas.append("limpieza")
+            return pd.read_csv(raw).assign(b=lambda d: d["a"] * 10)
+
+        def final_(df):
+            llamadas.append("final")
+            df = df.assign(c=df["a"] + df["b"])
+            return df
+
+        df = cache.ejecutar_en_memoria("limpieza", limpieza, entradas=[raw], salidas=[limpio],
+                                       cargar=lambda: pd.read_csv(limpio),
+                                       escribir=lambda d: salidas.csv(d, limpio), params=params)
+        df = cache.ejecutar_en_memoria("final", lambda: final_(df), entradas=[], salidas=[final],
+                                       cargar=lambda: pd.read_csv(final),
+                                       escribir=lambda d: salidas.csv(d, final), params=params,
+                                       previos=["limpieza"])
+        salidas.esperar()
+        cache.confirmar()
+        return cache, df
+
+    cache, df = correr()
+    assert cache.recalculados == ["limpieza", "final"]
+    assert pd.read_csv(limpio).to_dict("list") == {"a": [1, 2], "b": [10, 20]}
+    pd.testing.assert_frame_equal(pd.read_csv(final), df)
+
+    cache, df = correr()
+    assert cache.aciertos == ["limpieza", "final"] and len(llamadas) == 2
+    assert df["c"].tolist() == [11, 22]
+
+    # final no lee archivos: se invalida porque cambió la huella de limpieza
+    pd.DataFrame({"a": [3]}).to_csv(raw, index=False)
+    cache, df = correr()
+    assert cache.recalculados == ["limpieza", "final"] and df["c"].tolist() == [33]
+    assert correr(params={"umbral": 2})[0].recalculados == ["limpieza", "final"]
+
+
+def test_escritor_salidas_escribe_la_foto_y_relanza_el_error(tmp_path):
+    import threading
+    from cache_pasos import EscritorSalidas
+    salidas = EscritorSalidas()
+    # Con el hilo ocupado, el paso siguiente modifica el DataFrame ya encolado
+    libre = threading.Event()
+    salidas._encolar(tmp_path / "bloqueo", libre.wait)
+    df = pd.DataFrame({"a": [1, 2]})
+    salidas.csv(df, tmp_path / "foto.csv")
+    df.loc[0, "a"] = 99
+    libre.set()
+    salidas.texto("ok", tmp_path / "ok.md")
+    salidas.texto("no", tmp_path / "no_existe" / "x.md")
+    with pytest.raises(FileNotFoundError):
+        salidas.esperar()
+    assert (tmp_path / "ok.md").read_text(encoding="utf-8") == "ok"
+    assert pd.read_csv(tmp_path / "foto.csv")["a"].tolist() == [1, 2]
+
+
+def test_ingesta_guarda_cursor_place_solo_con_su_csv_escrito(monkeypatch, tmp_path):
+    import pipeline
+    monkeypatch.setattr(pipeline, "DATA_RAW", tmp_path)
+    monkeypatch.setattr(scraper_place, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(scraper_place, "CURSOR_PATH", tmp_path / "place_cursor.json")
+    monkeypatch.setattr(pipeline, "guardar_watermark", lambda df: None)
+    monkeypatch.setattr(pipeline, "scrape_bdns", lambda: pd.DataFrame({"numero_bdns": ["1"]}))
+    monkeypatch.setattr(pipeline, "scrape_concesiones_aecid", lambda **kw: pd.DataFrame())
+    cursor = {"next_url": "https://contrataciondelestado.es/pagina_9.atom", "agotado": False}
+
+    def place(demora=0.0):
+        def _scrape_place(years=None):
+            time.sleep(demora)
+            return pd.DataFrame(scraper_place._seed_place()), cursor
+        return _scrape_place
+
+    def aecid_caido():
+        raise requests.exceptions.ConnectionError("datos.aecid.es caído")
+
+    # aecid falla sin CSV previo: lo demás se escribe antes del error, y el
+    # cursor recién después de su CSV
+    monkeypatch.setattr(pipeline, "scrape_aecid", aecid_caido)
+    monkeypatch.setattr(pipeline, "scrape_place", place())
+    with pytest.raises(RuntimeError, match="datos.aecid.es"):
+        pipeline.paso_ingesta([2024])
+    assert len(pd.read_csv(tmp_path / "place_contratos.csv")) == len(scraper_place._seed_place())
+    assert json.loads((tmp_path / "place_cursor.json").read_text(encoding="utf-8")) == cursor
+    assert (tmp_path / "bdns_subvenciones.csv").exists()
+
+    # PLACE no termina a tiempo: aunque devuelva tarde, el cursor no avanza
+    (tmp_path / "place_cursor.json").unlink()
+    (tmp_path / "place_contratos.csv").unlink()
+    monkeypatch.setattr(pipeline, "scrape_aecid", lambda: pd.DataFrame({"id": ["x"]}))
+    monkeypatch.setattr(pipeline, "scrape_place", place(demora=0.5))
+    monkeypatch.setitem(pipeline.TIMEOUT_FUENTE, "place", 0.1)
+    pipeline.paso_ingesta([2024], forzar=True)
+    time.sleep(0.6)
+    assert not (tmp_path / "place_cursor.json").exists()
+    assert not (tmp_path / "place_contratos.csv").exists()
@@ -12,6 +12,9 @@ sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(ROOT / "src"))
 
 from trazabilidad_score import ModeloTrazabilidad, ESLABON_SCORE, ESLABONES, OOII_CAJA_NEGRA
+import clasificador_ooii
+import gazetteer
+from valores_distintos import por_valor
 from indicadores_riesgo import (
     CalculadorICR, CalculadorSOG, CalculadorRES, CalculadorVIA,
     calcular_scores_completos, generar_resumen_global,
@@ -141,6 +144,212 @@ def test_scores_completos_columnas(df_test):
     for col in ["entidad","score_riesgo","nivel_riesgo","icr","sog_medio"]:
         assert col in scores.columns
 
+def _ruptura_r2_original(df_place, row):
+    """_ruptura_r2 antes de indexar los títulos: un str.contains por fondo."""
+    matches = df_place[df_place["titulo"].str.lower().str.contains(
+        str(row.get("titulo", ""))[:20].lower(), na=False)]
+    adj_directa = matches["adjudicacion_directa"].any() if not matches.empty else False
+    return (not row.get("en_place", False)) or adj_directa
+
+
+@pytest.mark.filterwarnings("ignore:This pattern is interpreted as a regular expression")
+def test_r2_indexado_igual_al_scan_por_fila():
+    df_place = pd.read_csv(ROOT / "data" / "raw" / "place_contratos.csv")
+    df_place = pd.concat([df_place, pd.DataFrame({
+        "titulo": ["Agua (fase 2) potable en Bolivia", "Servicio de limpieza OTC", None, "Obras v.2 Perú"],
+        "adjudicacion_directa": [True, True, True, float("nan")],
+    })], ignore_index=True)
+    titulos = df_place["titulo"].dropna().tolist()
+    fondos = pd.DataFrame({
+        "titulo": [t[:25] for t in titulos[::7]] + ["Agua (fase 2) potable", "obras v.2", "SERVICIO DE LIMPIEZA", None],
+    })
+    fondos["en_place"] = [i % 3 != 0 for i in range(len(fondos))]
+    fondos["entidad"] = "ONG"
+
+    modelo = ModeloTrazabilidad(df_place=df_place)
+    esperado = [_ruptura_r2_original(df_place, row) for _, row in fondos.iterrows()]
+    assert [modelo._ruptura_r2(row) for _, row in fondos.iterrows()] == esperado
+    assert modelo.analizar_dataframe(fondos)["ruptura_r2"].tolist() == esperado
+    assert any(esperado[i] for i in range(len(fondos)) if fondos["en_place"][i])
+    # Un prefijo que no es regex válida hacía fallar str.contains: ahora se
+    # busca como literal
+    assert modelo._ruptura_r2(pd.Series({"titulo": "Agua (fase 2) potable"[:10], "en_place": True}))
+
+
+def _fondos_variados():
+    """Fondos reales del último análisis (sin sus columnas de resultado) más
+    filas borde: nulos, blancos, en_place como texto/NaN, beneficiario final."""
+    df = pd.read_csv(ROOT / "data" / "processed" / "trazabilidad_por_fondo.csv")
+    df = df.drop(columns=["eslabon_corte", "nombre_eslabon", "score_trazabilidad",
+                          "ruptura_r1", "ruptura_r2", "ruptura_r3", "es_ooii"])
+    df["en_place"] = [i % 4 == 0 for i in range(len(df))]
+    df["beneficiario_final"] = ""
+    df["nif_beneficiario"] = ""
+    bordes = pd.DataFrame([
+        {"id": "B1", "titulo": None, "entidad": None, "pais_region": None, "importe_eur": None},
+        {"id": "B2", "titulo": "x", "entidad": "   ", "pais_region": "nan", "importe_eur": 0},
+        {"id": None, "titulo": "Proyecto (OTC)", "entidad": "UNICEF España", "importe_eur": 9e6,
+         "en_place": True},
+        {"id": "B4", "titulo": "Agua", "entidad": "ONG", "pais_region": "No Especificado",
+         "importe_eur": 600_000, "en_place": float("nan"), "en_bdns": float("nan")},
+        {"id": "B5", "titulo": "Agua", "entidad": "ONG", "pais_region": "Perú", "importe_eur": "",
+         "en_place": True, "fuente": "seed", "beneficiario_final": "ACME"},
+        {"id": "B6", "titulo": "Agua", "entidad": "ONG", "pais_region": "Perú", "importe_eur": 600_000,
+         "en_place": True, "id_bdns": "SB1", "nif_beneficiario": "B123"},
+    ])
+    return pd.concat([df, bordes], ignore_index=True)
+
+
+@pytest.mark.parametrize("con_fuentes", [False, True])
+def test_motor_columnar_igual_al_de_filas(con_fuentes):
+    df = _fondos_variados()
+    if con_fuentes:
+        df_place = pd.read_csv(ROOT / "data" / "raw" / "place_contratos.csv")
+        df_place.loc[::3, "adjudicacion_directa"] = True
+        df_ltaibg = pd.DataFrame({"proyecto": df["id"].dropna().astype(str)[::2], "tiene_justificante": "si"})
+        modelo = ModeloTrazabilidad(df_place=df_place, df_ltaibg=df_ltaibg)
+    else:
+        modelo = ModeloTrazabilidad()
+    filas = modelo.analizar_dataframe(df, motor="filas")
+    columnas = modelo.analizar_dataframe(df, motor="columnas")
+    pd.testing.assert_frame_equal(columnas, filas)
+    assert filas["eslabon_corte"].nunique() >= 4
+    # Sin las columnas opcionales (en_place, en_bdns, ...) también coinciden
+    minimo = df[["id", "titulo", "entidad", "pais_region", "importe_eur"]].iloc[:50]
+    pd.testing.assert_frame_equal(modelo.analizar_dataframe(minimo, motor="columnas"),
+                                  modelo.analizar_dataframe(minimo, motor="filas"))
+
+
+def test_gazetteer_igual_a_las_reglas_por_fila():
+    valores = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")["pais_region"]
+    serie = pd.concat([valores, pd.Series([None, float("nan"), "", "  Chad ", "NE - Regional",
+                                           "Sudán del Sur, Mali", "MÉXICO", 7])], ignore_index=True)
+
+    def via(p):
+        if pd.isna(p):
+            return gazetteer.VULNERABILIDAD_DEFAULT
+        return next((v for k, v in gazetteer.VULNERABILIDAD_PAIS.items() if k in str(p).lower().strip()),
+                    gazetteer.VULNERABILIDAD_DEFAULT)
+
+    def region(p):
+        if pd.isna(p):
+            return "No Especificado"
+        for reg, paises in gazetteer.REGIONES.items():
+            if any(x in str(p).lower() for x in paises):
+                return reg
+        if any(x in str(p).lower() for x in ["no especificado", "ne -", "países en vías"]):
+            return "No Especificado"
+        return "Otras Regiones"
+
+    def region_dashboard(p):
+        for reg, paises in gazetteer.REGIONES_DASHBOARD.items():
+            if any(x in str(p) for x in paises):
+                return reg
+        return "Multipaís/Global"
+
+    assert CalculadorVIA().calcular(pd.DataFrame({"pais_region": serie})).tolist() == serie.apply(via).tolist()
+    assert gazetteer.resolver_serie(serie, "region").tolist() == serie.apply(region).tolist()
+    assert (gazetteer.resolver_serie(serie, "region_dashboard").tolist()
+            == serie.apply(region_dashboard).tolist())
+    assert gazetteer.resolver("Bolivia, Países en Vías de Desarrollo (No Especificado), Perú").paises == ("Bolivia", "Perú")
+    assert "Guinea Ecuatorial" in gazetteer.paises_conocidos(valores)
+
+
+def test_clasificador_ooii_igual_al_scan_por_fila():
+    entidades = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")["entidad"]
+    serie = pd.concat([entidades, pd.Series([None, float("nan"), "", "Ops/OMS Bolivia", "WORLD BANK",
+                                             "Fondo de Adaptación", "Fundación Bidasoa", 7])],
+                      ignore_index=True)
+
+    def es_ooii(e):
+        return not pd.isna(e) and any(o in str(e).lower() for o in OOII_CAJA_NEGRA)
+
+    esperado = serie.apply(es_ooii).tolist()
+    assert esperado.count(True) > 0
+    assert clasificador_ooii.es_ooii_serie(serie).tolist() == esperado
+    assert [ModeloTrazabilidad()._es_ooii(e) for e in serie] == esperado
+
+
+@pytest.mark.parametrize("valores", [
+    pd.Series(["a", None, "a", float("nan"), ""]),
+    pd.Series([1, 1.0, True, "1", None, float("nan")], dtype=object),  # mixta: memo por tipo
+    pd.Series([float("nan")] * 3),                                     # toda nula
+    pd.Series([0.0, 2.5, 0.0]),
+    pd.Series([], dtype=object),
+])
+@pytest.mark.parametrize("funcion,dtype", [(bool, bool), (repr, object)])
+def test_por_valor_igual_a_evaluar_fila_a_fila(valores, funcion, dtype):
+    assert por_valor(valores, funcion, dtype=dtype).tolist() == [funcion(v) for v in valores.tolist()]
+
+
+def test_calculadores_vectorizados_igual_a_fila():
+    df = pd.read_csv(ROOT / "data" / "processed" / "trazabilidad_por_fondo.csv")
+    df = pd.concat([df, pd.DataFrame({
+        "entidad": ["A", "B", "C", "D", "E"],
+        "pais_region": [None, float("nan"), "", "NO ESPECIFICADO", 0],
+        "es_ooii": [float("nan"), 1.0, 0.0, "False", ""],
+        "ruptura_r2": [None, "x", 0, True, float("nan")],
+        "eslabon_corte": [0, 9, 2.0, -1, 7],
+    })], ignore_index=True)
+    df.index = df.index * 2  # índice no contiguo: los resultados se alinean con df
+
+    sog = CalculadorSOG()
+    assert sog.calcular(df).tolist() == df.apply(sog.calcular_fila, axis=1).tolist()
+    assert sog.calcular(df).index.equals(df.index)
+    sin_columnas = df[["pais_region"]]
+    assert sog.calcular(sin_columnas).tolist() == sin_columnas.apply(sog.calcular_fila, axis=1).tolist()
+    # Sin columna es_ooii no se deriva de la entidad: no suma, igual que calcular_fila
+    sin_es_ooii = pd.DataFrame({"entidad": ["PNUD", "ONG X"], "pais_region": ["Bolivia", "Perú"]})
+    assert sog.calcular(sin_es_ooii).tolist() == sin_es_ooii.apply(sog.calcular_fila, axis=1).tolist() == [0, 0]
+
+    res = CalculadorRES().calcular(df)
+    esperado = df["eslabon_corte"].apply(
+        lambda e: round((1 - ESLABON_SCORE.get(int(e), 0) / max(ESLABON_SCORE.values())) * 100, 1))
+    assert res.tolist() == esperado.tolist()
+    assert res.index.equals(df.index)
+
+
+def test_icr_por_entidad_igual_al_groupby_por_dimension():
+    df = pd.read_csv(ROOT / "data" / "processed" / "trazabilidad_por_fondo.csv")
+    df = pd.concat([df, pd.DataFrame({
+        "entidad": ["Sola", "Sola", None, "Cero"],
+        "importe_eur": [5e6, "n/d", 1e6, 0],
+        "pais_region": ["Islandia", None, "Islandia", "Islandia"],
+        "codigo_crs": [99999, 99999, 99999, 99999],
+        "fecha": ["2019-05-01", "sin fecha", "2019-01-01", "2019-01-01"],
+        "region_ocde": ["Otras Regiones"] * 4,
+    })], ignore_index=True)
+    df["importe_num"] = pd.to_numeric(df["importe_eur"], errors="coerce").fillna(0)
+    dimensiones = {"pais": df["pais_region"], "sector": df["codigo_crs"],
+                   "anio": pd.to_datetime(df["fecha"], errors="coerce").dt.year, "region": df["region_ocde"]}
+
+    esperado = {}
+    for nombre, mercado in dimensiones.items():
+        por_ent = df.groupby([mercado.rename("m"), "entidad"])["importe_num"].sum()
+        filas = []
+        for m, grupo in por_ent.groupby(level="m"):
+            n, cuotas = len(grupo), grupo / grupo.sum()
+            norm = ((cuotas - 1 / n) / (1 - 1 / n) * 100).clip(lower=0) if n > 1 else cuotas * 0
+            filas.append(pd.DataFrame({"importe": grupo, "norm": norm.fillna(0)}))
+        t = pd.concat(filas).groupby(level="entidad").apply(
+            lambda g: (g["norm"] * g["importe"]).sum() / g["importe"].sum() if g["importe"].sum() > 0 else float("nan"))
+        esperado[f"icr_{nombre}"] = t
+
+    res = CalculadorICR().calcular(df).set_index("entidad")
+    assert set(res.index) == set(df["entidad"].dropna())
+    for col, serie in esperado.items():
+        pd.testing.assert_series_equal(res[col], serie.reindex(res.index).round(1), check_names=False)
+    pd.testing.assert_series_equal(res["icr"], pd.DataFrame(esperado).reindex(res.index).mean(axis=1).round(1),
+                                   check_names=False)
+    assert res.loc["Sola", "n_contratos"] == 2 and res.loc["Sola", "importe_total"] == 5e6
+    assert res["icr"].nunique() > 10  # ya no es un único valor global
+
+    mercados = CalculadorICR().calcular_mercados(df)
+    islandia = mercados[(mercados["dimension"] == "pais") & (mercados["mercado"] == "Islandia")].iloc[0]
+    assert islandia["n_receptores"] == 2 and islandia["hhi"] == pytest.approx(1.0)
+    assert islandia["icr"] == 100.0
+
+
 def test_scores_rango(df_test):
     scores = calcular_scores_completos(df_test)
     assert (scores["score_riesgo"] >= 0).all()
@@ -160,4 +369,44 @@ def test_resumen_global_keys(df_test):
         5: "Contratos publicados en PLACE/OCDS",
         6: "Justificantes y evaluaciones públicas",
         7: "Beneficiario final identificado",
-    }
\ No newline at end of file
+    }
+
+
+def test_limpieza_vectorizada_igual_a_fila():
+    """limpiar() frente a la versión fila a fila original (map/apply sobre
+    entidad y sectores_crs), con nulos, vacíos y CRS desconocidos."""
+    import re
+    import pipeline
+
+    df = pd.read_csv(ROOT / "data" / "raw" / "aecid_intervenciones.csv")
+    df = pd.concat([df, pd.DataFrame({
+        "entidad": [None, float("nan"), "", "  PNUD  ", 7, "Entidad sin normalizar"],
+        "sectores_crs": [None, float("nan"), "", "Sin código", "99999 - Desconocido", "1401, 72010 y 14010"],
+        "pais_region": ["Bolivia", None, "", "Perú", "Etiopía", "NO ESPECIFICADO"],
+        "importe_eur": [1, "n/d", None, 2.5, 0, 3],
+    })], ignore_index=True)
+
+    def primer_crs(s):
+        m = re.search(r"(\d{5})", str(s))
+        return m.group(1) if m else None
+
+    entidades = [pipeline.ENTIDADES_NORM.get(str(x).strip(), str(x).strip()) for x in df["entidad"].tolist()]
+    crs = [primer_crs(s) for s in df["sectores_crs"].tolist()]
+    ambitos = [pipeline.CRS_A_SECTOR.get(c[:2], f"Sector {c[:2]}xx") if c else "Sin clasificar" for c in crs]
+
+    limpio = pipeline.limpiar(df.copy())
+
+    def nulos_a_none(serie):
+        return [None if pd.isna(v) else v for v in serie.tolist()]
+
+    assert limpio["entidad"].tolist() == entidades
+    assert nulos_a_none(limpio["codigo_crs"]) == crs
+    assert limpio["ambito"].tolist() == ambitos
+    assert ambitos[-6:] == ["Sin clasificar"] * 4 + ["Sector 99xx", "Acción Humanitaria"]
+    assert limpio["region_ocde"].tolist() == gazetteer.resolver_serie(df["pais_region"], "region").tolist()
+
+    # Sin columna sectores_crs (la versión original fallaba): todo sin clasificar
+    sin_sectores = pipeline.limpiar(df.drop(columns="sectores_crs").head(3))
+    assert nulos_a_none(sin_sectores["codigo_crs"]) == [None] * 3
+    assert sin_sectores["ambito"].tolist() == ["Sin clasificar"] * 3
+